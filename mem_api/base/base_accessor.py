@@ -1,5 +1,16 @@
 class BaseAccessor:
-    """The base class responsible for linking logic to the base application."""
+    """The base class responsible for linking logic to the base application.
+
+    The accessors are connected by the application lifespan, see
+    `core.lifespan`: the accessors of the same `stage` concurrently,
+    the stages in ascending order, and disconnected in the reverse order.
+
+    Attributes:
+        stage (int): The startup stage, 0 for the connections the other
+            accessors use on connect.
+    """
+
+    stage: int = 1
 
     def __init__(self, app):
         """Initializing the connection to the main Fast Api application.
@@ -9,8 +20,7 @@ class BaseAccessor:
         """
         self.app = app
         self.logger = app.logger
-        app.on_event("startup")(self.connect)
-        app.on_event("shutdown")(self.disconnect)
+        app.accessors.append(self)
         self._init()
 
     def _init(self):
@@ -20,5 +20,8 @@ HTTP_EXCEPTION = {
     status.HTTP_404_NOT_FOUND: "404 Not Found",
     status.HTTP_405_METHOD_NOT_ALLOWED: "405 Method Not Allowed",
     status.HTTP_422_UNPROCESSABLE_ENTITY: "422 Unavailable Entity",
+    status.HTTP_429_TOO_MANY_REQUESTS: "429 Too Many Requests",
     status.HTTP_500_INTERNAL_SERVER_ERROR: "500 Internal server error",
+    status.HTTP_503_SERVICE_UNAVAILABLE: "503 Service Unavailable",
+    status.HTTP_504_GATEWAY_TIMEOUT: "504 Gateway Timeout",
 }
@@ -1,5 +1,7 @@
 import logging
 
+from base.base_accessor import BaseAccessor
+from core.lifespan import Streams
 from core.settings import AppSettings
 from fastapi import FastAPI
 from fastapi import Request as FastAPIRequest
@@ -19,6 +21,8 @@ class Application(FastAPI):
         logger (logging.Logger): The application logger.
         docs_url (str): The URL of the documentation.
         postgres (Postgres): The database instance.
+        accessors (list[BaseAccessor]): The accessors connected by the lifespan.
+        streams (Streams): The streamed responses being sent.
     """
 
     store: Store
@@ -26,6 +30,8 @@ class Application(FastAPI):
     logger: logging.Logger
     docs_url: str
     postgres: Postgres
+    accessors: list[BaseAccessor]
+    streams: Streams
 
 
 class Request(FastAPIRequest):
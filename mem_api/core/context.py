@@ -0,0 +1,84 @@
+"""Context of the request being processed, available in the store layer."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Literal, Optional
+
+from base.base_exception import ExceptionBase
+from starlette import status
+
+deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class RequestStats:
+    """Where the time of the request went, reported in the access log.
+
+    The object is shared by the tasks of the request, the accessors add
+    the time of their calls to it.
+    """
+
+    __slots__ = ("db", "s3", "error")
+
+    def __init__(self):
+        self.db = 0.0
+        self.s3 = 0.0
+        self.error: Optional[str] = None
+
+
+stats: ContextVar[Optional[RequestStats]] = ContextVar("stats", default=None)
+
+
+class LastWrite:
+    """The time of the last database write of the client.
+
+    The time is carried between the requests by a cookie, so whichever
+    worker serves the next request of the client reads from the primary,
+    see `Postgres.get_engine`. The object is shared by the tasks of the
+    request, `changed` is set when the request itself wrote.
+    """
+
+    __slots__ = ("time", "changed")
+
+    def __init__(self, moment: float = 0.0):
+        self.time = moment
+        self.changed = False
+
+
+last_write: ContextVar[Optional[LastWrite]] = ContextVar("last_write", default=None)
+
+
+@contextmanager
+def timed(backend: Literal["db", "s3"]) -> Iterator[None]:
+    """Add the time of the block to the stats of the request, if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if (current := stats.get()) is not None:
+            setattr(
+                current,
+                backend,
+                getattr(current, backend) + time.perf_counter() - started,
+            )
+
+
+class DeadlineExceededException(ExceptionBase):
+    args = ("Превышено время обработки запроса. Повторите попытку позже.",)
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+
+
+def remaining() -> Optional[float]:
+    """The time left until the deadline of the request.
+
+    Returns:
+        float: Seconds left or None if the request has no deadline.
+
+    Raises:
+        DeadlineExceededException: The deadline has passed.
+    """
+    if (moment := deadline.get()) is None:
+        return None
+    if (left := moment - time.monotonic()) <= 0:
+        raise DeadlineExceededException()
+    return left
@@ -2,7 +2,8 @@ import traceback
 from logging import Logger
 
 from base.base_helper import HTTP_EXCEPTION, LOG_LEVEL
-from httpcore import URL
+from core.logger import log_event
+from starlette.datastructures import URL
 from starlette import status
 from starlette.responses import JSONResponse
 from starlette.exceptions import HTTPException
@@ -26,6 +27,7 @@ class ExceptionHandler:
         self.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         self.is_traceback = is_traceback
         self.real_message = ""
+        self.headers = None
 
     def __call__(
         self,
@@ -53,6 +55,8 @@ class ExceptionHandler:
         )
         self.logger = logger
         self.is_traceback = is_traceback
+        self.headers = None
+        self.real_message = ""
         self.handler_exception()
         return self.error_response(url)
 
@@ -79,6 +83,7 @@ class ExceptionHandler:
             )
         match self.level:
             case "CRITICAL" | 50:
+                level = "CRITICAL"
                 msg = (
                     f" \n_____________\n "
                     f"WARNING: an error has occurred to which there is no correct response of the application."
@@ -86,15 +91,26 @@ class ExceptionHandler:
                     f" \nExceptionHandler:  {str(self.exception)}\n"
                     f" _____________\n" + traceback.format_exc()
                 )
-                self.logger.critical(msg)
             case "ERROR" | 40:
-                self.logger.error(msg)
+                level = "ERROR"
             case "WARNING" | 30:
-                self.logger.warning(msg)
+                level = "WARNING"
             case _:
-                self.logger.info(msg)
-        self.logger.warning(self.real_message)
-        return JSONResponse(content=content_data, status_code=self.status_code)
+                level = "INFO"
+        # one record per error, the real exception is a field of it
+        log_event(
+            self.logger,
+            level,
+            msg,
+            event="error",
+            url=str(url),
+            status=self.status_code,
+            error=self.exception.__class__.__name__,
+            cause=self.real_message or None,
+        )
+        return JSONResponse(
+            content=content_data, status_code=self.status_code, headers=self.headers
+        )
 
     def handler_exception(self):
         """This method is used to handle the exception.
@@ -105,9 +121,13 @@ class ExceptionHandler:
         if isinstance(self.exception, HTTPException):
             self.status_code = self.exception.status_code
             self.message = self.exception.detail
+            self.headers = self.exception.headers
             return
 
-        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.status_code = getattr(
+            self.exception, "status_code", status.HTTP_400_BAD_REQUEST
+        )
+        self.headers = getattr(self.exception, "headers", None)
         if self.exception.args:
             self.message = self.exception.args[0]
         self.real_message = self.exception.__class__.__name__
@@ -0,0 +1,198 @@
+"""The production launcher.
+
+The application is imported and assembled once in the parent process,
+the listening socket is bound there too, then the workers are forked.
+The workers share the memory pages of the loaded code: the garbage
+collector is disabled while loading and the loaded objects are frozen
+before the fork, so the collections in the workers do not write to
+the shared pages. The parent only supervises the workers: a worker which
+exits, e.g. recycled after `limit_max_requests`, is replaced by a new one.
+"""
+
+import gc
+import importlib
+import math
+import os
+import random
+import signal
+import socket
+from typing import Optional
+
+import uvicorn
+from uvicorn.config import STARTUP_FAILURE
+
+from core.settings import LogSettings, UvicornSettings
+
+# imported lazily by the application, loaded before the fork to be shared
+PRELOAD = ("aiohttp",)
+CGROUP_V2_CPU = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota() -> Optional[float]:
+    """The CPU limit of the container (cgroup v2 or v1).
+
+    Returns:
+        float: The number of CPUs or None if not limited.
+    """
+    if cpu_max := _read(CGROUP_V2_CPU):
+        quota, _, period = cpu_max.partition(" ")
+    else:
+        quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    try:
+        quota, period = int(quota), int(period)
+    except (TypeError, ValueError):
+        return None  # "max", -1 or no cgroup
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def cpu_count() -> int:
+    """The number of CPUs available to the process.
+
+    The smallest of the CPU affinity and the container quota rounded up.
+    """
+    count = len(os.sched_getaffinity(0))
+    if quota := cpu_quota():
+        count = min(count, math.ceil(quota))
+    return max(count, 1)
+
+
+def get_config(settings: UvicornSettings, app) -> uvicorn.Config:
+    return uvicorn.Config(
+        app=app,
+        host=settings.host,
+        port=settings.port,
+        log_level=settings.log_level,
+        # replaced by the structured access log of the application
+        access_log=not LogSettings().log_access,
+        loop=settings.loop,
+        http=settings.http,
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.timeout_keep_alive,
+        timeout_graceful_shutdown=settings.timeout_graceful_shutdown,
+        limit_concurrency=settings.limit_concurrency,
+        limit_max_requests=settings.limit_max_requests,
+    )
+
+
+class Launcher:
+    """Forks the workers and replaces the exited ones."""
+
+    def __init__(self, settings: UvicornSettings):
+        self.settings = settings
+        self.workers = settings.workers or cpu_count()
+        self.children: set[int] = set()
+        self.stopping = False
+        self.failed = False
+        self.logger = None
+
+    def run(self) -> int:
+        """Load the application, run the workers until stopped.
+
+        Returns:
+            int: The exit code.
+        """
+        gc.disable()
+        # imported here, the application is loaded with the collector disabled
+        from core.setup import setup_app
+
+        app = setup_app()
+        for module in PRELOAD:
+            importlib.import_module(module)
+        self.logger = app.logger
+        config = get_config(self.settings, app)
+        sock = config.bind_socket()
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.logger.info(f"Starting {self.workers} workers, pid: {os.getpid()}")
+        try:
+            for _ in range(self.workers):
+                self.spawn(config, sock)
+            self.supervise(config, sock)
+        finally:
+            sock.close()
+        return STARTUP_FAILURE if self.failed else 0
+
+    def spawn(self, config: uvicorn.Config, sock: socket.socket):
+        """Fork a worker serving the shared socket."""
+        if pid := os.fork():
+            self.children.add(pid)
+            return
+        status = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            gc.enable()
+            if config.limit_max_requests and self.settings.max_requests_jitter:
+                # the workers started together are not recycled together
+                config.limit_max_requests += random.randint(
+                    0, self.settings.max_requests_jitter
+                )
+            server = uvicorn.Server(config)
+            server.run(sockets=[sock])
+            status = 0 if server.started else STARTUP_FAILURE
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+        finally:
+            os._exit(status)
+
+    def supervise(self, config: uvicorn.Config, sock: socket.socket):
+        """Wait for the workers, replace them until stopped."""
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self.children.discard(pid)
+            if os.waitstatus_to_exitcode(status) == STARTUP_FAILURE:
+                # a broken deployment, restarting would fail again
+                self.logger.error(f"Worker {pid} failed to start, stopping")
+                self.failed = True
+                self.stop(signal.SIGTERM, None)
+            elif not self.stopping:
+                self.logger.info(f"Worker {pid} exited, starting a new one")
+                self.spawn(config, sock)
+
+    def stop(self, signum: int, frame):
+        """Signal handler, stops the workers gracefully."""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def run(settings: UvicornSettings) -> int:
+    """Start the server.
+
+    The development mode runs a single process with the auto-reloader.
+
+    Args:
+        settings (UvicornSettings): The server settings.
+
+    Returns:
+        int: The exit code.
+    """
+    if settings.reload:
+        uvicorn.run(
+            app="core.setup:setup_app",
+            factory=True,
+            host=settings.host,
+            port=settings.port,
+            log_level=settings.log_level,
+            access_log=not LogSettings().log_access,
+            reload=True,
+        )
+        return 0
+    return Launcher(settings).run()
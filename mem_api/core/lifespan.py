@@ -0,0 +1,122 @@
+"""The application lifespan: starting and stopping the accessors."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from itertools import groupby
+from typing import TYPE_CHECKING, AsyncIterator, Iterable
+
+from core.settings import LifespanSettings
+
+if TYPE_CHECKING:
+    from base.base_accessor import BaseAccessor
+    from core.app import Application
+
+
+class Streams:
+    """The streamed response bodies being sent.
+
+    The shutdown waits for them before closing the connections the bodies
+    are read from.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def track(self, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Wrap the body of a StreamingResponse."""
+        self.active += 1
+        self._idle.clear()
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            self.active -= 1
+            if not self.active:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait until the streams are sent.
+
+        Returns:
+            bool: False if some streams were still active at the timeout.
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+def stages(
+    accessors: Iterable["BaseAccessor"], reverse: bool = False
+) -> list[list["BaseAccessor"]]:
+    """Group the accessors by `stage`, in the order of the stages."""
+    accessors = sorted(accessors, key=lambda accessor: accessor.stage, reverse=reverse)
+    return [
+        list(group)
+        for _, group in groupby(accessors, key=lambda accessor: accessor.stage)
+    ]
+
+
+async def connect(accessors: Iterable["BaseAccessor"]):
+    """Connect the accessors.
+
+    The accessors of a stage are connected concurrently, a stage starts
+    when the previous one is connected. If an accessor fails, the connected
+    ones are disconnected and the error is raised.
+    """
+    connected = []
+    for stage in stages(accessors):
+        results = await asyncio.gather(
+            *(accessor.connect() for accessor in stage), return_exceptions=True
+        )
+        connected += [
+            accessor
+            for accessor, result in zip(stage, results)
+            if not isinstance(result, BaseException)
+        ]
+        for result in results:
+            if isinstance(result, BaseException):
+                await disconnect(connected)
+                raise result
+
+
+async def disconnect(accessors: Iterable["BaseAccessor"]):
+    """Disconnect the accessors, the stages in the reverse order.
+
+    A failed accessor does not stop the others, the error is logged.
+    """
+    for stage in stages(accessors, reverse=True):
+        results = await asyncio.gather(
+            *(accessor.disconnect() for accessor in stage), return_exceptions=True
+        )
+        for accessor, result in zip(stage, results):
+            if isinstance(result, Exception):
+                accessor.logger.error(
+                    f"{accessor.__class__.__name__} disconnect failed: {result}"
+                )
+
+
+@asynccontextmanager
+async def lifespan(app: "Application") -> AsyncIterator[None]:
+    """Connect the accessors on startup, disconnect them on shutdown.
+
+    The startup completes when the accessors are connected and the
+    connections to Postgres and S3 are open, so the first requests do not
+    wait for them. The shutdown first lets the streamed responses finish.
+    """
+    settings = LifespanSettings()
+    started = time.monotonic()
+    await connect(app.accessors)
+    app.logger.info(f"Application started in {time.monotonic() - started:.3f} s")
+    try:
+        yield
+    finally:
+        if not await app.streams.drain(settings.lifespan_drain_timeout):
+            app.logger.warning(
+                f"Shutdown with {app.streams.active} responses still streaming"
+            )
+        await disconnect(app.accessors)
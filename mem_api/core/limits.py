@@ -0,0 +1,102 @@
+"""Per-client rate limits and admission control of the heavy requests."""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class RejectedException(Exception):
+    """The request is not admitted.
+
+    Args:
+        retry_after (int): Seconds after which the client may retry.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class TokenBuckets:
+    """Token bucket per client.
+
+    A bucket holds up to `burst` tokens and is refilled at `rate` tokens
+    per second, every request takes one token. The buckets of the least
+    recently seen clients are dropped above `max_clients`, such a client
+    simply starts with a full bucket.
+
+    Args:
+        rate (float): Tokens per second.
+        burst (int): The bucket capacity.
+        max_clients (int): The number of buckets kept.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+
+    def take(self, client: Hashable):
+        """Take a token.
+
+        Args:
+            client (Hashable): The client key.
+
+        Raises:
+            RejectedException: The bucket is empty.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            raise RejectedException(math.ceil((1 - tokens) / self.rate))
+        self._buckets[client] = (tokens - 1, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class Admission:
+    """Limits the number of concurrent requests with a bounded wait queue.
+
+    Args:
+        concurrency (int): The number of requests processed at once.
+        queue (int): The number of requests waiting for a slot.
+        timeout (float): Seconds a request waits before it is rejected.
+    """
+
+    def __init__(self, concurrency: int, queue: int, timeout: float):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def acquire(self):
+        """Wait for a slot, `release` must be called after the request.
+
+        Raises:
+            RejectedException: The queue is full or the wait timed out.
+        """
+        if self._semaphore.locked() and self.waiting >= self.queue:
+            raise RejectedException(math.ceil(self.timeout))
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise RejectedException(math.ceil(self.timeout))
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self):
+        """Free the slot."""
+        self.running -= 1
+        self._semaphore.release()
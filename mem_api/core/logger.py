@@ -1,32 +1,62 @@
+import json
 import logging
 import sys
+import traceback
 
 from core.settings import LogSettings
 from loguru import logger
 
 
+def json_format(record: dict) -> str:
+    """Format the loguru record as a JSON line with the bound fields."""
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        **{key: value for key, value in record["extra"].items() if key != "json"},
+    }
+    if record["exception"]:
+        data["traceback"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json"] = json.dumps(data, ensure_ascii=False, default=str)
+    return "{extra[json]}\n"
+
+
+def log_event(log: logging.Logger, level: str, message: str, **fields):
+    """Log the message with the structured fields.
+
+    The fields are bound to the loguru record or passed as `extra`
+    to the standard logger.
+    """
+    if bind := getattr(log, "bind", None):
+        bind(**fields).opt(depth=1).log(level, message)
+    else:
+        log.log(logging.getLevelName(level), message, extra=fields, stacklevel=2)
+
+
 def setup_logging() -> logging.Logger:
     """Setting up logging in the application.
 
     In this case, there is an option to use logo ru.
     https://github.com/Delgan/loguru
+
+    With `log_enqueue` the records are written to stderr by a background
+    thread, a slow terminal or log collector does not block the event loop.
+    The forked workers put their records into the same queue.
     """
     settings = LogSettings()
     if settings.guru:
-        logger.configure(
-            **{
-                "handlers": [
-                    {
-                        "sink": sys.stderr,
-                        "level": settings.level,
-                        "backtrace": settings.traceback,
-                    },
-                ],
-            }
-        )
+        handler = {
+            "sink": sys.stderr,
+            "level": settings.level,
+            "backtrace": settings.traceback,
+            "enqueue": settings.log_enqueue,
+        }
+        if settings.log_json:
+            handler["format"] = json_format
+        logger.configure(handlers=[handler])
         logger.info("Logging with Guru mode enabled")
         return logger
-    logging.basicConfig(level=settings.log_level)
+    logging.basicConfig(level=settings.level)
     loger = logging.getLogger(__name__)
     logging.info("Logging with logging.basicConfig")
     return loger
@@ -0,0 +1,75 @@
+"""Metrics of the process in the Prometheus text format."""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+REGISTRY: list["Metric"] = []
+
+
+class Metric:
+    """A metric with optional labels.
+
+    Args:
+        name (str): The metric name.
+        description (str): The help text.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.values: dict[tuple[tuple[str, str], ...], float] = {}
+        REGISTRY.append(self)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for labels, value in self.values.items():
+            if labels:
+                labels = "{%s}" % ",".join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f"{self.name}{labels or ''} {value}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _key(labels: dict) -> tuple[tuple[str, str], ...]:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Counter(Metric):
+    """A value that only grows."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+metrics_route = APIRouter(tags=["METRICS"])
+
+
+@metrics_route.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        "\n".join(metric.render() for metric in REGISTRY) + "\n",
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,15 +1,32 @@
+import asyncio
+import math
+import random
 import re
+import time
+from typing import Callable, Optional
 
 from core.app import Application
+from core.context import (
+    DeadlineExceededException,
+    LastWrite,
+    RequestStats,
+    deadline,
+    last_write,
+    stats,
+)
 from core.exception_handler import ExceptionHandler
-from core.settings import LogSettings
+from core.logger import log_event
+from core.limits import Admission, RejectedException, TokenBuckets
+from core.metrics import Counter, Gauge
+from core.settings import DeadlineSettings, LimitSettings, LogSettings
 from fastapi import Request as FastApiRequest
 from fastapi import Response, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
@@ -53,6 +70,8 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
             return response
         except Exception as error:
+            if current := stats.get():
+                current.error = error.__class__.__name__
             return self.exception_handler(error, request.url, request.app.logger)
 
     @staticmethod
@@ -89,6 +108,324 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
         )
 
 
+class HealthMiddleware:
+    """Answers the probes of the orchestrator.
+
+    A pure ASGI middleware in front of the others: the probes skip the
+    error handling, the deadline and the rate limit, and are answered
+    from the results of the background checks, see `HealthAccessor`.
+    `/health/live` only shows that the process serves requests,
+    `/health/ready` answers `503` while Postgres or S3 is unavailable
+    or the Postgres pool is saturated.
+
+    Args:
+        app (ASGIApp): The FastAPI application.
+    """
+
+    LIVE_PATH = "/health/live"
+    READY_PATH = "/health/ready"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in (
+            self.LIVE_PATH,
+            self.READY_PATH,
+        ):
+            return await self.app(scope, receive, send)
+        if scope["path"] == self.LIVE_PATH:
+            response = JSONResponse({"status": "ok"})
+        else:
+            ready, report = scope["app"].store.health.report()
+            response = JSONResponse(
+                report,
+                status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        response.headers["Cache-Control"] = "no-store"
+        await response(scope, receive, send)
+
+
+class AccessLogMiddleware:
+    """Logs the requests as structured records.
+
+    A pure ASGI middleware, the record has the route, the status,
+    the latency, the time spent in Postgres and S3 (see
+    `core.context.RequestStats`) and the bytes sent. The errors and the
+    slow requests are always logged, the successful ones are sampled
+    with `log_sample_rate`.
+
+    Args:
+        app (ASGIApp): The FastAPI application.
+
+    Attributes:
+        settings (LogSettings): The log application settings.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.settings = LogSettings()
+        self._routes: Optional[dict[Callable, str]] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.settings.log_access:
+            return await self.app(scope, receive, send)
+        current = RequestStats()
+        token = stats.set(current)
+        started = time.perf_counter()
+        status_code, sent = status.HTTP_500_INTERNAL_SERVER_ERROR, 0
+
+        async def send_counted(message: Message):
+            nonlocal status_code, sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            stats.reset(token)
+            latency = time.perf_counter() - started
+            slow = latency >= self.settings.log_slow
+            if (
+                status_code >= 400
+                or slow
+                or random.random() < self.settings.log_sample_rate
+            ):
+                self.log(scope, status_code, latency, slow, sent, current)
+
+    def log(
+        self,
+        scope: Scope,
+        status_code: int,
+        latency: float,
+        slow: bool,
+        sent: int,
+        current: RequestStats,
+    ):
+        if status_code >= 500:
+            level = "ERROR"
+        elif status_code >= 400 or slow:
+            level = "WARNING"
+        else:
+            level = "INFO"
+        log_event(
+            scope["app"].logger,
+            level,
+            f"{scope['method']} {scope['path']} {status_code} "
+            f"{latency * 1000:.1f} ms",
+            event="access",
+            method=scope["method"],
+            route=self.route(scope),
+            path=scope["path"],
+            status=status_code,
+            latency=round(latency, 6),
+            db=round(current.db, 6),
+            s3=round(current.s3, 6),
+            bytes=sent,
+            error=current.error,
+        )
+
+    def route(self, scope: Scope) -> Optional[str]:
+        """The path template of the matched route, e.g. `/memes/{meme_id}`."""
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if hasattr(route, "endpoint")
+            }
+        return self._routes.get(scope.get("endpoint"))
+
+
+class ClientMiddleware(BaseHTTPMiddleware):
+    """Carries the time of the last write of the client between requests.
+
+    The time is read from the `last_write` cookie and is available to the
+    store layer through `core.context.last_write`, so the client reads its
+    own writes from the primary database whichever worker or node serves
+    the request. After a write the cookie is set for
+    `postgres_read_your_writes` seconds. The clocks of the nodes are
+    expected to be synchronized.
+    """
+
+    COOKIE = "last_write"
+
+    async def dispatch(
+            self, request: FastApiRequest, call_next: RequestResponseEndpoint
+    ) -> Response:
+        try:
+            moment = min(float(request.cookies[self.COOKIE]), time.time())
+        except (KeyError, ValueError):
+            moment = 0.0
+        current = LastWrite(moment)
+        token = last_write.set(current)
+        try:
+            response = await call_next(request)
+        finally:
+            last_write.reset(token)
+        if current.changed:
+            response.set_cookie(
+                self.COOKIE,
+                f"{current.time:.6f}",
+                max_age=math.ceil(
+                    request.app.postgres.settings.postgres_read_your_writes
+                ),
+                httponly=True,
+                samesite="lax",
+            )
+        return response
+
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    """Gives the request a time budget.
+
+    The timeout is taken from the `X-Request-Timeout` header, capped by
+    `deadline_max`, or from the default of the route. The deadline is
+    available to the store layer through `core.context.deadline`, the
+    accessors bound every call to Postgres and S3 by the time left.
+    A request still running at the deadline is cancelled with `504`.
+    A streamed response body is not bounded once it has started.
+
+    Args:
+        app (ASGIApp): The FastAPI application.
+
+    Attributes:
+        settings (DeadlineSettings): The timeouts.
+    """
+
+    def __init__(self, app: ASGIApp, *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.settings = DeadlineSettings()
+
+    async def dispatch(
+            self, request: FastApiRequest, call_next: RequestResponseEndpoint
+    ) -> Response:
+        if not (timeout := self.timeout(request)):
+            return await call_next(request)
+        token = deadline.set(time.monotonic() + timeout)
+        try:
+            async with asyncio.timeout(timeout):
+                return await call_next(request)
+        except TimeoutError:
+            raise DeadlineExceededException()
+        finally:
+            deadline.reset(token)
+
+    def timeout(self, request: FastApiRequest) -> float:
+        """The timeout of the request, 0 if it has no deadline."""
+        try:
+            timeout = float(request.headers[self.settings.deadline_header])
+        except (KeyError, ValueError):
+            pass
+        else:
+            if timeout > 0:
+                return min(timeout, self.settings.deadline_max)
+        for route in request.app.routes:
+            if route.matches(request.scope)[0] == Match.FULL:
+                return self.settings.deadline_routes.get(
+                    f"{request.method} {route.path}", self.settings.deadline_default
+                )
+        return self.settings.deadline_default
+
+
+RATE_LIMITED = Counter(
+    "memes_rate_limited_total", "Requests rejected by the per-client rate limit."
+)
+UPLOADS_REJECTED = Counter(
+    "memes_uploads_rejected_total", "Uploads rejected by the admission control."
+)
+UPLOADS = Gauge("memes_uploads", "Uploads being processed or waiting for a slot.")
+LIMITS = Gauge("memes_limit", "Configured rate limits and upload admission.")
+
+
+class LimitMiddleware(BaseHTTPMiddleware):
+    """Rate limits the clients and admits a limited number of uploads.
+
+    Every client, identified by an issued API key (`rate_limit_api_keys`)
+    or the address, has a token bucket. Uploads (POST and PUT) are then admitted to a limited
+    number of slots, the file is only read when the upload is admitted.
+    Requests above the limits are answered at once with `429` or `503`
+    and `Retry-After`.
+
+    Args:
+        app (ASGIApp): The FastAPI application.
+
+    Attributes:
+        settings (LimitSettings): The limits.
+    """
+
+    EXEMPT_PATHS = ("/metrics",)
+    UPLOAD_METHODS = ("POST", "PUT")
+
+    def __init__(self, app: ASGIApp, *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+        self.settings = LimitSettings()
+        self.buckets = TokenBuckets(
+            self.settings.rate_limit_rate,
+            self.settings.rate_limit_burst,
+            self.settings.rate_limit_clients,
+        )
+        self.api_keys = {
+            key.get_secret_value() for key in self.settings.rate_limit_api_keys
+        }
+        self.admission = Admission(
+            self.settings.upload_concurrency,
+            self.settings.upload_queue,
+            self.settings.upload_queue_timeout,
+        )
+        for name in (
+            "rate_limit_rate",
+            "rate_limit_burst",
+            "upload_concurrency",
+            "upload_queue",
+        ):
+            LIMITS.set(getattr(self.settings, name), limit=name)
+
+    async def dispatch(
+            self, request: FastApiRequest, call_next: RequestResponseEndpoint
+    ) -> Response:
+        if request.url.path in self.EXEMPT_PATHS:
+            return await call_next(request)
+        api_key = request.headers.get(self.settings.rate_limit_key_header)
+        if api_key not in self.api_keys:
+            # an unknown key would give the client a new bucket per request
+            api_key = None
+        try:
+            self.buckets.take(
+                ("key", api_key)
+                if api_key
+                else ("address", request.client.host if request.client else None)
+            )
+        except RejectedException as e:
+            RATE_LIMITED.inc(client="key" if api_key else "address")
+            raise HTTPException(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Слишком много запросов, повторите позже.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        if request.method not in self.UPLOAD_METHODS:
+            return await call_next(request)
+        try:
+            await self.admission.acquire()
+        except RejectedException as e:
+            UPLOADS_REJECTED.inc()
+            raise HTTPException(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Сервис перегружен загрузками, повторите позже.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        finally:
+            UPLOADS.set(self.admission.waiting, state="waiting")
+            UPLOADS.set(self.admission.running, state="running")
+        try:
+            return await call_next(request)
+        finally:
+            self.admission.release()
+            UPLOADS.set(self.admission.running, state="running")
+
+
 async def validation_exception_handler(
         _: FastApiRequest, exc: RequestValidationError
 ) -> JSONResponse:
@@ -129,4 +466,9 @@ def setup_middleware(app: Application):
         Exception: If the middleware cannot be set up.
     """
     app.exception_handler(RequestValidationError)(validation_exception_handler)
+    app.add_middleware(LimitMiddleware)
+    app.add_middleware(DeadlineMiddleware)
     app.add_middleware(ErrorHandlingMiddleware)
+    app.add_middleware(ClientMiddleware)
+    app.add_middleware(AccessLogMiddleware)
+    app.add_middleware(HealthMiddleware)
@@ -1,7 +1,9 @@
 from core.app import Application
+from core.metrics import metrics_route
 from memes.views import memes_route
 
 
 def setup_routes(app: Application):
     """Configuring the connected routes to the application."""
     app.include_router(memes_route)
+    app.include_router(metrics_route)
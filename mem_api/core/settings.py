@@ -1,6 +1,7 @@
 """All application settings."""
 
 import os
+from typing import Literal, Optional
 
 from base.base_helper import LOG_LEVEL
 from pydantic import SecretStr, field_validator, ConfigDict
@@ -29,16 +30,37 @@ class UvicornSettings(Base):
     Args:
         host (str): Hostname.
         port (int): Port number.
-        workers (int): Number of worker processes.
+        workers (int): Number of worker processes, 0 - one per available CPU.
         log_level (str): Log level.
-        reload (bool): Reload on code changes.
+        reload (bool): Development mode, a single process reloaded
+            on code changes.
+        loop (str): Event loop implementation.
+        http (str): HTTP protocol implementation.
+        backlog (int): Maximum number of pending connections.
+        timeout_keep_alive (int): Seconds to keep an idle connection open.
+        timeout_graceful_shutdown (int): Seconds to finish the requests
+            on shutdown.
+        limit_concurrency (int): Maximum number of connections and tasks
+            of a worker, 503 is returned above the limit.
+        limit_max_requests (int): Number of requests after which a worker
+            is replaced by a new one.
+        max_requests_jitter (int): Maximum random addition
+            to limit_max_requests.
     """
 
     host: str
     port: int
-    workers: int
+    workers: int = 0
     log_level: LOG_LEVEL = "INFO"
-    reload: bool = True
+    reload: bool = False
+    loop: Literal["auto", "asyncio", "uvloop"] = "uvloop"
+    http: Literal["auto", "h11", "httptools"] = "httptools"
+    backlog: int = 2048
+    timeout_keep_alive: int = 5
+    timeout_graceful_shutdown: Optional[int] = 30
+    limit_concurrency: Optional[int] = None
+    limit_max_requests: Optional[int] = None
+    max_requests_jitter: int = 0
 
     @field_validator("log_level")
     def to_lower_case(cls, log_level: LOG_LEVEL) -> str:  # noqa:
@@ -95,17 +117,315 @@ class LogSettings(Base):
     level (str, optional): The level of logging. Defaults to "INFO".
     guru (bool, optional): Whether to enable guru mode. Defaults to True.
     traceback (bool, optional): Whether to include tracebacks in logs. Defaults to True.
+    log_json (bool, optional): Write the records as JSON lines. Defaults to False.
+    log_enqueue (bool, optional): Write the records from a background thread,
+        the request only puts them into a queue. Defaults to True.
+    log_access (bool, optional): Log the requests. Defaults to True.
+    log_sample_rate (float, optional): The share of the successful requests
+        logged, the errors and the slow requests are always logged. Defaults to 1.
+    log_slow (float, optional): Seconds from which a request is slow.
+        Defaults to 1.
     """
 
     level: LOG_LEVEL
     guru: bool
     traceback: bool
+    log_json: bool = False
+    log_enqueue: bool = True
+    log_access: bool = True
+    log_sample_rate: float = 1.0
+    log_slow: float = 1.0
+
+
+class LimitSettings(Base):
+    """Settings for the rate limits and the admission of uploads.
+
+    Attributes:
+        rate_limit_rate: Requests per second allowed for one client.
+        rate_limit_burst: Requests a client may make at once.
+        rate_limit_clients: The number of clients tracked by one process.
+        rate_limit_key_header: The header with the API key, the client
+            address is used without it.
+        rate_limit_api_keys: The issued API keys, a client with one of them
+            has its own bucket. Any other key is ignored and the client
+            is limited by its address.
+        upload_concurrency: The number of uploads processed at once
+            by one process.
+        upload_queue: The number of uploads waiting for a slot.
+        upload_queue_timeout: Seconds an upload waits for a slot.
+    """
+
+    rate_limit_rate: float = 10.0
+    rate_limit_burst: int = 20
+    rate_limit_clients: int = 100000
+    rate_limit_key_header: str = "X-API-Key"
+    rate_limit_api_keys: list[SecretStr] = []
+    upload_concurrency: int = 8
+    upload_queue: int = 32
+    upload_queue_timeout: float = 10.0
+
+
+class DeadlineSettings(Base):
+    """Settings for the time budget of the requests.
+
+    Attributes:
+        deadline_header: The header with the client timeout in seconds.
+        deadline_default: Seconds given to a request without the header.
+        deadline_max: The longest timeout a client may ask for.
+        deadline_routes: Default timeouts of the routes by "METHOD /path",
+            0 disables the deadline, e.g. for the streaming routes.
+    """
+
+    deadline_header: str = "X-Request-Timeout"
+    deadline_default: float = 10.0
+    deadline_max: float = 60.0
+    deadline_routes: dict[str, float] = {
+        "GET /memes/export": 0,
+        "GET /memes/archive": 0,
+        "POST /memes/import": 0,
+    }
 
 
 class FileSettings(Base):
     size: int = 1024 * 1024 * 1
 
 
+class ImageSettings(Base):
+    """Settings for generating image variants.
+
+    Attributes:
+        image_workers: The number of processes resizing and encoding images.
+        image_quality: The encoder quality of the variants.
+        image_cache_size: The byte budget of the local variant cache.
+    """
+
+    image_workers: int = 2
+    image_quality: int = 80
+    image_cache_size: int = 1024 * 1024 * 64
+
+
+class CacheSettings(Base):
+    """Settings for the hot image cache shared by the worker processes.
+
+    Attributes:
+        cache_path: The memory-mapped file, all the workers must use the same one.
+        cache_size: The byte budget of the cached images, 0 disables the cache.
+        cache_slots: The maximum number of cached images.
+        cache_max_item: The largest image that is cached.
+    """
+
+    cache_path: str = "/dev/shm/mem_api_cache"
+    cache_size: int = 1024 * 1024 * 48
+    cache_slots: int = 16384
+    cache_max_item: int = 1024 * 1024 * 4
+
+
+class SpoolSettings(Base):
+    """Settings for the write-behind uploads.
+
+    Attributes:
+        spool_enabled: Acknowledge new memes once the image is in the spool,
+            the image is uploaded to S3 in the background.
+        spool_dir: The spool directory, must be on a local durable disk.
+        spool_batch_size: The number of images uploaded before their memes
+            are marked as uploaded in one query.
+        spool_concurrency: The number of concurrent uploads to S3.
+        spool_max_pending: The number of images waiting in the spool of one
+            process, new memes are uploaded synchronously above it.
+        spool_retry_delay: Seconds before the first retry of a failed upload,
+            doubled for every next one up to a minute.
+        spool_max_attempts: The number of failed uploads after which the image
+            is set aside in the spool as `.failed` and its meme is deleted.
+        spool_scan_interval: Seconds between scans of the spool for images
+            left by stopped processes.
+    """
+
+    spool_enabled: bool = False
+    spool_dir: str = "/var/spool/mem_api"
+    spool_batch_size: int = 16
+    spool_concurrency: int = 4
+    spool_max_pending: int = 1000
+    spool_retry_delay: float = 1.0
+    spool_max_attempts: int = 10
+    spool_scan_interval: float = 30.0
+
+
+class LifespanSettings(Base):
+    """Settings for the application startup and shutdown.
+
+    Attributes:
+        lifespan_drain_timeout: Seconds the shutdown waits for the streamed
+            responses before closing the connections.
+    """
+
+    lifespan_drain_timeout: float = 20.0
+
+
+class HealthSettings(Base):
+    """Settings for the health checks.
+
+    Attributes:
+        health_interval: Seconds between the checks of Postgres and S3.
+        health_timeout: Seconds a check may take.
+        health_ttl: Seconds a check result is valid, an older one means
+            the checks are stuck and the application is not ready.
+        health_saturation: The share of the Postgres pool in use from which
+            the application is not ready.
+    """
+
+    health_interval: float = 2.0
+    health_timeout: float = 1.0
+    health_ttl: float = 10.0
+    health_saturation: float = 0.9
+
+
+class TagSettings(Base):
+    """Settings for the tag counts.
+
+    Attributes:
+        tags_refresh_interval: Seconds between the refreshes of the tag counts.
+    """
+
+    tags_refresh_interval: float = 60.0
+
+
+class TemplateSettings(Base):
+    """Settings for generating memes from templates.
+
+    Attributes:
+        template_dir: The directory with the template images, the file name
+            without the extension is the template name.
+        template_font: The TrueType font of the captions, a file name is
+            searched for in the system font directories. The bundled Pillow
+            font, without Cyrillic, is used if the font is not found.
+        template_workers: The number of processes rendering the memes.
+        template_quality: The JPEG quality of the generated memes.
+    """
+
+    template_dir: str = "templates"
+    template_font: str = "DejaVuSans-Bold.ttf"
+    template_workers: int = 1
+    template_quality: int = 90
+
+
+class TrendingSettings(Base):
+    """Settings for the trending memes.
+
+    Attributes:
+        trending_size: The number of memes in the trending list.
+        trending_half_life: Seconds after which the weight of a view halves.
+        trending_interval: Seconds between the merges of the scores of the
+            process into Postgres and the refreshes of the list.
+        trending_min_score: Scores decayed below it are deleted.
+    """
+
+    trending_size: int = 50
+    trending_half_life: float = 3600.0
+    trending_interval: float = 10.0
+    trending_min_score: float = 0.01
+
+
+class ViewSettings(Base):
+    """Settings for the view counters.
+
+    Attributes:
+        views_flush_interval: Seconds between the writes of the buffered
+            views to Postgres.
+        views_batch_size: The number of memes updated by one statement.
+    """
+
+    views_flush_interval: float = 5.0
+    views_batch_size: int = 1000
+
+
+class ArchiveSettings(Base):
+    """Settings for the ZIP archives of memes.
+
+    Attributes:
+        archive_prefetch: The number of images requested from S3 ahead
+            of the one being written to the archive.
+        archive_max_ids: The maximum number of ids in one request.
+    """
+
+    archive_prefetch: int = 4
+    archive_max_ids: int = 1000
+
+
+class ImportSettings(Base):
+    """Settings for the bulk import of memes.
+
+    Attributes:
+        import_batch_size: The number of memes uploaded and copied
+            to Postgres between two checkpoints.
+        import_concurrency: The number of concurrent uploads to S3.
+    """
+
+    import_batch_size: int = 100
+    import_concurrency: int = 8
+
+
+class JobSettings(Base):
+    """Settings for the background job queue.
+
+    Attributes:
+        job_workers: The number of jobs processed concurrently by one process.
+        job_poll_interval: Seconds between polls of an empty queue.
+        job_max_attempts: The number of attempts before the job is failed.
+        job_lease: Seconds after which a running job is considered abandoned.
+    """
+
+    job_workers: int = 2
+    job_poll_interval: float = 1.0
+    job_max_attempts: int = 5
+    job_lease: int = 300
+
+
+class IdempotencySettings(Base):
+    """Settings for the `Idempotency-Key` support.
+
+    Attributes:
+        idempotency_ttl: Seconds the response is replayed for the key.
+        idempotency_lock: Seconds after which the key of an unfinished
+            request can be taken again, e.g. the process was killed.
+        idempotency_wait: Seconds a repeated request waits for the first one.
+        idempotency_poll: Seconds between checks of a request running
+            in another process.
+        idempotency_cache_size: The number of responses cached in memory.
+    """
+
+    idempotency_ttl: int = 60 * 60 * 24
+    idempotency_lock: int = 60
+    idempotency_wait: float = 30.0
+    idempotency_poll: float = 0.2
+    idempotency_cache_size: int = 10000
+
+
+class GuardSettings(Base):
+    """Settings for the concurrency limits and circuit breakers of the backends.
+
+    Attributes:
+        guard_initial_limit: The initial number of concurrent calls.
+        guard_min_limit: The lowest adaptive limit.
+        guard_max_limit: The highest adaptive limit.
+        guard_postgres_latency: Seconds, slower Postgres calls lower the limit.
+        guard_s3_latency: Seconds, slower S3 calls lower the limit.
+        guard_error_threshold: The failure rate opening the circuit breaker.
+        guard_window: The number of recent calls the rate is computed on.
+        guard_min_calls: The number of calls needed to open the breaker.
+        guard_cooldown: Seconds before an open breaker lets a probe call through.
+    """
+
+    guard_initial_limit: int = 32
+    guard_min_limit: int = 2
+    guard_max_limit: int = 256
+    guard_postgres_latency: float = 0.5
+    guard_s3_latency: float = 2.0
+    guard_error_threshold: float = 0.5
+    guard_window: int = 20
+    guard_min_calls: int = 10
+    guard_cooldown: float = 5.0
+
+
 class PostgresSettings(Base):
     """Settings for PostgresSQL database connections.
 
@@ -116,6 +436,16 @@ class PostgresSettings(Base):
         postgres_host: The hostname or IP address of the database server.
         postgres_port: The port number of the database server.
         postgres_schema: The name of the schema to use.
+        postgres_replicas: DSNs of the read replicas.
+        postgres_read_your_writes: Seconds after a write during which
+            the client reads from the primary.
+        postgres_health_interval: Seconds between health checks of the replicas.
+        postgres_pool_size: The number of connections kept in the pool
+            of each database.
+        postgres_max_overflow: The number of connections opened above
+            `postgres_pool_size` under load.
+        postgres_warm_connections: The number of connections opened
+            on startup.
 
     Methods:
         dsn: Returns the connection URL as a string.
@@ -127,6 +457,12 @@ class PostgresSettings(Base):
     postgres_host: str
     postgres_port: str
     postgres_schema: str
+    postgres_replicas: list[SecretStr] = []
+    postgres_read_your_writes: float = 5.0
+    postgres_health_interval: float = 5.0
+    postgres_pool_size: int = 5
+    postgres_max_overflow: int = 10
+    postgres_warm_connections: int = 2
 
     def dsn(self, show_secret: bool = False) -> str:
         """Returns the connection URL as a string.
@@ -150,6 +486,19 @@ class PostgresSettings(Base):
         )
 
 
+class BusSettings(Base):
+    """Settings for the cache invalidation bus.
+
+    Attributes:
+        bus_channel: The Postgres NOTIFY channel.
+        bus_reconnect_delay: Seconds between attempts to restore the LISTEN
+            connection.
+    """
+
+    bus_channel: str = "meme_changes"
+    bus_reconnect_delay: float = 1.0
+
+
 class S3Settings(Base):
     """Settings for S3 bucket connections.
 
@@ -157,8 +506,17 @@ class S3Settings(Base):
         s3_host: The hostname or IP address of the S3 server.
         s3_port: The port number of the S3 server.
         s3_bucket: The name of the S3 bucket.
+        s3_connections: The maximum number of connections to the S3 server.
+        s3_keepalive_timeout: Seconds an idle connection is kept open.
+        s3_warm_connections: The number of connections opened on startup.
+        s3_timeout: Seconds a request may take outside of a client request,
+            e.g. in the background tasks and the scripts.
     """
 
     s3_host: str
     s3_port: int
     s3_bucket: str
+    s3_connections: int = 100
+    s3_keepalive_timeout: float = 30.0
+    s3_warm_connections: int = 2
+    s3_timeout: float = 60.0
@@ -1,6 +1,7 @@
 """The location of the final assembly of the application."""
 
 from core.app import Application
+from core.lifespan import Streams, lifespan
 from core.logger import setup_logging
 from core.middelware import setup_middleware
 from core.routes import setup_routes
@@ -22,9 +23,12 @@ def setup_app() -> "Application":
         version=settings.version,
         title=settings.title,
         description=settings.description,
+        lifespan=lifespan,
     )
     app.settings = settings
     app.logger = setup_logging()
+    app.accessors = []
+    app.streams = Streams()
     setup_store(app)
     setup_middleware(app)
     setup_routes(app)
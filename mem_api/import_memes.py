@@ -0,0 +1,31 @@
+"""Bulk import of memes from a zip or tar archive."""
+
+import argparse
+import asyncio
+import os
+
+from core.lifespan import connect, disconnect
+from core.setup import setup_app
+
+
+async def main(path: str, name: str):
+    app = setup_app()
+    accessors = [app.postgres, app.store.s3, app.store.imports]
+    await connect(accessors)
+    try:
+        with open(path, "rb") as archive:
+            imported = await app.store.imports.import_archive(archive, name)
+        app.logger.info(f"Imported memes: {imported}")
+    finally:
+        await disconnect(accessors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("archive", help="zip or tar archive with manifest.csv")
+    parser.add_argument(
+        "--name",
+        help="import name to resume an interrupted import, the file name by default",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.archive, args.name or os.path.basename(args.archive)))
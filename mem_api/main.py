@@ -1,15 +1,9 @@
 """The application launcher."""
 
-import uvicorn
+import sys
+
+from core.launcher import run
 from core.settings import UvicornSettings
 
 if __name__ == "__main__":
-    settings = UvicornSettings()
-    uvicorn.run(
-        app="core.setup:setup_app",
-        host=settings.host,
-        port=settings.port,
-        workers=settings.workers,
-        log_level=settings.log_level,
-        reload=settings.reload,
-    )
+    sys.exit(run(UvicornSettings()))
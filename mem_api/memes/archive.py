@@ -0,0 +1,129 @@
+"""Streaming ZIP archives of memes.
+
+The archive is written to a non-seekable sink, so `zipfile` uses data
+descriptors and every compressed chunk can be sent to the client at once.
+Only the central directory (one record per entry) is kept until the end.
+"""
+
+import asyncio
+import csv
+import io
+import zipfile
+from collections import deque
+from typing import Any, AsyncIterator, Iterable, Union
+
+from store.s3.accessor import S3Accessor
+from store.s3.exeptions import S3FileNotFoundException
+
+COMPRESSION = {
+    "stored": zipfile.ZIP_STORED,
+    "deflated": zipfile.ZIP_DEFLATED,
+}
+MANIFEST = "manifest.csv"
+
+
+class _Sink(io.RawIOBase):
+    """Write-only non-seekable stream collecting the written bytes."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _prefetch(
+    s3: S3Accessor, memes: Union[Iterable[Any], AsyncIterator[Any]], prefetch: int
+) -> AsyncIterator[tuple[Any, AsyncIterator[bytes]]]:
+    """Start downloading a few images ahead of the consumer.
+
+    Args:
+        s3 (S3Accessor): The S3 accessor.
+        memes: The memes to download.
+        prefetch (int): The number of downloads started in advance.
+
+    Yields:
+        tuple: The meme and the chunks of its image.
+    """
+    if not hasattr(memes, "__aiter__"):
+        memes = _aiter(memes)
+    pending = deque()
+    try:
+        async for meme in memes:
+            pending.append((meme, asyncio.create_task(s3.download(str(meme.id)))))
+            if len(pending) > prefetch:
+                if item := await _next_download(pending):
+                    yield item
+        while pending:
+            if item := await _next_download(pending):
+                yield item
+    finally:
+        for _, task in pending:
+            task.cancel()
+            if task.done() and not task.cancelled() and not task.exception():
+                await task.result().aclose()
+
+
+async def _next_download(pending: deque) -> Any:
+    meme, task = pending.popleft()
+    try:
+        return meme, await task
+    except S3FileNotFoundException:
+        return None
+
+
+async def _aiter(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def zip_memes(
+    s3: S3Accessor,
+    memes: Union[Iterable[Any], AsyncIterator[Any]],
+    compression: str = "stored",
+    prefetch: int = 4,
+) -> AsyncIterator[bytes]:
+    """Build the ZIP archive of the meme images on the fly.
+
+    The images are named `<id>.jpg`, the titles are written to
+    `manifest.csv` (`name,title`) at the end of the archive. Images missing
+    in S3 are skipped.
+
+    Args:
+        s3 (S3Accessor): The S3 accessor.
+        memes: The memes.
+        compression (str): One of the `COMPRESSION` keys.
+        prefetch (int): The number of downloads started in advance.
+
+    Yields:
+        bytes: The archive chunks.
+    """
+    sink = _Sink()
+    manifest = io.StringIO()
+    titles = csv.writer(manifest)
+    titles.writerow(["name", "title"])
+    with zipfile.ZipFile(sink, "w", compression=COMPRESSION[compression]) as archive:
+        async for meme, chunks in _prefetch(s3, memes, prefetch):
+            name = f"{meme.id}.jpg"
+            info = zipfile.ZipInfo(name, date_time=meme.modified.timetuple()[:6])
+            info.compress_type = COMPRESSION[compression]
+            with archive.open(info, "w") as entry:
+                async for chunk in chunks:
+                    entry.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            titles.writerow([name, meme.title])
+            if data := sink.drain():
+                yield data
+        archive.writestr(MANIFEST, manifest.getvalue())
+    yield sink.drain()
@@ -15,3 +15,11 @@ class TooLargeFileException(ExceptionBase):
 
 class EmptyFileException(ExceptionBase):
     args = ("Файл пустой, либо не был загружен.",)
+
+
+class TooManyIdsException(ExceptionBase):
+    args = ("Слишком много id в одном запросе.",)
+
+
+class TooManyTagsException(ExceptionBase):
+    args = ("Не более 20 тегов длиной до 50 символов.",)
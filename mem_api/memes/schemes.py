@@ -1,9 +1,10 @@
-from typing import Any, Callable, Type, Annotated
+from datetime import datetime
+from typing import Any, Callable, Literal, Optional, Type, Annotated
 from uuid import UUID
 
 import filetype
 from core.settings import FileSettings
-from fastapi import File, Query
+from fastapi import File, Header, Query
 from pydantic import BaseModel, GetJsonSchemaHandler, ConfigDict
 from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import CoreSchema
@@ -15,8 +16,19 @@ from memes.exeptions import (
     InvalidFileTypeException,
     TooLargeFileException,
     EmptyFileException,
+    TooManyTagsException,
 )
 
+MAX_TAGS = 20
+MAX_TAG_LENGTH = 50
+
+IDEMPOTENCY_KEY = Header(
+    default=None,
+    alias="Idempotency-Key",
+    max_length=255,
+    description="unique key of the request, a retry with the same key "
+    "gets the original response",
+)
 PAGE = Query(
     ge=1,
     default=1,
@@ -29,6 +41,73 @@ PAGE_SIZE = Query(
     default=10,
     description="page size",
 )
+DISTANCE = Query(
+    ge=0,
+    le=16,
+    default=10,
+    description="maximum Hamming distance between the image hashes",
+)
+SIMILAR_LIMIT = Query(
+    ge=1,
+    le=100,
+    default=10,
+    description="maximum number of similar memes",
+)
+TAGS = Query(
+    default=None,
+    description="only memes with these tags",
+)
+TAG_MATCH = Query(
+    default="any",
+    description="any (at least one of the tags) or all",
+)
+CURSOR = Query(
+    default=None,
+    description="id from the X-Next-Cursor header of the previous page, "
+    "the page parameter is ignored",
+)
+TAG_LIMIT = Query(
+    ge=1,
+    le=1000,
+    default=100,
+    description="maximum number of tags",
+)
+RANDOM_COUNT = Query(
+    ge=1,
+    le=100,
+    default=1,
+    description="number of random memes",
+)
+EXPORT_FORMAT = Query(
+    default="ndjson",
+    alias="format",
+    description="ndjson or csv",
+)
+SINCE = Query(
+    default=None,
+    description="only memes modified after this time, for incremental exports",
+)
+IDS = Query(
+    default=None,
+    description="meme ids, all memes (modified after since) if not set",
+)
+COMPRESSION = Query(
+    default="stored",
+    description="stored (without compression, jpeg is already compressed) "
+    "or deflated",
+)
+WIDTH = Query(
+    ge=1,
+    le=4096,
+    default=None,
+    description="maximum image width, the proportions are preserved",
+)
+HEIGHT = Query(
+    ge=1,
+    le=4096,
+    default=None,
+    description="maximum image height, the proportions are preserved",
+)
 
 
 class UploadFileSchema(UploadFile):
@@ -113,6 +192,28 @@ class UploadFileSchema(UploadFile):
         return with_info_plain_validator_function(cls.validate)
 
 
+def normalize_tags(tags: Optional[list[str]]) -> Optional[list[str]]:
+    """Lowercase, strip and deduplicate the tags.
+
+    Args:
+        tags (list[str], optional): The tags, a value may also be a comma
+            separated list.
+
+    Returns:
+        list[str]: The sorted unique tags, None if not given.
+
+    Raises:
+        TooManyTagsException: Too many tags or a tag is too long.
+    """
+    if tags is None:
+        return None
+    tags = {tag.strip().lower() for value in tags for tag in value.split(",")}
+    tags.discard("")
+    if len(tags) > MAX_TAGS or any(len(tag) > MAX_TAG_LENGTH for tag in tags):
+        raise TooManyTagsException()
+    return sorted(tags)
+
+
 class OkSchema(BaseModel):
     """
     Pydantic model for returning a successful status response.
@@ -134,4 +235,40 @@ class OkSchema(BaseModel):
 class MemeSchema(BaseModel):
     id: UUID
     title: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    size: Optional[int] = None
+    mime_type: Optional[str] = None
+    views: int = 0
+    tags: list[str] = []
     model_config = ConfigDict(from_attributes=True)
+
+
+class SimilarMemeSchema(MemeSchema):
+    distance: int
+
+
+class TrendingMemeSchema(MemeSchema):
+    score: float
+
+
+class TemplateSchema(BaseModel):
+    name: str
+    width: int
+    height: int
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MemeExportSchema(MemeSchema):
+    modified: datetime
+
+
+class TagCountSchema(BaseModel):
+    tag: str
+    count: int
+    model_config = ConfigDict(from_attributes=True)
+
+
+ExportFormat = Literal["ndjson", "csv"]
+TagMatch = Literal["any", "all"]
+Compression = Literal["stored", "deflated"]
@@ -1,86 +1,411 @@
+import csv
+import io
 import json
-from typing import Annotated, Any
+from datetime import datetime
+from typing import Annotated, Any, AsyncIterator
 from uuid import UUID
 
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 
 from core.app import Request
-from fastapi import APIRouter, File, Form
+from core.settings import ArchiveSettings
+from fastapi import APIRouter, File, Form, Header, UploadFile, status
 
+from memes.archive import zip_memes
+from memes.exeptions import TooManyIdsException
 from memes.schemes import (
+    IDEMPOTENCY_KEY,
     OkSchema,
     UploadFileSchema,
     PAGE,
     PAGE_SIZE,
+    WIDTH,
+    HEIGHT,
+    DISTANCE,
+    SIMILAR_LIMIT,
+    RANDOM_COUNT,
+    TAGS,
+    TAG_MATCH,
+    TAG_LIMIT,
+    CURSOR,
+    EXPORT_FORMAT,
+    SINCE,
+    IDS,
+    COMPRESSION,
+    Compression,
+    ExportFormat,
+    MemeExportSchema,
     MemeSchema,
+    SimilarMemeSchema,
+    TagCountSchema,
+    TagMatch,
+    TemplateSchema,
+    TrendingMemeSchema,
+    normalize_tags,
 )
+from store.images.processing import FORMATS
 
 memes_route = APIRouter(prefix="/memes", tags=["MEMES"])
 
+EXPORT_BATCH = 500
+
+
+async def export_ndjson(memes: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Serialize the memes as JSON lines, in batches."""
+    lines = []
+    async for meme in memes:
+        lines.append(MemeExportSchema.model_validate(meme).model_dump_json())
+        if len(lines) == EXPORT_BATCH:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def export_csv(memes: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    """Serialize the memes as CSV with a header, in batches."""
+    fields = list(MemeExportSchema.model_fields)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    async for meme in memes:
+        writer.writerow(MemeExportSchema.model_validate(meme).model_dump())
+        count += 1
+        if count % EXPORT_BATCH == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
 
 @memes_route.get(
     "",
     summary="Список мемов",
-    description="Получить список мемов",
+    description="Получить список мемов, можно отобрать по тегам. "
+    "Если страница заполнена, в заголовке X-Next-Cursor id для следующей.",
     response_model=list[MemeSchema],
 )
 async def list_memes(
-        request: "Request", page: int = PAGE, page_size: int = PAGE_SIZE
+        request: "Request",
+        response: Response,
+        page: int = PAGE,
+        page_size: int = PAGE_SIZE,
+        tags: list[str] = TAGS,
+        match: TagMatch = TAG_MATCH,
+        cursor: UUID = CURSOR,
 ) -> Any:
-    return await request.app.store.memes.get_memes(
+    memes = await request.app.store.memes.get_memes(
         page_size,
         (page - 1) * page_size,
+        normalize_tags(tags),
+        match,
+        cursor,
+    )
+    if len(memes) == page_size:
+        response.headers["X-Next-Cursor"] = str(memes[-1].id)
+    return memes
+
+
+@memes_route.get(
+    "/export",
+    summary="Выгрузка мемов",
+    description="Потоковая выгрузка всех мемов в формате NDJSON или CSV "
+    "в порядке изменения. Параметр since позволяет выгрузить только изменения.",
+    response_class=StreamingResponse,
+)
+async def export_memes(
+        request: "Request",
+        export_format: ExportFormat = EXPORT_FORMAT,
+        since: datetime = SINCE,
+) -> Any:
+    memes = await request.app.store.memes.iter_memes(since)
+    if export_format == "csv":
+        return StreamingResponse(
+            content=request.app.streams.track(export_csv(memes)),
+            media_type="text/csv",
+        )
+    return StreamingResponse(
+        content=request.app.streams.track(export_ndjson(memes)),
+        media_type="application/x-ndjson",
+    )
+
+
+@memes_route.get(
+    "/archive",
+    summary="Архив мемов",
+    description="Скачать ZIP архив картинок мемов по списку id "
+    "или всех мемов, изменённых после since. Названия мемов в manifest.csv.",
+    response_class=StreamingResponse,
+)
+async def get_memes_archive(
+        request: "Request",
+        ids: list[UUID] = IDS,
+        since: datetime = SINCE,
+        compression: Compression = COMPRESSION,
+) -> Any:
+    settings = ArchiveSettings()
+    if ids:
+        if len(ids) > settings.archive_max_ids:
+            raise TooManyIdsException()
+        memes = await request.app.store.memes.get_memes_by_ids(
+            [str(meme_id) for meme_id in ids]
+        )
+    else:
+        memes = await request.app.store.memes.iter_memes(since)
+    return StreamingResponse(
+        content=request.app.streams.track(
+            zip_memes(
+                request.app.store.s3, memes, compression, settings.archive_prefetch
+            )
+        ),
+        headers={"Content-Disposition": "attachment; filename=memes.zip"},
+        media_type="application/zip",
+    )
+
+
+@memes_route.get(
+    "/trending",
+    summary="Популярные мемы",
+    description="Самые просматриваемые мемы за последнее время. "
+    "Список обновляется раз в несколько секунд.",
+    response_model=list[TrendingMemeSchema],
+)
+async def get_trending_memes(request: "Request") -> Any:
+    return Response(
+        content=request.app.store.trending.snapshot,
+        headers={
+            "Cache-Control": "max-age=%d"
+            % request.app.store.trending.settings.trending_interval
+        },
+        media_type="application/json",
     )
 
 
+@memes_route.get(
+    "/random",
+    summary="Случайные мемы",
+    description="Получить случайные мемы, не более count.",
+    response_model=list[MemeSchema],
+)
+async def get_random_memes(request: "Request", count: int = RANDOM_COUNT) -> Any:
+    return await request.app.store.memes.get_random_memes(count)
+
+
+@memes_route.get(
+    "/tags",
+    summary="Теги мемов",
+    description="Самые популярные теги с числом мемов. "
+    "Числа обновляются раз в минуту.",
+    response_model=list[TagCountSchema],
+)
+async def list_tags(request: "Request", limit: int = TAG_LIMIT) -> Any:
+    return await request.app.store.tags.get_counts(limit)
+
+
+@memes_route.get(
+    "/templates",
+    summary="Шаблоны мемов",
+    description="Список шаблонов для быстрого создания мема",
+    response_model=list[TemplateSchema],
+)
+async def list_templates(request: "Request") -> Any:
+    return list(request.app.store.templates.templates.values())
+
+
 @memes_route.get(
     "/{id}",
     summary="получить мем по id",
-    description="Получить данные о меме по его id ",
+    description="Получить данные о меме по его id. "
+    "Просмотры учитываются в списке мемов с задержкой в несколько секунд. "
+    "Картинку можно уменьшить параметрами width и height, "
+    "формат выбирается по заголовку Accept (avif, webp, jpeg).",
 )
-async def get_meme_by_id(request: "Request", id: UUID) -> Any:
+async def get_meme_by_id(
+        request: "Request",
+        id: UUID,
+        width: int = WIDTH,
+        height: int = HEIGHT,
+        accept: Annotated[str, Header()] = None,
+) -> Any:
     meme = await request.app.store.memes.get_meme_by_id(str(id))
-    meme_data = json.dumps({"text": meme.title})
-    response = StreamingResponse(
-        content=await request.app.store.s3.download(str(meme.id)),
-        headers={
-            "Content-Disposition": f"attachment; filename={meme.id}.jpg",
-            "Content-ID": meme_data,
-        },
+    request.app.store.views.count(meme.id)
+    request.app.store.trending.hit(meme.id)
+    image_format = request.app.store.images.negotiate(accept)
+    extension = "jpg" if image_format == "jpeg" else image_format
+    headers = {
+        "Content-Disposition": f"attachment; filename={meme.id}.{extension}",
+        "Content-ID": json.dumps({"text": meme.title}),
+        "Vary": "Accept",
+    }
+    if width or height or image_format != "jpeg":
+        return Response(
+            content=await request.app.store.images.get_variant(
+                meme, width, height, image_format
+            ),
+            headers=headers,
+            media_type=FORMATS[image_format],
+        )
+    return StreamingResponse(
+        content=request.app.streams.track(
+            await request.app.store.images.download(meme)
+        ),
+        headers=headers,
         media_type="multipart/mixed",
     )
-    return response
+
+
+@memes_route.get(
+    "/{id}/similar",
+    summary="Похожие мемы",
+    description="Найти мемы с похожими картинками, например, повторные публикации",
+    response_model=list[SimilarMemeSchema],
+)
+async def get_similar_memes(
+        request: "Request",
+        id: UUID,
+        distance: int = DISTANCE,
+        limit: int = SIMILAR_LIMIT,
+) -> Any:
+    meme = await request.app.store.memes.get_meme_by_id(str(id))
+    return [
+        SimilarMemeSchema(
+            **MemeSchema.model_validate(similar).model_dump(), distance=bits
+        )
+        for similar, bits in await request.app.store.similar.find_similar(
+            meme, distance, limit
+        )
+    ]
 
 
 @memes_route.post(
     "",
     summary="Добавить мем",
-    description="Добавить новый мем (с картинкой и текстом)",
+    description="Добавить новый мем (с картинкой и текстом). "
+    "Повтор запроса с тем же Idempotency-Key возвращает первый ответ. "
+    "В режиме отложенной загрузки ответ 202: картинка сохранена локально "
+    "и будет загружена в хранилище в фоне.",
     response_model=OkSchema,
 )
 async def add_meme(
         request: "Request",
+        response: Response,
         file: Annotated[UploadFileSchema, File()],
         text: Annotated[str, Form()],
+        tags: Annotated[list[str], Form()] = None,
+        idempotency_key: str = IDEMPOTENCY_KEY,
+) -> Any:
+    content = file.file.read()
+    tags = normalize_tags(tags)
+
+    async def create() -> tuple[int, dict]:
+        if request.app.store.spool.accepts():
+            meme = await request.app.store.spool.add(text, content, tags)
+            status_code = status.HTTP_202_ACCEPTED
+        else:
+            meme = await request.app.store.memes.create_meme(text, tags=tags)
+            await request.app.store.s3.upload(str(meme.id), content)
+            await request.app.store.images.schedule_metadata(str(meme.id))
+            status_code = status.HTTP_200_OK
+        return (
+            status_code,
+            OkSchema(message="Мем добавлен, id: " + str(meme.id)).model_dump(),
+        )
+
+    response.status_code, body = await request.app.store.idempotency.run(
+        idempotency_key,
+        request.app.store.idempotency.fingerprint(
+            request.method,
+            request.url.path,
+            text,
+            content,
+            None if tags is None else ",".join(tags),
+        ),
+        create,
+    )
+    return body
+
+
+@memes_route.post(
+    "/generate",
+    summary="Быстрый мем",
+    description="Создать мем по шаблону: текст сверху и/или снизу картинки. "
+    "Повторный запрос с тем же шаблоном и текстом возвращает уже созданный мем.",
+    response_model=OkSchema,
+)
+async def generate_meme(
+        request: "Request",
+        template: Annotated[str, Form()],
+        top: Annotated[str, Form(max_length=200)] = None,
+        bottom: Annotated[str, Form(max_length=200)] = None,
+        color: Annotated[str, Form(max_length=32)] = "white",
 ) -> Any:
-    meme = await request.app.store.memes.create_meme(text)
-    await request.app.store.s3.upload(str(meme.id), file.file.read())
-    return OkSchema(message="Мем добавлен, id: " + str(meme.id))
+    meme_id = await request.app.store.templates.generate(template, top, bottom, color)
+    return OkSchema(message="Мем создан, id: " + meme_id)
 
 
-@memes_route.put("/{id}", summary="обновить мем", response_model=OkSchema)
+@memes_route.post(
+    "/import",
+    summary="Импорт архива мемов",
+    description="Загрузить zip или tar архив с картинками и manifest.csv "
+    "(name,title). Прерванный импорт продолжается при повторной загрузке "
+    "архива с тем же name.",
+    response_model=OkSchema,
+)
+async def import_memes(
+        request: "Request",
+        archive: Annotated[UploadFile, File()],
+        name: Annotated[str, Form()] = None,
+) -> Any:
+    imported = await request.app.store.imports.import_archive(
+        archive.file, name or archive.filename
+    )
+    return OkSchema(message=f"Импортировано мемов: {imported}")
+
+
+@memes_route.put(
+    "/{id}",
+    summary="обновить мем",
+    description="Обновить текст, теги и/или картинку мема. "
+    "Повтор запроса с тем же Idempotency-Key возвращает первый ответ.",
+    response_model=OkSchema,
+)
 async def update_meme(
         request: "Request",
         id: UUID,
         text: Annotated[str, Form()] = None,
+        tags: Annotated[list[str], Form()] = None,
         file: Annotated[UploadFileSchema, File()] = None,
+        idempotency_key: str = IDEMPOTENCY_KEY,
 ) -> Any:
-    if text:
-        await request.app.store.memes.update_meme(id.hex, text)
-    if file:
-        await request.app.store.s3.upload(str(id), file.file.read())
+    content = file.file.read() if file else None
+    tags = normalize_tags(tags)
 
-    return OkSchema(message="Мем успешно облаплен, id: " + str(id))
+    async def update() -> tuple[int, dict]:
+        if text or tags is not None:
+            await request.app.store.memes.update_meme(id.hex, text, tags)
+        if content is not None:
+            await request.app.store.spool.supersede(str(id))
+            await request.app.store.s3.upload(str(id), content)
+            await request.app.store.memes.touch_meme(id.hex)
+            await request.app.store.images.schedule_metadata(str(id))
+        return (
+            status.HTTP_200_OK,
+            OkSchema(message="Мем успешно облаплен, id: " + str(id)).model_dump(),
+        )
+
+    _, body = await request.app.store.idempotency.run(
+        idempotency_key,
+        request.app.store.idempotency.fingerprint(
+            request.method,
+            request.url.path,
+            text,
+            content,
+            None if tags is None else ",".join(tags),
+        ),
+        update,
+    )
+    return body
 
 
 @memes_route.delete("/{id}", summary="удалить мем", response_model=OkSchema)
@@ -88,6 +413,7 @@ async def delete_mem(
         request: "Request",
         id: UUID,
 ) -> Any:
+    await request.app.store.spool.supersede(str(id))
     await request.app.store.s3.delete(str(id))
     await request.app.store.memes.delete_meme(id)
     return OkSchema(message="Мем успешно удалён, id: " + str(id))
@@ -0,0 +1,117 @@
+"""Startup timing report.
+
+Measures the import of the application modules, the assembly of the
+application, the startup of the accessors and the first request, e.g.
+
+    python startup_report.py --path /memes?page_size=1 --budget 3
+"""
+
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> tuple[float, dict[str, float]]:
+    """Import the module in a new interpreter with `-X importtime`.
+
+    Returns:
+        tuple: The total import time and the import time of every top level
+            package, in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, packages = 0.0, defaultdict(float)
+    for line in result.stderr.splitlines():
+        if match := IMPORT_TIME.match(line):
+            own, cumulative, indent, name = match.groups()
+            packages[name.split(".")[0]] += int(own) / 1e6
+            if name == module:
+                total = int(cumulative) / 1e6
+    return total, packages
+
+
+async def request(app, path: str) -> int:
+    """Send the GET request to the application.
+
+    Returns:
+        int: The status code.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    status = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def main(path: str, top: int, budget: float) -> int:
+    total, packages = import_times("core.setup")
+    print(f"{'import core.setup':<40}{total:>8.3f} s")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {name:<38}{seconds:>8.3f} s")
+
+    started = time.perf_counter()
+    from core.setup import setup_app
+
+    imported = time.perf_counter()
+    app = setup_app()
+    assembled = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        connected = time.perf_counter()
+        status = await request(app, path)
+        responded = time.perf_counter()
+    ready = total + responded - imported
+    print(f"{'import (this process)':<40}{imported - started:>8.3f} s")
+    print(f"{'setup_app':<40}{assembled - imported:>8.3f} s")
+    print(f"{'startup':<40}{connected - assembled:>8.3f} s")
+    print(f"{f'first request {path} ({status})':<40}{responded - connected:>8.3f} s")
+    print(f"{'ready':<40}{ready:>8.3f} s")
+    if budget and ready > budget:
+        print(f"Over the budget of {budget:.3f} s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--path", default="/memes?page_size=1")
+    parser.add_argument("--top", type=int, default=15, help="packages to show")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0,
+        help="fail if the time to the first response exceeds it, in seconds",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.path, args.top, args.budget)))
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import uuid
+from typing import Callable, Optional
+
+import asyncpg
+from sqlalchemy import func, select
+
+from base.base_accessor import BaseAccessor
+from core.settings import BusSettings
+
+Handler = Callable[[str, Optional[str], dict], None]
+FLUSH = "flush"
+
+
+class InvalidationBus(BaseAccessor):
+    """Notifies all the application processes about changes of the memes.
+
+    Write paths publish events with `NOTIFY`, every process holds one
+    dedicated `LISTEN` connection and dispatches the events to the registered
+    handlers, e.g. caches. Events of the own process are dispatched at once
+    and ignored when they come back from Postgres. While the connection is
+    lost events may be missed, so the handlers are flushed on reconnect.
+    Publishing is best effort: a failed `NOTIFY` is logged, the change
+    itself is already committed.
+
+    A handler is called with the kind of change (`create`, `update`,
+    `upload`, `metadata`, `delete` or `flush`), the meme id (None for
+    `flush`) and the extra data of the event.
+    """
+
+    settings: Optional[BusSettings] = None
+
+    def _init(self):
+        self._handlers: list[Handler] = []
+        self._sender = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, handler: Handler):
+        """Register the handler of the events.
+
+        Args:
+            handler (Handler): Called in the event loop, must not block.
+        """
+        self._handlers.append(handler)
+
+    async def publish(self, kind: str, meme_id: str, **data):
+        """Notify all the processes about the change.
+
+        Args:
+            kind (str): The kind of change.
+            meme_id (str): The meme id.
+            data: Extra JSON serializable data of the event.
+        """
+        meme_id = str(uuid.UUID(str(meme_id)))
+        self._dispatch(kind, meme_id, data)
+        payload = json.dumps(
+            {"kind": kind, "id": meme_id, "data": data, "sender": self._sender}
+        )
+        try:
+            await self.app.postgres.query_execute(
+                select(func.pg_notify(self.settings.bus_channel, payload))
+            )
+        except Exception as e:
+            self.logger.error(f"{self.__class__.__name__} cannot publish: {e}")
+
+    async def connect(self):
+        self.settings = BusSettings()
+        self._task = asyncio.create_task(self._listen())
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    async def _listen(self):
+        """Keep the LISTEN connection, restoring it when it is lost."""
+        dsn = self.app.postgres.settings.dsn(True).replace("+asyncpg", "")
+        missed = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(
+                    self.settings.bus_channel, self._on_notification
+                )
+                if missed:
+                    self.logger.info(f"{self.__class__.__name__} reconnected")
+                    self._dispatch(FLUSH, None, {})
+                await closed.wait()
+                self.logger.warning(f"{self.__class__.__name__} connection lost")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                self.logger.warning(f"{self.__class__.__name__} cannot listen: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close(timeout=1)
+            missed = True
+            await asyncio.sleep(self.settings.bus_reconnect_delay)
+
+    def _on_notification(self, _, __, ___, payload: str):
+        event = json.loads(payload)
+        if event["sender"] != self._sender:
+            self._dispatch(event["kind"], event["id"], event["data"])
+
+    def _dispatch(self, kind: str, meme_id: Optional[str], data: dict):
+        for handler in self._handlers:
+            try:
+                handler(kind, meme_id, data)
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} handler failed: {e}")
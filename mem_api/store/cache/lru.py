@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class LRUCache:
+    """In-process LRU cache of byte strings limited by the total size.
+
+    Args:
+        max_bytes (int): The maximum number of bytes kept in the cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: OrderedDict[Hashable, bytes] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Get the value and mark it as recently used.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            bytes: The cached value or None.
+        """
+        if (value := self._data.get(key)) is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: bytes):
+        """Put the value, evicting the least recently used ones if needed.
+
+        Values larger than the whole budget are not cached.
+
+        Args:
+            key (Hashable): The cache key.
+            value (bytes): The value.
+        """
+        if len(value) > self.max_bytes:
+            return
+        self.delete(key)
+        self._data[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= len(evicted)
+
+    def delete(self, key: Hashable):
+        """Remove the value if it is cached.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        if (value := self._data.pop(key, None)) is not None:
+            self.size -= len(value)
+
+    def discard(self, predicate: Callable[[Hashable], bool]):
+        """Remove the values whose keys match the predicate.
+
+        Args:
+            predicate (Callable): Takes the key.
+        """
+        for key in [key for key in self._data if predicate(key)]:
+            self.delete(key)
+
+    def clear(self):
+        """Remove all values."""
+        self._data.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,227 @@
+"""Cache of byte strings in a memory-mapped file shared by processes."""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple, Optional
+
+MAGIC = b"MEMCACHE"
+HEADER = struct.Struct("<8sQQQ")
+HEAD = struct.Struct("<Q")
+HEAD_OFFSET = 8
+SLOT = struct.Struct("<Q16sqQQ")
+HEADER_SIZE = 64
+BUCKET = 8
+PAGE = mmap.PAGESIZE
+READ_RETRIES = 4
+INIT_LOCK = 0
+HEAD_LOCK = 1
+
+
+class Entry(NamedTuple):
+    """A cached value.
+
+    Attributes:
+        view: The value, a view of the shared memory.
+        position: The position of the value in the ring, see `SharedCache.alive`.
+    """
+
+    view: memoryview
+    position: int
+
+
+class SharedCache:
+    """Byte strings cached in a memory-mapped file, e.g. in `/dev/shm`.
+
+    Every process maps the same file. It holds a header, a hash table of
+    slots and a data region used as a ring buffer: new values are written
+    at the head, which overwrites the oldest ones, so the memory never
+    exceeds the budget and nothing has to be freed. Positions in the ring
+    grow monotonically, a value is alive while the head has not passed
+    over it.
+
+    Readers take no locks. Every slot is protected by a sequence counter
+    which is odd while the slot is written, a reader retries when the
+    counter changed during the read. Writers lock the bucket of slots
+    (8 slots) or the head with `fcntl` byte-range locks, so different
+    keys are published concurrently. The value is copied into the ring
+    under the lock of the head: a writer preempted between reserving its
+    position and copying would otherwise be lapped by the ring and
+    overwrite a newer value published at the same offset.
+
+    Values are returned as views of the shared memory without copying.
+    The bytes stay valid until the ring wraps around, values within
+    `margin` bytes of being overwritten are not returned, and users
+    streaming a value should check `alive` after every chunk.
+
+    Args:
+        path (str): The path of the file.
+        size (int): The byte budget of the values.
+        slots (int): The number of slots, the maximum number of values.
+        margin (int, optional): Defaults to a quarter of the size.
+    """
+
+    def __init__(self, path: str, size: int, slots: int, margin: int = None):
+        self.buckets = max(slots // BUCKET, 1)
+        self.data_size = size
+        self.margin = size // 4 if margin is None else margin
+        self.data_offset = (
+            -(-(HEADER_SIZE + self.buckets * BUCKET * SLOT.size) // PAGE) * PAGE
+        )
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._lock(INIT_LOCK):
+            length = self.data_offset + size
+            if (
+                os.fstat(self._fd).st_size != length
+                or (
+                    HEADER.unpack(os.pread(self._fd, HEADER.size, 0))[2:]
+                    != (size, self.buckets)
+                )
+                or os.pread(self._fd, len(MAGIC), 0) != MAGIC
+            ):
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, length)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, 0, size, self.buckets), 0)
+        self._map = mmap.mmap(self._fd, length)
+        self._view = memoryview(self._map)
+
+    def close(self):
+        """Unmap the file, the views returned before must not be used."""
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        os.close(self._fd)
+
+    def get(self, key: str, version: int) -> Optional[Entry]:
+        """Get the value.
+
+        Args:
+            key (str): The key.
+            version (int): The version of the value, other versions are misses.
+
+        Returns:
+            Entry: The value or None.
+        """
+        digest = self._digest(key)
+        for offset in self._slots(digest):
+            slot = self._read_slot(offset)
+            if slot is None:
+                continue
+            _, slot_digest, slot_version, position, length = slot
+            if (
+                slot_digest == digest
+                and slot_version == version
+                and self.alive(position, length, self.margin)
+            ):
+                start = self.data_offset + position % self.data_size
+                return Entry(self._view[start : start + length], position)
+        return None
+
+    def set(self, key: str, version: int, value: bytes):
+        """Put the value, values that do not fit the ring are not cached.
+
+        Args:
+            key (str): The key.
+            version (int): The version of the value.
+            value (bytes): The value.
+        """
+        length = len(value)
+        if not length or length + 8 + self.margin > self.data_size:
+            return
+        with self._lock(HEAD_LOCK):
+            position = self._head()
+            if position % self.data_size + length > self.data_size:
+                position += self.data_size - position % self.data_size
+            HEAD.pack_into(self._map, HEAD_OFFSET, position + (-length % 8) + length)
+            start = self.data_offset + position % self.data_size
+            self._view[start : start + length] = value
+        digest = self._digest(key)
+        with self._lock(self._bucket(digest) + 2):
+            if not self.alive(position, length):
+                return
+            offset = self._choose_slot(digest)
+            self._write_slot(offset, digest, version, position, length)
+
+    def delete(self, key: str):
+        """Remove all the versions of the value.
+
+        Args:
+            key (str): The key.
+        """
+        digest = self._digest(key)
+        with self._lock(self._bucket(digest) + 2):
+            for offset in self._slots(digest):
+                if SLOT.unpack_from(self._map, offset)[1] == digest:
+                    self._write_slot(offset, bytes(16), 0, 0, 0)
+
+    def clear(self):
+        """Remove all the values by moving the head one lap forward."""
+        with self._lock(HEAD_LOCK):
+            head = self._head()
+            HEAD.pack_into(self._map, HEAD_OFFSET, head + self.data_size)
+
+    def alive(self, position: int, length: int, margin: int = 0) -> bool:
+        """Check that the value has not been overwritten.
+
+        Args:
+            position (int): The position of the value.
+            length (int): The number of bytes of the value that must be intact.
+            margin (int, optional): The number of bytes the head must still
+                be away from the value.
+
+        Returns:
+            bool: True if the bytes are intact.
+        """
+        return length > 0 and self._head() + margin <= position + self.data_size
+
+    def _head(self) -> int:
+        return HEAD.unpack_from(self._map, HEAD_OFFSET)[0]
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def _bucket(self, digest: bytes) -> int:
+        return int.from_bytes(digest[:8], "little") % self.buckets
+
+    def _slots(self, digest: bytes) -> range:
+        first = HEADER_SIZE + self._bucket(digest) * BUCKET * SLOT.size
+        return range(first, first + BUCKET * SLOT.size, SLOT.size)
+
+    def _read_slot(self, offset: int) -> Optional[tuple]:
+        for _ in range(READ_RETRIES):
+            slot = SLOT.unpack_from(self._map, offset)
+            if not slot[0] & 1 and HEAD.unpack_from(self._map, offset)[0] == slot[0]:
+                return slot
+        return None
+
+    def _choose_slot(self, digest: bytes) -> int:
+        """The slot with the same key, a free one or the oldest one."""
+        oldest = None
+        for offset in self._slots(digest):
+            _, slot_digest, _, position, length = SLOT.unpack_from(self._map, offset)
+            if slot_digest == digest or not self.alive(position, length):
+                return offset
+            if oldest is None or position < oldest[1]:
+                oldest = (offset, position)
+        return oldest[0]
+
+    def _write_slot(self, offset: int, *fields):
+        sequence = HEAD.unpack_from(self._map, offset)[0]
+        HEAD.pack_into(self._map, offset, sequence + 1)
+        SLOT.pack_into(self._map, offset, sequence + 1, *fields)
+        HEAD.pack_into(self._map, offset, sequence + 2)
+
+    @contextmanager
+    def _lock(self, number: int) -> Iterator[None]:
+        """Exclusive lock of one byte of the file between processes."""
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, number)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, number)
@@ -1,3 +1,9 @@
 """Not deleted this code because it is used in the alembic."""
 
+from store.idempotency.models import IdempotencyModel
+from store.images.models import VariantModel
+from store.imports.models import ImportModel
+from store.jobs.models import JobModel
 from store.memes.models import MemeModel
+from store.trending.models import TrendingModel
+from store.templates.models import GenerationModel
@@ -1,8 +1,31 @@
+import asyncio
+import math
+import time
+from collections import namedtuple
+from contextlib import AsyncExitStack, asynccontextmanager
 from dataclasses import dataclass
+from itertools import count
 
-from typing import Any, Optional, Type, TypeVar, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    NamedTuple,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+)
 
+from asyncpg.exceptions import ConnectionDoesNotExistError, PostgresConnectionError
 from base.base_accessor import BaseAccessor
+from core.context import (
+    DeadlineExceededException,
+    last_write,
+    remaining,
+    timed,
+)
 from core.settings import PostgresSettings
 from sqlalchemy import (
     DATETIME,
@@ -11,6 +34,7 @@ from sqlalchemy import (
     Insert,
     Select,
     MetaData,
+    Table,
     Result,
     TextClause,
     UpdateBase,
@@ -23,6 +47,7 @@ from sqlalchemy import (
     delete,
 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -34,19 +59,34 @@ from sqlalchemy.orm.decl_api import DeclarativeAttributeIntercept, MappedAsDatac
 
 Query = Union[ValuesBase, Select, UpdateBase, Delete, Insert]
 Model = TypeVar("Model", bound=DeclarativeAttributeIntercept)
+Row = tuple
+ResultType = TypeVar("ResultType")
+CONNECTION_ERRORS = (
+    OSError,
+    DBAPIError,
+    ConnectionDoesNotExistError,
+    PostgresConnectionError,
+)
+QUERY_CANCELED = "57014"
+
+
+class Statement(NamedTuple):
+    """Compiled select: SQL, names of the positional parameters, row type."""
+
+    sql: str
+    params: tuple[str, ...]
+    row: Type[Row]
 
 
 @dataclass
 class Base(MappedAsDataclass, DeclarativeBase):
     """Setting up metadata.
 
-    In particular, we specify a schema for storing tables.
+    The tables are declared without a schema, the engines put them into
+    `postgres_schema` when connected, see `Postgres.create_engine`.
     """
 
-    metadata = MetaData(
-        schema=PostgresSettings().postgres_schema,
-        quote_schema=True,
-    )
+    metadata = MetaData()
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True),
         primary_key=True,
@@ -84,30 +124,124 @@ class Postgres(BaseAccessor):
     """Description of the rules for connecting.
 
     PostgresSQL to the Fast-Api application.
+
+    Read-only queries are balanced between the healthy replicas,
+    everything else goes to the primary. After a write the client keeps
+    reading from the primary for `postgres_read_your_writes` seconds,
+    the time of the write is carried by the client, see `ClientMiddleware`.
     """
 
+    stage = 0
     _engine: Optional[AsyncEngine] = None
+    _replicas: tuple[AsyncEngine, ...] = ()
     _db: Optional[Type[DeclarativeBase]] = None
     settings: Optional[PostgresSettings] = None
 
+    def _init(self):
+        self._healthy: set[AsyncEngine] = set()
+        self._round = count()
+        self._health_task: Optional[asyncio.Task] = None
+        self._statements: dict[str, Statement] = {}
+
     async def connect(self):
         """Configuring the connection to the database."""
         self.settings = PostgresSettings()
         self._db = Base
-        self._engine = create_async_engine(
-            self.settings.dsn(True),
-            echo=False,
-            future=True,
+        self._engine = self.create_engine(self.settings.dsn(True))
+        self._replicas = tuple(
+            self.create_engine(dsn.get_secret_value())
+            for dsn in self.settings.postgres_replicas
+        )
+        self._healthy = set(self._replicas)
+        primary, *replicas = await asyncio.gather(
+            *(self._warm_up(engine) for engine in (self._engine, *self._replicas)),
+            return_exceptions=True,
+        )
+        if isinstance(primary, BaseException):
+            raise primary
+        for engine, error in zip(self._replicas, replicas):
+            if isinstance(error, BaseException):
+                self.logger.warning(f"Replica {engine.url} is unhealthy: {error}")
+                self._healthy.discard(engine)
+        if self._replicas:
+            self._health_task = asyncio.create_task(self._check_replicas())
+        self.logger.info(
+            f"{self.__class__.__name__} {self.settings.dsn()} connected, "
+            f"replicas: {len(self._replicas)}"
         )
-        self.logger.info(f"{self.__class__.__name__} {self.settings.dsn()} connected")
 
     async def disconnect(self):
         """Closing the connection to the database."""
-        if self._engine:
-            await self._engine.dispose()
+        if self._health_task:
+            self._health_task.cancel()
+        for engine in (self._engine, *self._replicas):
+            if engine:
+                await engine.dispose()
 
         self.logger.info(f"{self.__class__.__name__} disconnected")
 
+    def create_engine(self, dsn: str) -> AsyncEngine:
+        """Create the engine of the database.
+
+        The tables of the models are put into `postgres_schema`.
+
+        Args:
+            dsn: The connection URL
+
+        Returns:
+            AsyncEngine: the engine
+        """
+        return create_async_engine(
+            dsn,
+            echo=False,
+            future=True,
+            pool_size=self.settings.postgres_pool_size,
+            max_overflow=self.settings.postgres_max_overflow,
+            execution_options={"schema_translate_map": self.schema_map},
+        )
+
+    @property
+    def schema_map(self) -> dict[None, str]:
+        return {None: self.settings.postgres_schema}
+
+    def full_name(self, table: Table) -> str:
+        """The name of the table with the schema, for the raw SQL.
+
+        Args:
+            table: The table
+
+        Returns:
+            str: the quoted schema and the table name
+        """
+        return f'"{self.settings.postgres_schema}".{table.name}'
+
+    async def _warm_up(self, engine: AsyncEngine):
+        """Open `postgres_warm_connections` connections of the pool in advance."""
+        count = min(
+            self.settings.postgres_warm_connections, self.settings.postgres_pool_size
+        )
+        async with AsyncExitStack() as stack:
+            await asyncio.gather(
+                *(stack.enter_async_context(engine.connect()) for _ in range(count))
+            )
+
+    async def ping(self):
+        """Check the primary with `SELECT 1`, through the pool."""
+        async with self._engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    def saturation(self) -> float:
+        """The share of the connections of the primary pool in use.
+
+        Returns:
+            float: From 0 to 1, 1 when the requests wait for a connection.
+        """
+        if self._engine is None:
+            return 0.0
+        return self._engine.pool.checkedout() / (
+            self.settings.postgres_pool_size + self.settings.postgres_max_overflow
+        )
+
     @property
     def session(self) -> AsyncSession:
         """Get the async session for the database.
@@ -115,7 +249,63 @@ class Postgres(BaseAccessor):
         Returns:
             AsyncSession: the async session for the database
         """
-        return async_sessionmaker(bind=self._engine, expire_on_commit=False)()
+        return self.get_session(self._engine)
+
+    @staticmethod
+    def get_session(engine: AsyncEngine) -> AsyncSession:
+        """Get the async session bound to the engine.
+
+        Args:
+            engine: The primary or a replica engine
+
+        Returns:
+            AsyncSession: the async session
+        """
+        return async_sessionmaker(bind=engine, expire_on_commit=False)()
+
+    def get_engine(self, read_only: bool = False) -> AsyncEngine:
+        """Choose the engine for the query.
+
+        Args:
+            read_only: Whether the query only reads data
+
+        Returns:
+            AsyncEngine: a healthy replica or the primary
+        """
+        if not read_only or not self._healthy:
+            return self._engine
+        current = last_write.get()
+        if current and time.time() - current.time < (
+            self.settings.postgres_read_your_writes
+        ):
+            return self._engine
+        healthy = [engine for engine in self._replicas if engine in self._healthy]
+        return healthy[next(self._round) % len(healthy)]
+
+    def _remember_write(self):
+        """Pin the current client to the primary, only needed with replicas."""
+        if self._replicas and (current := last_write.get()):
+            current.time, current.changed = time.time(), True
+
+    async def _check_replicas(self):
+        """Periodically check the replicas."""
+        while True:
+            for engine in self._replicas:
+                try:
+                    async with engine.connect() as connection:
+                        await asyncio.wait_for(
+                            connection.execute(text("SELECT 1")),
+                            self.settings.postgres_health_interval,
+                        )
+                except Exception as e:
+                    if engine in self._healthy:
+                        self.logger.warning(f"Replica {engine.url} is unhealthy: {e}")
+                    self._healthy.discard(engine)
+                else:
+                    if engine not in self._healthy:
+                        self.logger.info(f"Replica {engine.url} is healthy")
+                    self._healthy.add(engine)
+            await asyncio.sleep(self.settings.postgres_health_interval)
 
     @staticmethod
     def get_query_insert(model: Model, **insert_data) -> Query:
@@ -131,16 +321,16 @@ class Postgres(BaseAccessor):
         return insert(model).values(**insert_data)
 
     @staticmethod
-    def get_query_select(model: Model) -> Query:
+    def get_query_select(*models: Model) -> Query:
         """Get query select.
 
         Args:
-            model: Table model
+            models: Table models or columns
 
         Returns:
             object: query
         """
-        return select(model)
+        return select(*models)
 
     @staticmethod
     def get_query_update(model: Model, **update_data) -> Query:
@@ -150,16 +340,167 @@ class Postgres(BaseAccessor):
     def get_query_delete(model: Model) -> Query:
         return delete(model)
 
-    async def query_execute(self, query: Union[Query, TextClause]) -> Result[Any]:
+    async def query_execute(
+        self, query: Union[Query, TextClause], read_only: bool = False
+    ) -> Result[Any]:
         """Query execute.
 
         Args:
             query: CRUD query for Database
+            read_only: Whether the query may be executed on a replica
 
         Returns:
               Any: result of query
         """
-        async with self.session as session:
-            result = await session.execute(query)
+        return await self._route(read_only, lambda engine: self._execute(engine, query))
+
+    async def fetch(
+        self,
+        name: str,
+        build: Callable[[], Select],
+        read_only: bool = True,
+        **params,
+    ) -> list[Row]:
+        """Execute the select directly on the asyncpg connection.
+
+        The fast path for hot queries: the statement is built and compiled
+        once per process, asyncpg prepares it once per connection,
+        rows are returned as named tuples without ORM hydration.
+
+        Args:
+            name: Unique name of the statement in the cache
+            build: Builds the select with named `bindparam` parameters
+            read_only: Whether the query may be executed on a replica
+            params: Values of the parameters
+
+        Returns:
+            list[Row]: named tuples with the selected columns
+        """
+        if (statement := self._statements.get(name)) is None:
+            statement = self._statements[name] = self.compile(build())
+        args = [params[key] for key in statement.params]
+
+        async def execute(engine: AsyncEngine) -> list[Row]:
+            async with engine.connect() as connection:
+                raw = await connection.get_raw_connection()
+                records = await raw.driver_connection.fetch(
+                    statement.sql, *args, timeout=remaining()
+                )
+            return [statement.row(*record.values()) for record in records]
+
+        return await self._route(read_only, execute)
+
+    @asynccontextmanager
+    async def raw_connection(self) -> AsyncIterator[Any]:
+        """Get the asyncpg connection to the primary from the pool.
+
+        For the driver features not available through SQLAlchemy, e.g. COPY.
+
+        Yields:
+            asyncpg.Connection: the connection
+        """
+        self._remember_write()
+        async with self._engine.connect() as connection:
+            raw = await connection.get_raw_connection()
+            yield raw.driver_connection
+
+    async def stream(
+        self, query: Select, read_only: bool = True, batch_size: int = 1000
+    ) -> AsyncIterator[Row]:
+        """Iterate over the rows of the select using a server-side cursor.
+
+        Only `batch_size` rows are held in memory at a time.
+
+        Args:
+            query: The select
+            read_only: Whether the query may be executed on a replica
+            batch_size: The number of rows fetched from the cursor at once
+
+        Yields:
+            Row: the selected rows
+        """
+        engine = self.get_engine(read_only)
+        async with engine.connect() as connection:
+            result = await connection.stream(
+                query.execution_options(yield_per=batch_size)
+            )
+            async for partition in result.partitions():
+                for row in partition:
+                    yield row
+
+    def compile(self, query: Select) -> Statement:
+        """Compile the select for the asyncpg driver.
+
+        Args:
+            query: select with named `bindparam` parameters
+
+        Returns:
+            Statement: the compiled statement
+        """
+        compiled = query.compile(
+            dialect=self._engine.dialect,
+            schema_translate_map=self.schema_map,
+            render_schema_translate=True,
+        )
+        return Statement(
+            sql=str(compiled),
+            params=tuple(compiled.positiontup or ()),
+            row=namedtuple("Row", [column.key for column in query.selected_columns]),
+        )
+
+    async def _route(
+        self,
+        read_only: bool,
+        execute: Callable[[AsyncEngine], Awaitable[ResultType]],
+    ) -> ResultType:
+        """Execute on the chosen engine, falling back to the primary.
+
+        Args:
+            read_only: Whether the query may be executed on a replica
+            execute: Executes the query on the engine
+
+        Returns:
+            the result of `execute`
+        """
+        with timed("db"):
+            engine = self.get_engine(read_only)
+            if engine is self._engine:
+                if not read_only:
+                    self._remember_write()
+                return await execute(engine)
+            try:
+                return await execute(engine)
+            except CONNECTION_ERRORS as e:
+                if isinstance(e, DBAPIError) and not e.connection_invalidated:
+                    raise
+                if isinstance(e, TimeoutError):
+                    # the deadline of the request, no time left for the primary
+                    raise
+                self.logger.warning(
+                    f"Replica {engine.url} failed, using the primary: {e}"
+                )
+                self._healthy.discard(engine)
+                return await execute(self._engine)
+
+    async def _execute(
+        self, engine: AsyncEngine, query: Union[Query, TextClause]
+    ) -> Result[Any]:
+        """Execute the query in a transaction.
+
+        Within a request deadline the statement timeout of the transaction
+        is set to the time left, so Postgres stops the query itself.
+        """
+        async with self.get_session(engine) as session:
+            if (timeout := remaining()) is not None:
+                await session.execute(
+                    text("SELECT set_config('statement_timeout', :timeout, true)"),
+                    {"timeout": f"{math.ceil(timeout * 1000)}ms"},
+                )
+            try:
+                result = await session.execute(query)
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) == QUERY_CANCELED:
+                    raise DeadlineExceededException(exception=e)
+                raise
             await session.commit()
             return result
@@ -0,0 +1,79 @@
+import math
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing backend for a while.
+
+    The breaker opens when at least `threshold` of the last `window` calls
+    failed. An open breaker rejects the calls for `cooldown` seconds, then
+    lets one probe call through: its success closes the breaker, its failure
+    opens it again.
+
+    Args:
+        threshold (float): The failure rate opening the breaker.
+        window (int): The number of recent calls considered.
+        min_calls (int): The number of calls needed to judge the rate.
+        cooldown (float): Seconds the breaker stays open.
+    """
+
+    def __init__(self, threshold: float, window: int, min_calls: int, cooldown: float):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._calls: deque[bool] = deque(maxlen=window)
+        self._opened = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether the call may go to the backend."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self._opened >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker lets a call through again, at least 1."""
+        if self.state != OPEN:
+            return 1
+        left = self.cooldown - (time.monotonic() - self._opened)
+        return max(math.ceil(left), 1)
+
+    def record(self, failed: bool):
+        """Record the outcome of an allowed call.
+
+        Args:
+            failed (bool): Whether the backend failed.
+        """
+        if self.state != CLOSED:
+            self._probing = False
+            if failed:
+                self._open()
+            else:
+                self.state = CLOSED
+                self._calls.clear()
+            return
+        self._calls.append(failed)
+        if len(self._calls) >= self.min_calls and sum(
+            self._calls
+        ) >= self.threshold * len(self._calls):
+            self._open()
+
+    def cancel(self):
+        """Forget an allowed call that was cancelled without an outcome."""
+        self._probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self._opened = time.monotonic()
+        self._calls.clear()
@@ -0,0 +1,13 @@
+from base.base_exception import ExceptionBase
+from starlette import status
+
+
+class GuardRejectedException(ExceptionBase):
+    """The call was not made, the backend is overloaded or failing."""
+
+    args = ("Сервис перегружен. Повторите попытку позже.",)
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def __init__(self, *args, retry_after: int = 1, exception: Exception = None):
+        super().__init__(*args, exception=exception)
+        self.headers = {"Retry-After": str(retry_after)}
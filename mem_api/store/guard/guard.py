@@ -0,0 +1,114 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator, Type
+
+from core.context import DeadlineExceededException, remaining
+from core.metrics import Counter, Gauge
+from core.settings import GuardSettings
+from store.guard.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from store.guard.exeptions import GuardRejectedException
+from store.guard.limiter import AdaptiveLimiter
+
+LIMIT = Gauge("memes_backend_limit", "Adaptive concurrency limit of the backend.")
+IN_FLIGHT = Gauge("memes_backend_in_flight", "Calls to the backend in progress.")
+BREAKER = Gauge(
+    "memes_backend_breaker", "Circuit breaker state: 0 closed, 1 half open, 2 open."
+)
+STATES = (CLOSED, HALF_OPEN, OPEN)
+REJECTED = Counter(
+    "memes_backend_rejected_total", "Calls rejected without calling the backend."
+)
+
+
+class Guard:
+    """Adaptive concurrency limit and circuit breaker of one backend.
+
+    Args:
+        backend (str): The backend name, a label of the metrics.
+        latency (float): Seconds, slower calls decrease the concurrency limit.
+        settings (GuardSettings): The limits.
+    """
+
+    def __init__(self, backend: str, latency: float, settings: GuardSettings):
+        self.backend = backend
+        self.limiter = AdaptiveLimiter(
+            latency,
+            settings.guard_initial_limit,
+            settings.guard_min_limit,
+            settings.guard_max_limit,
+        )
+        self.breaker = CircuitBreaker(
+            settings.guard_error_threshold,
+            settings.guard_window,
+            settings.guard_min_calls,
+            settings.guard_cooldown,
+        )
+
+    @contextmanager
+    def track(
+        self, rejected: Type[GuardRejectedException], *harmless: Type[BaseException]
+    ) -> Iterator[None]:
+        """Guard the call to the backend.
+
+        A cancelled call frees its slot without counting as a success or
+        a failure. So does a call cut off by the deadline of the request
+        if the time left was shorter than the latency threshold: clients
+        sending tiny deadlines cannot open the breaker for everyone, while
+        a backend hanging past a longer deadline counts as failed.
+
+        Args:
+            rejected (Type[GuardRejectedException]): Raised when the call
+                is not allowed, `503` with `Retry-After`.
+            harmless: Exceptions that are not failures of the backend,
+                e.g. not found.
+
+        Raises:
+            Exception: `rejected` if the limit is reached or the breaker is open.
+        """
+        budget = remaining()
+        if not self.limiter.acquire():
+            REJECTED.inc(backend=self.backend, reason="limit")
+            raise rejected(retry_after=1)
+        if not self.breaker.allow():
+            self.limiter.release()
+            REJECTED.inc(backend=self.backend, reason="breaker")
+            self._report()
+            raise rejected(retry_after=self.breaker.retry_after())
+        self._report()
+        started = time.monotonic()
+        try:
+            yield
+        except DeadlineExceededException:
+            if budget is not None and budget < self.limiter.latency:
+                # the budget of the client was too short to judge the backend
+                self._cancel()
+            else:
+                self._done(started, failed=True)
+            raise
+        except asyncio.CancelledError:
+            self._cancel()
+            raise
+        except harmless:
+            self._done(started, failed=False)
+            raise
+        except BaseException:
+            self._done(started, failed=True)
+            raise
+        else:
+            self._done(started, failed=False)
+
+    def _done(self, started: float, failed: bool):
+        self.limiter.release(time.monotonic() - started, failed)
+        self.breaker.record(failed)
+        self._report()
+
+    def _cancel(self):
+        self.limiter.release()
+        self.breaker.cancel()
+        self._report()
+
+    def _report(self):
+        LIMIT.set(int(self.limiter.limit), backend=self.backend)
+        IN_FLIGHT.set(self.limiter.in_flight, backend=self.backend)
+        BREAKER.set(STATES.index(self.breaker.state), backend=self.backend)
@@ -0,0 +1,58 @@
+class AdaptiveLimiter:
+    """Concurrency limit adapted to the latency of the backend (AIMD).
+
+    The limit grows by one per `limit` fast calls while it is used at least
+    by half, and is multiplied by `backoff` after a slow or failed call.
+    Calls above the limit are rejected at once instead of queueing behind
+    a slow backend.
+
+    Args:
+        latency (float): Seconds, calls slower than that decrease the limit.
+        initial (int): The initial limit.
+        minimum (int): The lowest limit.
+        maximum (int): The highest limit.
+        backoff (float): The multiplier of the limit after a slow call.
+    """
+
+    def __init__(
+        self,
+        latency: float,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        backoff: float = 0.9,
+    ):
+        self.latency = latency
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+
+    def acquire(self) -> bool:
+        """Take a slot.
+
+        Returns:
+            bool: False if the limit is reached.
+        """
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, elapsed: float = None, failed: bool = False):
+        """Free the slot and adapt the limit.
+
+        Args:
+            elapsed (float, optional): Seconds the call took, None to free
+                the slot without adapting, e.g. the call was cancelled.
+            failed (bool): Whether the backend failed.
+        """
+        used = self.in_flight
+        self.in_flight -= 1
+        if elapsed is None:
+            return
+        if failed or elapsed > self.latency:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+        elif used * 2 >= self.limit:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
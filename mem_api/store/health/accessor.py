@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Optional
+
+from base.base_accessor import BaseAccessor
+from core.metrics import Gauge
+from core.settings import HealthSettings
+
+HEALTHY = Gauge("memes_backend_healthy", "Result of the last health check: 1 ok.")
+SATURATION = Gauge(
+    "memes_pool_saturation", "Share of the Postgres pool connections in use."
+)
+
+
+class HealthAccessor(BaseAccessor):
+    """Readiness of the application.
+
+    Postgres and S3 are checked in the background every `health_interval`
+    seconds, the probes of the orchestrator only read the last results,
+    so frequent probes never reach the backends. The application is ready
+    when the last checks passed, they are not older than `health_ttl` and
+    the Postgres pool is not saturated, so the load balancer sheds the
+    traffic before the requests start waiting for connections.
+    """
+
+    settings: Optional[HealthSettings] = None
+
+    def _init(self):
+        self.checks: dict[str, str] = {}
+        self.checked: float = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        self.settings = HealthSettings()
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.checks, self.checked = {}, 0.0
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    async def check(self):
+        """Check the backends concurrently and remember the results."""
+        backends = {"postgres": self.app.postgres, "s3": self.app.store.s3}
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(backend.ping(), self.settings.health_timeout)
+                for backend in backends.values()
+            ),
+            return_exceptions=True,
+        )
+        checks = {}
+        for name, result in zip(backends, results):
+            if isinstance(result, BaseException):
+                checks[name] = f"{result.__class__.__name__}: {result}"
+                if self.checks.get(name) == "ok":
+                    self.logger.warning(f"{name} is unhealthy: {checks[name]}")
+            else:
+                checks[name] = "ok"
+            HEALTHY.set(int(checks[name] == "ok"), backend=name)
+        self.checks, self.checked = checks, time.monotonic()
+
+    def report(self) -> tuple[bool, dict]:
+        """The readiness, computed without calling the backends.
+
+        Returns:
+            tuple: Whether the application is ready and the details.
+        """
+        age = time.monotonic() - self.checked
+        saturation = self.app.postgres.saturation()
+        SATURATION.set(round(saturation, 3), backend="postgres")
+        ready = (
+            bool(self.checks)
+            and all(result == "ok" for result in self.checks.values())
+            and age <= self.settings.health_ttl
+            and saturation < self.settings.health_saturation
+        )
+        return ready, {
+            "status": "ready" if ready else "unavailable",
+            "checks": self.checks,
+            "age": round(age, 3) if self.checks else None,
+            "saturation": {"postgres": round(saturation, 3)},
+        }
+
+    async def _run(self):
+        """Check the backends periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.settings.health_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} check failed: {e}")
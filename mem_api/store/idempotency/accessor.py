@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional, Union
+
+from sqlalchemy import func, null
+from sqlalchemy.dialects.postgresql import insert
+
+from base.base_accessor import BaseAccessor
+from core.settings import IdempotencySettings
+from store.idempotency.exeptions import (
+    IdempotencyKeyInProgressException,
+    IdempotencyKeyMismatchException,
+)
+from store.idempotency.models import IdempotencyModel
+
+Handler = Callable[[], Awaitable[tuple[int, dict]]]
+CLEANUP_INTERVAL = 3600
+
+
+class IdempotencyAccessor(BaseAccessor):
+    """Executes a request once per `Idempotency-Key`.
+
+    The first request with the key claims it in Postgres with
+    `INSERT ... ON CONFLICT`, runs the handler and stores the status code
+    and the body of the response,
+    which is then replayed to the retries until the TTL expires. Retries
+    arriving while the first request is running wait for it: in the same
+    process on a future, in other processes by polling the row. The claim
+    of a crashed process expires after `idempotency_lock` seconds.
+    Completed responses are also kept in a small in-memory cache.
+    """
+
+    settings: Optional[IdempotencySettings] = None
+
+    def _init(self):
+        self._cache: OrderedDict[str, tuple[str, tuple[int, dict], float]] = (
+            OrderedDict()
+        )
+        self._running: dict[str, asyncio.Future] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        self.settings = IdempotencySettings()
+        self._cleanup_task = asyncio.create_task(self._cleanup())
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        if self._cleanup_task:
+            self._cleanup_task.cancel()
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    @staticmethod
+    def fingerprint(*parts: Union[str, bytes, None]) -> str:
+        """The digest of the request, the same key must not be reused for another.
+
+        Args:
+            parts: The method, the path and the data of the request.
+
+        Returns:
+            str: The hex digest.
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            part = b"" if part is None else part
+            part = part.encode() if isinstance(part, str) else part
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    async def run(
+        self, key: Optional[str], fingerprint: str, handler: Handler
+    ) -> tuple[int, dict]:
+        """Run the handler once for the key.
+
+        Args:
+            key (str, optional): The `Idempotency-Key` header, the handler
+                is simply called without it.
+            fingerprint (str): The fingerprint of the request.
+            handler (Handler): Makes the status code and the body
+                of the response.
+
+        Returns:
+            tuple[int, dict]: The response, the stored one for a repeated request.
+        """
+        if key is None:
+            return await handler()
+        deadline = time.monotonic() + self.settings.idempotency_wait
+        while True:
+            if (response := self._cached(key, fingerprint)) is not None:
+                return response
+            if running := self._running.get(key):
+                await asyncio.wait([running], timeout=self._left(deadline))
+                continue
+            if await self._claim(key, fingerprint):
+                return await self._execute(key, fingerprint, handler)
+            if (response := await self._stored(key, fingerprint)) is not None:
+                return response
+            await asyncio.sleep(
+                min(self.settings.idempotency_poll, self._left(deadline))
+            )
+
+    async def _execute(
+        self, key: str, fingerprint: str, handler: Handler
+    ) -> tuple[int, dict]:
+        running = self._running[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await handler()
+        except BaseException:
+            query = self.app.postgres.get_query_delete(IdempotencyModel).where(
+                IdempotencyModel.key == key
+            )
+            await asyncio.shield(self.app.postgres.query_execute(query))
+            raise
+        else:
+            query = self.app.postgres.get_query_update(
+                IdempotencyModel,
+                response={"status_code": response[0], "body": response[1]},
+                expires=self._expires(self.settings.idempotency_ttl),
+            ).where(IdempotencyModel.key == key)
+            await self.app.postgres.query_execute(query)
+            self._remember(key, fingerprint, response)
+            return response
+        finally:
+            del self._running[key]
+            running.set_result(None)
+
+    async def _claim(self, key: str, fingerprint: str) -> bool:
+        """Insert the key, or take over its expired row."""
+        values = {
+            "key": key,
+            "fingerprint": fingerprint,
+            "response": null(),
+            "expires": self._expires(self.settings.idempotency_lock),
+        }
+        query = (
+            insert(IdempotencyModel)
+            .values(**values)
+            .on_conflict_do_update(
+                index_elements=[IdempotencyModel.key],
+                set_=values,
+                where=IdempotencyModel.expires < func.current_timestamp(),
+            )
+            .returning(IdempotencyModel.id)
+        )
+        result = await self.app.postgres.query_execute(query)
+        return result.scalar_one_or_none() is not None
+
+    async def _stored(self, key: str, fingerprint: str) -> Optional[tuple[int, dict]]:
+        """The response stored by another request with the key."""
+        query = self.app.postgres.get_query_select(
+            IdempotencyModel.fingerprint, IdempotencyModel.response
+        ).where(IdempotencyModel.key == key)
+        row = (await self.app.postgres.query_execute(query)).one_or_none()
+        if row is None:
+            return None
+        if row.fingerprint != fingerprint:
+            raise IdempotencyKeyMismatchException()
+        if row.response is None:
+            return None
+        response = row.response["status_code"], row.response["body"]
+        self._remember(key, fingerprint, response)
+        return response
+
+    def _cached(self, key: str, fingerprint: str) -> Optional[tuple[int, dict]]:
+        if (cached := self._cache.get(key)) is None:
+            return None
+        cached_fingerprint, response, expires = cached
+        if expires < time.monotonic():
+            del self._cache[key]
+            return None
+        if cached_fingerprint != fingerprint:
+            raise IdempotencyKeyMismatchException()
+        self._cache.move_to_end(key)
+        return response
+
+    def _remember(self, key: str, fingerprint: str, response: tuple[int, dict]):
+        self._cache[key] = (
+            fingerprint,
+            response,
+            time.monotonic() + self.settings.idempotency_ttl,
+        )
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.settings.idempotency_cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _left(deadline: float) -> float:
+        if (left := deadline - time.monotonic()) <= 0:
+            raise IdempotencyKeyInProgressException()
+        return left
+
+    @staticmethod
+    def _expires(seconds: int):
+        return func.current_timestamp() + timedelta(seconds=seconds)
+
+    async def _cleanup(self):
+        """Periodically delete the expired keys."""
+        while True:
+            try:
+                query = self.app.postgres.get_query_delete(IdempotencyModel).where(
+                    IdempotencyModel.expires < func.current_timestamp()
+                )
+                await self.app.postgres.query_execute(query)
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} cleanup failed: {e}")
+            await asyncio.sleep(CLEANUP_INTERVAL)
@@ -0,0 +1,9 @@
+from base.base_exception import ExceptionBase
+
+
+class IdempotencyKeyMismatchException(ExceptionBase):
+    args = ("Idempotency-Key уже использован для другого запроса.",)
+
+
+class IdempotencyKeyInProgressException(ExceptionBase):
+    args = ("Запрос с этим Idempotency-Key ещё выполняется, повторите позже.",)
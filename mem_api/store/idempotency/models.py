@@ -0,0 +1,16 @@
+from typing import Optional
+
+from sqlalchemy import DATETIME, TIMESTAMP, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from store.database.postgres import Base
+
+
+class IdempotencyModel(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("ix_idempotency_keys_expires", "expires"),)
+
+    key: Mapped[str] = mapped_column(init=False, unique=True)
+    fingerprint: Mapped[str] = mapped_column(init=False)
+    response: Mapped[Optional[dict]] = mapped_column(JSONB, init=False)
+    expires: Mapped[DATETIME] = mapped_column(TIMESTAMP, init=False)
@@ -0,0 +1,287 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql import insert
+
+from base.base_accessor import BaseAccessor
+from core.settings import CacheSettings, ImageSettings
+from store.bus.accessor import FLUSH
+from store.cache.lru import LRUCache
+from store.cache.shared import Entry, SharedCache
+from store.images.exeptions import (
+    ImageCacheOverwrittenException,
+    ImageProcessingException,
+)
+from store.images.models import VariantModel
+from store.images.processing import (
+    ENCODERS,
+    FORMATS,
+    extract_metadata,
+    render_variant,
+)
+from store.memes.exeptions import MemNotFoundException
+from store.memes.models import PENDING, MemeModel
+from store.s3.accessor import CHUNK_SIZE
+from store.s3.exeptions import S3FileNotFoundException
+
+ORIGINAL_FORMAT = "jpeg"
+METADATA_JOB = "extract_metadata"
+VARIANTS_JOB = "delete_variants"
+
+
+class ImageAccessor(BaseAccessor):
+    """Resized and re-encoded variants of the meme images.
+
+    CPU-bound work runs in a process pool. Generated variants are cached
+    locally and in S3, the key includes the version of the original,
+    so updating the image makes the old variants unreachable. The variants
+    stored in S3 are recorded in Postgres and deleted by a background job
+    when the image is replaced or the meme is deleted. Hot originals
+    are kept in a cache shared by all the worker processes on the host.
+    """
+
+    settings: Optional[ImageSettings] = None
+    cache_settings: Optional[CacheSettings] = None
+    cache: Optional[LRUCache] = None
+    hot: Optional[SharedCache] = None
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    async def connect(self):
+        self.settings = ImageSettings()
+        self.cache_settings = CacheSettings()
+        self.cache = LRUCache(self.settings.image_cache_size)
+        if self.cache_settings.cache_size:
+            self.hot = SharedCache(
+                self.cache_settings.cache_path,
+                self.cache_settings.cache_size,
+                self.cache_settings.cache_slots,
+            )
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.settings.image_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    def invalidate(self, kind: str, meme_id: Optional[str], _: dict):
+        """Invalidation bus handler, drops the cached copies of the changed image."""
+        if self.cache is None:
+            return
+        if kind == FLUSH:
+            self.cache.clear()
+        elif kind in ("upload", "delete"):
+            self.cache.discard(lambda key: key[0] == meme_id)
+            if self.hot:
+                self.hot.delete(meme_id)
+
+    async def disconnect(self):
+        if self._pool:
+            self._pool.shutdown(cancel_futures=True)
+        if self.hot:
+            self.hot.close()
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Execute the function in the image process pool.
+
+        Args:
+            func (Callable): A picklable module level function.
+            args: The function arguments.
+
+        Returns:
+            Any: The function result.
+        """
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, func, *args
+            )
+        except Exception as e:
+            raise ImageProcessingException(exception=e)
+
+    @staticmethod
+    def negotiate(accept: Optional[str]) -> str:
+        """Choose the most compact format accepted by the client.
+
+        Only formats explicitly listed in the `Accept` header are chosen,
+        otherwise the original format is kept.
+
+        Args:
+            accept (str, optional): The `Accept` header.
+
+        Returns:
+            str: One of the `FORMATS` keys.
+        """
+        accepted = set()
+        for media_range in (accept or "").lower().split(","):
+            media_type, *params = [part.strip() for part in media_range.split(";")]
+            if "q=0" not in params and "q=0.0" not in params:
+                accepted.add(media_type)
+        for image_format in ("avif", "webp"):
+            if image_format in ENCODERS and FORMATS[image_format] in accepted:
+                return image_format
+        return ORIGINAL_FORMAT
+
+    @staticmethod
+    def version(meme: MemeModel) -> str:
+        """The version of the original image."""
+        return meme.modified.strftime("%Y%m%d%H%M%S%f")
+
+    async def download(self, meme: MemeModel) -> AsyncIterator[bytes]:
+        """Get the original image.
+
+        Images not uploaded yet are read from the spool, hot images
+        from the shared cache.
+
+        Args:
+            meme (MemeModel): The meme.
+
+        Returns:
+            AsyncIterator[bytes]: The chunks of the image.
+        """
+        meme_id = str(meme.id)
+        if content := await self._spooled(meme):
+            return self._read_spooled(content)
+        version = int(meme.modified.timestamp() * 1000000)
+        if self.hot and (entry := self.hot.get(meme_id, version)):
+            return self._read_cached(entry)
+        return self._read_and_cache(
+            meme_id, version, await self.app.store.s3.download(meme_id)
+        )
+
+    async def _spooled(self, meme: MemeModel) -> Optional[bytes]:
+        if meme.state == PENDING:
+            return await self.app.store.spool.read(str(meme.id))
+        return None
+
+    @staticmethod
+    async def _read_spooled(content: bytes) -> AsyncIterator[bytes]:
+        yield content
+
+    async def _read_cached(self, entry: Entry) -> AsyncIterator[bytes]:
+        """Copy the chunks out of the shared memory.
+
+        A chunk is checked after it was copied, the image could be
+        overwritten by another process in the meantime.
+        """
+        for start in range(0, len(entry.view), CHUNK_SIZE):
+            chunk = bytes(entry.view[start : start + CHUNK_SIZE])
+            if not self.hot.alive(entry.position, len(entry.view)):
+                raise ImageCacheOverwrittenException()
+            yield chunk
+
+    async def _read_and_cache(
+        self, meme_id: str, version: int, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """Pass the chunks through, caching the image if it is small enough."""
+        content, size = [], 0
+        async for chunk in chunks:
+            size += len(chunk)
+            if self.hot and size <= self.cache_settings.cache_max_item:
+                content.append(chunk)
+            yield chunk
+        if self.hot and size <= self.cache_settings.cache_max_item:
+            self.hot.set(meme_id, version, b"".join(content))
+
+    async def get_variant(
+        self,
+        meme: MemeModel,
+        width: Optional[int],
+        height: Optional[int],
+        image_format: str,
+    ) -> bytes:
+        """Get the image variant, generating it on the first request.
+
+        Args:
+            meme (MemeModel): The meme.
+            width (int, optional): The maximum width.
+            height (int, optional): The maximum height.
+            image_format (str): One of the `FORMATS` keys.
+
+        Returns:
+            bytes: The encoded image.
+        """
+        key = (str(meme.id), width, height, image_format, self.version(meme))
+        if (content := self.cache.get(key)) is not None:
+            return content
+        object_name = "{}_{}x{}_{}.{}".format(
+            key[0], width or 0, height or 0, key[4], image_format
+        )
+        try:
+            content = await self.app.store.s3.read(object_name)
+        except S3FileNotFoundException:
+            original = await self._spooled(meme) or await self.app.store.s3.read(
+                key[0]
+            )
+            content = await self.run(
+                render_variant,
+                original,
+                width,
+                height,
+                image_format,
+                self.settings.image_quality,
+            )
+            # recorded first, so that the object is never left unrecorded
+            await self.app.postgres.query_execute(
+                insert(VariantModel)
+                .values(object_name=object_name, meme_id=meme.id, version=key[4])
+                .on_conflict_do_nothing(index_elements=[VariantModel.object_name])
+            )
+            await self.app.store.s3.upload(object_name, content)
+        self.cache.set(key, content)
+        return content
+
+    async def schedule_metadata(self, meme_id: str):
+        """Queue extraction of the image metadata.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        await self.app.store.jobs.enqueue(METADATA_JOB, meme_id=meme_id)
+
+    async def extract_metadata(self, meme_id: str):
+        """Job handler, stores the metadata of the meme image.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        content = await self.app.store.s3.read(meme_id)
+        metadata = await self.run(extract_metadata, content)
+        await self.app.store.memes.update_metadata(meme_id, **metadata)
+
+    async def schedule_variants_cleanup(self, meme_id: str):
+        """Queue deletion of the variants of the replaced or deleted image.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        await self.app.store.jobs.enqueue(VARIANTS_JOB, meme_id=meme_id)
+
+    async def delete_variants(self, meme_id: str):
+        """Job handler, deletes the variants of the old versions from S3.
+
+        All the variants are deleted if the meme is deleted.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        query = self.app.postgres.get_query_select(VariantModel.object_name).where(
+            VariantModel.meme_id == UUID(meme_id)
+        )
+        try:
+            meme = await self.app.store.memes.get_meme_by_id(meme_id)
+        except MemNotFoundException:
+            pass
+        else:
+            query = query.where(VariantModel.version != self.version(meme))
+        result = await self.app.postgres.query_execute(query)
+        object_names = list(result.scalars())
+        for object_name in object_names:
+            await self.app.store.s3.delete(object_name)
+        if object_names:
+            await self.app.postgres.query_execute(
+                self.app.postgres.get_query_delete(VariantModel).where(
+                    VariantModel.object_name.in_(object_names)
+                )
+            )
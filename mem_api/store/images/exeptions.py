@@ -0,0 +1,9 @@
+from base.base_exception import ExceptionBase
+
+
+class ImageProcessingException(ExceptionBase):
+    args = ("Не удалось обработать изображение мема.",)
+
+
+class ImageCacheOverwrittenException(ExceptionBase):
+    args = ("Изображение мема было вытеснено из кэша во время отправки.",)
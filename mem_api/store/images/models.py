@@ -0,0 +1,16 @@
+from uuid import UUID
+
+from sqlalchemy import Index
+from sqlalchemy.orm import Mapped, mapped_column
+from store.database.postgres import Base
+
+
+class VariantModel(Base):
+    """An image variant stored in S3, deleted with the version of the original."""
+
+    __tablename__ = "variants"
+    __table_args__ = (Index("ix_variants_meme_id", "meme_id"),)
+
+    object_name: Mapped[str] = mapped_column(init=False, unique=True)
+    meme_id: Mapped[UUID] = mapped_column(init=False)
+    version: Mapped[str] = mapped_column(init=False)
@@ -0,0 +1,101 @@
+"""CPU-bound image operations.
+
+The functions are executed in the worker processes of the image pool,
+so they only take and return picklable values.
+"""
+
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageOps, features
+
+HASH_SIZE = 8
+
+FORMATS = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+ENCODERS = [name for name in FORMATS if name == "jpeg" or features.check(name)]
+
+
+def render_variant(
+    content: bytes,
+    width: Optional[int],
+    height: Optional[int],
+    image_format: str,
+    quality: int,
+) -> bytes:
+    """Resize the image and encode it in the requested format.
+
+    The proportions are preserved: the image is fitted into the box
+    `width` x `height`, the missing side is not limited. The image is never
+    enlarged.
+
+    Args:
+        content (bytes): The original image.
+        width (int, optional): The maximum width.
+        height (int, optional): The maximum height.
+        image_format (str): One of the `FORMATS` keys.
+        quality (int): The encoder quality.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    with Image.open(BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        if width or height:
+            image.thumbnail(
+                (width or image.width, height or image.height),
+                Image.Resampling.LANCZOS,
+            )
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = BytesIO()
+        image.save(output, format=image_format.upper(), quality=quality)
+        return output.getvalue()
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """Calculate the 64-bit difference hash of the image.
+
+    Similar images have hashes with a small Hamming distance.
+
+    Args:
+        image (Image): The image.
+
+    Returns:
+        int: The hash as a signed 64-bit integer, as stored in Postgres.
+    """
+    pixels = list(
+        image.convert("L")
+        .resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+        .getdata()
+    )
+    value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            index = row * (HASH_SIZE + 1) + column
+            value = value << 1 | (pixels[index] < pixels[index + 1])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def extract_metadata(content: bytes) -> dict:
+    """Extract the image metadata.
+
+    Args:
+        content (bytes): The image.
+
+    Returns:
+        dict: width, height, size, mime_type and phash of the image.
+    """
+    with Image.open(BytesIO(content)) as image:
+        mime_type = image.get_format_mimetype()
+        image = ImageOps.exif_transpose(image)
+        return {
+            "width": image.width,
+            "height": image.height,
+            "size": len(content),
+            "mime_type": mime_type,
+            "phash": perceptual_hash(image),
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import uuid
+from itertools import islice
+from typing import BinaryIO, Iterator, Optional
+
+import filetype
+from sqlalchemy.dialects.postgresql import insert
+
+from base.base_accessor import BaseAccessor
+from core.settings import ImportSettings
+from store.images.accessor import METADATA_JOB
+from store.imports.models import ImportModel
+from store.imports.reader import Entry, read_archive
+from store.jobs.models import JobModel
+from store.memes.models import MemeModel
+
+NAMESPACE = uuid.UUID("a4a7d4b6-54c1-4a52-a7a8-3e1f0f1c9b1e")
+
+
+class ImportAccessor(BaseAccessor):
+    """Bulk import of memes from archives.
+
+    The archive is read in batches. Images of a batch are uploaded to S3
+    concurrently, then the rows are loaded with COPY together with
+    the metadata jobs and the checkpoint in one transaction. An interrupted
+    import started again with the same name continues after the last
+    checkpoint; the meme ids are derived from the import name and the image
+    name, so repeated uploads overwrite the same objects.
+    """
+
+    settings: Optional[ImportSettings] = None
+
+    async def connect(self):
+        self.settings = ImportSettings()
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def import_archive(self, fileobj: BinaryIO, name: str) -> int:
+        """Import the memes from the archive.
+
+        Args:
+            fileobj (BinaryIO): The archive, zip or tar.
+            name (str): The import name, the key of the checkpoint.
+
+        Returns:
+            int: The number of imported memes.
+        """
+        position, finished = await self._checkpoint(name)
+        if finished:
+            return 0
+        entries = read_archive(fileobj, skip=position)
+        imported = 0
+        while batch := await asyncio.to_thread(self._take, entries):
+            position += len(batch)
+            memes = [
+                (uuid.uuid5(NAMESPACE, f"{name}/{entry_name}"), title, content)
+                for entry_name, title, content in batch
+                if self._is_image(entry_name, content)
+            ]
+            await self._upload(memes)
+            await self._copy(name, memes, position)
+            imported += len(memes)
+            self.logger.info(f"Import {name}: {position} processed")
+        query = (self.app.postgres.get_query_update(ImportModel, finished=True)).where(
+            ImportModel.name == name
+        )
+        await self.app.postgres.query_execute(query)
+        return imported
+
+    def _take(self, entries: Iterator[Entry]) -> list[Entry]:
+        return list(islice(entries, self.settings.import_batch_size))
+
+    def _is_image(self, entry_name: str, content: bytes) -> bool:
+        if (kind := filetype.guess(content)) and kind.extension == "jpg":
+            return True
+        self.logger.warning(f"Import: {entry_name} skipped, not a jpg image")
+        return False
+
+    async def _checkpoint(self, name: str) -> tuple[int, bool]:
+        """Register the import or get its checkpoint."""
+        query = (
+            insert(ImportModel)
+            .values(name=name)
+            .on_conflict_do_update(
+                index_elements=[ImportModel.name], set_={"name": name}
+            )
+            .returning(ImportModel.position, ImportModel.finished)
+        )
+        result = await self.app.postgres.query_execute(query)
+        return tuple(result.one())
+
+    async def _upload(self, memes: list[tuple[uuid.UUID, str, bytes]]):
+        semaphore = asyncio.Semaphore(self.settings.import_concurrency)
+
+        async def upload(meme_id: uuid.UUID, content: bytes):
+            async with semaphore:
+                await self.app.store.s3.upload(str(meme_id), content)
+
+        await asyncio.gather(
+            *(upload(meme_id, content) for meme_id, _, content in memes)
+        )
+
+    async def _copy(
+        self, name: str, memes: list[tuple[uuid.UUID, str, bytes]], position: int
+    ):
+        """Load the rows and move the checkpoint in one transaction."""
+        memes_table, jobs_table = MemeModel.__table__, JobModel.__table__
+        imports_table = ImportModel.__table__
+        schema = self.app.postgres.settings.postgres_schema
+        async with self.app.postgres.raw_connection() as connection:
+            async with connection.transaction():
+                await connection.copy_records_to_table(
+                    memes_table.name,
+                    schema_name=schema,
+                    columns=["id", "title"],
+                    records=[(meme_id, title) for meme_id, title, _ in memes],
+                )
+                await connection.copy_records_to_table(
+                    jobs_table.name,
+                    schema_name=schema,
+                    columns=["kind", "payload"],
+                    records=[
+                        (METADATA_JOB, json.dumps({"meme_id": str(meme_id)}))
+                        for meme_id, _, _ in memes
+                    ],
+                )
+                await connection.execute(
+                    f"UPDATE {self.app.postgres.full_name(imports_table)} "
+                    "SET position = $1, modified = now() WHERE name = $2",
+                    position,
+                    name,
+                )
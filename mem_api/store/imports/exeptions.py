@@ -0,0 +1,12 @@
+from base.base_exception import ExceptionBase
+
+
+class ImportArchiveException(ExceptionBase):
+    args = ("Неподдерживаемый архив. Поддерживаемые форматы: zip, tar, tar.gz.",)
+
+
+class ImportManifestException(ExceptionBase):
+    args = (
+        "В архиве нет manifest.csv (name,title). "
+        "В tar архиве manifest.csv должен быть первым файлом.",
+    )
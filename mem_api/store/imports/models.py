@@ -0,0 +1,11 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Mapped, mapped_column
+from store.database.postgres import Base
+
+
+class ImportModel(Base):
+    __tablename__ = "imports"
+
+    name: Mapped[str] = mapped_column(init=False, unique=True)
+    position: Mapped[int] = mapped_column(init=False, server_default=text("0"))
+    finished: Mapped[bool] = mapped_column(init=False, server_default=text("false"))
@@ -0,0 +1,82 @@
+"""Reading of the archives with memes.
+
+An archive contains the images and `manifest.csv` with the columns
+`name` (the path of the image in the archive) and `title`, the same layout
+as the archives returned by `GET /memes/archive`. Zip archives are read
+in the order of the manifest, tar archives are read as a stream in the order
+of the members, so the manifest must be the first member.
+"""
+
+import csv
+import io
+import os
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator
+
+from store.imports.exeptions import ImportArchiveException, ImportManifestException
+
+MANIFEST = "manifest.csv"
+Entry = tuple[str, str, bytes]
+
+
+def read_manifest(content: bytes) -> dict[str, str]:
+    """Parse the manifest.
+
+    Args:
+        content (bytes): The manifest file.
+
+    Returns:
+        dict[str, str]: Titles by the image names, in the order of the file.
+    """
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    return {row["name"]: row["title"] for row in reader}
+
+
+def read_archive(fileobj: BinaryIO, skip: int = 0) -> Iterator[Entry]:
+    """Iterate over the images of the archive.
+
+    Args:
+        fileobj (BinaryIO): The archive.
+        skip (int): The number of images to skip without reading them.
+
+    Yields:
+        Entry: The image name, the title and the image content.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        yield from _read_zip(fileobj, skip)
+        return
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode="r|*")
+    except tarfile.TarError as e:
+        raise ImportArchiveException(exception=e)
+    with archive:
+        yield from _read_tar(archive, skip)
+
+
+def _read_zip(fileobj: BinaryIO, skip: int) -> Iterator[Entry]:
+    with zipfile.ZipFile(fileobj) as archive:
+        try:
+            titles = read_manifest(archive.read(MANIFEST))
+        except KeyError as e:
+            raise ImportManifestException(exception=e)
+        for index, (name, title) in enumerate(titles.items()):
+            if index >= skip:
+                yield name, title, archive.read(name)
+
+
+def _read_tar(archive: tarfile.TarFile, skip: int) -> Iterator[Entry]:
+    members = iter(archive)
+    manifest = next(members, None)
+    if manifest is None or os.path.basename(manifest.name) != MANIFEST:
+        raise ImportManifestException()
+    titles = read_manifest(archive.extractfile(manifest).read())
+    index = 0
+    for member in members:
+        if not member.isfile() or member.name not in titles:
+            continue
+        if index >= skip:
+            yield member.name, titles[member.name], archive.extractfile(member).read()
+        index += 1
@@ -0,0 +1,151 @@
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import and_, func, or_, select
+
+from base.base_accessor import BaseAccessor
+from core.settings import JobSettings
+from store.jobs.exeptions import JobUnknownKindException
+from store.jobs.models import JobModel
+
+Handler = Callable[..., Awaitable]
+
+
+class JobAccessor(BaseAccessor):
+    """Durable queue of background jobs stored in Postgres.
+
+    Every application process runs `job_workers` coroutines, each of them
+    claims one job at a time with `SELECT ... FOR UPDATE SKIP LOCKED`,
+    so the processes never take the same job. A job that was running
+    longer than `job_lease` (e.g. the process was killed) is claimed again.
+    """
+
+    settings: Optional[JobSettings] = None
+
+    def _init(self):
+        self._handlers: dict[str, Handler] = {}
+        self._workers: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def register(self, kind: str, handler: Handler):
+        """Register the job handler.
+
+        Args:
+            kind (str): The kind of job.
+            handler (Handler): Coroutine function called with the job payload
+                as keyword arguments.
+        """
+        self._handlers[kind] = handler
+
+    async def enqueue(self, kind: str, **payload):
+        """Add the job to the queue.
+
+        Args:
+            kind (str): The kind of job.
+            payload: The job arguments, must be JSON serializable.
+        """
+        if kind not in self._handlers:
+            raise JobUnknownKindException()
+        query = self.app.postgres.get_query_insert(JobModel, kind=kind, payload=payload)
+        await self.app.postgres.query_execute(query)
+        self._wakeup.set()
+
+    async def connect(self):
+        self.settings = JobSettings()
+        self._workers = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.settings.job_workers)
+        ]
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    async def _worker(self):
+        """Process jobs until cancelled."""
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} claim failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), self.settings.job_poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} job {job.id} lost: {e}")
+
+    async def _claim(self) -> Optional[JobModel]:
+        """Take the next job and mark it as running.
+
+        Returns:
+            JobModel: The claimed job or None if the queue is empty.
+        """
+        now = func.current_timestamp()
+        lease = timedelta(seconds=self.settings.job_lease)
+        job_id = (
+            select(JobModel.id)
+            .where(
+                or_(
+                    and_(JobModel.status == "pending", JobModel.run_after <= now),
+                    and_(JobModel.status == "running", JobModel.modified < now - lease),
+                )
+            )
+            .order_by(JobModel.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        query = (
+            self.app.postgres.get_query_update(
+                JobModel, status="running", attempts=JobModel.attempts + 1
+            )
+            .where(JobModel.id == job_id)
+            .returning(JobModel)
+        )
+        result = await self.app.postgres.query_execute(query)
+        return result.scalar_one_or_none()
+
+    async def _run(self, job: JobModel):
+        """Execute the job, then delete it or schedule a retry.
+
+        Args:
+            job (JobModel): The claimed job.
+        """
+        try:
+            handler = self._handlers.get(job.kind)
+            if handler is None:
+                raise JobUnknownKindException()
+            await handler(**job.payload)
+        except Exception as e:
+            self.logger.warning(
+                f"{self.__class__.__name__} job {job.kind} {job.id} "
+                f"attempt {job.attempts} failed: {e}"
+            )
+            values = {"status": "pending", "error": str(e)}
+            if job.attempts >= self.settings.job_max_attempts:
+                values["status"] = "failed"
+            else:
+                values["run_after"] = func.current_timestamp() + timedelta(
+                    seconds=2**job.attempts
+                )
+            query = self.app.postgres.get_query_update(JobModel, **values).where(
+                JobModel.id == job.id
+            )
+        else:
+            query = self.app.postgres.get_query_delete(JobModel).where(
+                JobModel.id == job.id
+            )
+        await self.app.postgres.query_execute(query)
@@ -0,0 +1,5 @@
+from base.base_exception import ExceptionBase
+
+
+class JobUnknownKindException(ExceptionBase):
+    args = ("Неизвестный тип фоновой задачи.",)
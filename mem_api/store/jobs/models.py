@@ -0,0 +1,20 @@
+from typing import Optional
+
+from sqlalchemy import DATETIME, TIMESTAMP, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from store.database.postgres import Base
+
+
+class JobModel(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+    kind: Mapped[str] = mapped_column(init=False)
+    payload: Mapped[dict] = mapped_column(JSONB, init=False)
+    status: Mapped[str] = mapped_column(init=False, server_default="pending")
+    attempts: Mapped[int] = mapped_column(init=False, server_default=text("0"))
+    run_after: Mapped[DATETIME] = mapped_column(
+        TIMESTAMP, init=False, server_default=func.current_timestamp()
+    )
+    error: Mapped[Optional[str]] = mapped_column(init=False)
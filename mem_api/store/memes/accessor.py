@@ -1,51 +1,233 @@
-from uuid import UUID
+import asyncio
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID, uuid4
 
+from sqlalchemy import String, any_, bindparam, func, select, true, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
 from sqlalchemy.exc import NoResultFound
 
 from base.base_accessor import BaseAccessor
+from core.context import DeadlineExceededException, remaining
+from core.settings import GuardSettings
+from store.database.postgres import Row
+from store.guard.guard import Guard
 from store.memes.exeptions import (
     MemNotFoundException,
+    MemOverloadedException,
     MemServerConnectionException,
     MemUnknownException,
 )
 
-from store.memes.models import MemeModel
+from store.memes.models import READY, MemeModel
+
+RANDOM_ATTEMPTS = 3
 
 
 def exception_handler(func):
     async def wrapper(self, *args, **kwargs):
-        try:
-            return await func(self, *args, **kwargs)
-        except NoResultFound as e:
-            raise MemNotFoundException(exception=e)
-        except IOError as e:
-            if e.errno == 111:
-                raise MemServerConnectionException(exception=e)
-            raise MemUnknownException(exception=e)
-        except Exception as e:
-            raise MemUnknownException(exception=e)
+        timeout = remaining()
+        with self.guard.track(MemOverloadedException, MemNotFoundException):
+            try:
+                async with asyncio.timeout(timeout):
+                    return await func(self, *args, **kwargs)
+            except DeadlineExceededException as e:
+                raise e
+            except TimeoutError:
+                raise DeadlineExceededException()
+            except NoResultFound as e:
+                raise MemNotFoundException(exception=e)
+            except IOError as e:
+                if e.errno == 111:
+                    raise MemServerConnectionException(exception=e)
+                raise MemUnknownException(exception=e)
+            except Exception as e:
+                raise MemUnknownException(exception=e)
 
     return wrapper
 
 
 class MemAccessor(BaseAccessor):
-    """The accessor for the memes."""
+    """The accessor for the memes.
+
+    Reads go through the `Postgres.fetch` fast path and return row tuples
+    with the attributes of `MemeModel`, writes use the ORM and publish
+    the change to the invalidation bus. Calls are guarded by an adaptive
+    concurrency limit and a circuit breaker, see `Guard`.
+    """
+
+    def _init(self):
+        settings = GuardSettings()
+        self.guard = Guard("postgres", settings.guard_postgres_latency, settings)
 
     @exception_handler
-    async def get_meme_by_id(self, meme_id: str) -> MemeModel:
-        query = self.app.postgres.get_query_select(MemeModel).where(
-            MemeModel.id == meme_id
+    async def get_meme_by_id(self, meme_id: str) -> Row:
+        rows = await self.app.postgres.fetch(
+            "meme_by_id",
+            lambda: self.app.postgres.get_query_select(MemeModel.__table__).where(
+                MemeModel.id == bindparam("meme_id")
+            ),
+            meme_id=meme_id,
         )
-        result = await self.app.postgres.query_execute(query)
-        return result.scalar_one()
+        if not rows:
+            raise NoResultFound()
+        return rows[0]
 
     @exception_handler
-    async def get_memes(self, limit: int, offset: int) -> list[MemeModel]:
-        query = (
-            self.app.postgres.get_query_select(MemeModel).limit(limit).offset(offset)
+    async def get_memes(
+        self,
+        limit: int,
+        offset: int,
+        tags: Optional[list[str]] = None,
+        match: str = "any",
+        cursor: Optional[UUID] = None,
+    ) -> list[Row]:
+        """Get the page of memes in the order of id.
+
+        Args:
+            limit (int): The page size.
+            offset (int): The number of memes skipped, ignored with `cursor`.
+            tags (list[str], optional): Only the memes with these tags.
+            match (str): `any` of the tags or `all` of them.
+            cursor (UUID, optional): Only the memes after this id, the last id
+                of the previous page.
+
+        Returns:
+            list[Row]: The memes.
+        """
+        name = "_".join(
+            ["memes_page"]
+            + ([f"tags_{match}"] if tags else [])
+            + (["cursor"] if cursor else [])
         )
-        result = await self.app.postgres.query_execute(query)
-        return result.scalars().all()  # type: ignore
+
+        def build():
+            query = self.app.postgres.get_query_select(MemeModel.__table__)
+            if tags:
+                parameter = bindparam("tags", type_=ARRAY(String))
+                query = query.where(
+                    MemeModel.tags.overlap(parameter)
+                    if match == "any"
+                    else MemeModel.tags.contains(parameter)
+                )
+            if cursor:
+                query = query.where(MemeModel.id > bindparam("cursor"))
+            else:
+                query = query.offset(bindparam("offset"))
+            return query.order_by(MemeModel.id).limit(bindparam("limit"))
+
+        return await self.app.postgres.fetch(
+            name,
+            build,
+            limit=limit,
+            offset=offset,
+            tags=tags,
+            cursor=cursor,
+        )
+
+    @exception_handler
+    async def get_memes_by_ids(self, meme_ids: list[str]) -> list[Row]:
+        if not meme_ids:
+            return []
+        return await self.app.postgres.fetch(
+            "memes_by_ids",
+            lambda: self.app.postgres.get_query_select(MemeModel.__table__).where(
+                MemeModel.id == any_(bindparam("meme_ids", type_=ARRAY(PG_UUID)))
+            ),
+            meme_ids=meme_ids,
+        )
+
+    @exception_handler
+    async def get_random_memes(self, count: int) -> list[Row]:
+        """Pick random memes without scanning the table.
+
+        Every probe is a random UUID, the first meme with an id not below it
+        is found in the primary key index. The pick is not uniform: a meme is
+        picked with the probability proportional to the gap between its id
+        and the previous one. For random ids the gaps are exponentially
+        distributed, so about a tenth of the memes are picked less than
+        a tenth as often as the average, and the memes after the largest
+        gaps several times as often. Good enough for showing a random meme,
+        not for sampling. Repeated memes are replaced by new probes a few
+        times.
+
+        Args:
+            count (int): The number of memes.
+
+        Returns:
+            list[Row]: Up to `count` distinct memes.
+        """
+        memes = {}
+        for _ in range(RANDOM_ATTEMPTS):
+            rows = await self.app.postgres.fetch(
+                "random_memes",
+                self._random_query,
+                probes=[uuid4() for _ in range(count - len(memes))],
+                state=READY,
+                limit=1,
+            )
+            memes.update((row.id, row) for row in rows)
+            if len(memes) >= count or not rows:
+                break
+        return list(memes.values())[:count]
+
+    @staticmethod
+    def _random_query():
+        probes = (
+            func.unnest(bindparam("probes", type_=ARRAY(PG_UUID)))
+            .table_valued("probe")
+            .render_derived()
+        )
+        ready = MemeModel.state == bindparam("state")
+        # past the last id the probe wraps around to the first one
+        candidates = union_all(
+            select(MemeModel.__table__)
+            .where(MemeModel.id >= probes.c.probe, ready)
+            .correlate(probes)
+            .order_by(MemeModel.id)
+            .limit(bindparam("limit")),
+            select(MemeModel.__table__)
+            .where(ready)
+            .order_by(MemeModel.id)
+            .limit(bindparam("limit")),
+        ).subquery()
+        meme = select(candidates).limit(bindparam("limit")).lateral("meme")
+        return select(meme).select_from(probes).join(meme, true())
+
+    @exception_handler
+    async def iter_memes(
+        self, since: Optional[datetime] = None
+    ) -> AsyncIterator[Row]:
+        """Iterate over all the memes in the order of modification.
+
+        The first row is read at once, so a failing query is raised here,
+        before a streamed response has started.
+
+        Args:
+            since (datetime, optional): Only the memes modified after it,
+                an aware time is converted to UTC.
+
+        Returns:
+            AsyncIterator[Row]: The memes, read with a server-side cursor.
+        """
+        query = self.app.postgres.get_query_select(MemeModel.__table__).order_by(
+            MemeModel.modified, MemeModel.id
+        )
+        if since is not None:
+            if since.tzinfo is not None:
+                # the columns are naive timestamps, the database runs in UTC
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            query = query.where(MemeModel.modified > since)
+        rows = self.app.postgres.stream(query)
+        first = await anext(rows, None)
+
+        async def memes() -> AsyncIterator[Row]:
+            if first is not None:
+                yield first
+            async for row in rows:
+                yield row
+
+        return memes()
 
     @exception_handler
     async def delete_meme(self, meme_id: UUID):
@@ -55,22 +237,70 @@ class MemAccessor(BaseAccessor):
             .returning(MemeModel)
         )
         result = await self.app.postgres.query_execute(query)
-        return result.scalar_one()
+        meme = result.scalar_one()
+        await self.app.store.bus.publish("delete", meme.id)
+        await self.app.store.images.schedule_variants_cleanup(str(meme.id))
+        return meme
 
     @exception_handler
-    async def update_meme(self, meme_id: str, title: str) -> MemeModel:
+    async def update_meme(
+        self,
+        meme_id: str,
+        title: Optional[str] = None,
+        tags: Optional[list[str]] = None,
+    ) -> MemeModel:
+        changes = {"title": title} if title else {}
+        if tags is not None:
+            changes["tags"] = tags
         query = (
-            self.app.postgres.get_query_update(MemeModel, title=title)
+            self.app.postgres.get_query_update(MemeModel, **changes)
             .where(MemeModel.id == meme_id)
             .returning(MemeModel)
         )
         result = await self.app.postgres.query_execute(query)
-        return result.scalar_one()
+        meme = result.scalar_one()
+        await self.app.store.bus.publish("update", meme.id)
+        return meme
 
     @exception_handler
-    async def create_meme(self, title: str) -> MemeModel:
-        query = self.app.postgres.get_query_insert(MemeModel, title=title).returning(
-            MemeModel
+    async def touch_meme(self, meme_id: str) -> MemeModel:
+        """Mark the meme image as changed and uploaded."""
+        query = (
+            self.app.postgres.get_query_update(
+                MemeModel, modified=func.current_timestamp(), state=READY
+            )
+            .where(MemeModel.id == meme_id)
+            .returning(MemeModel)
         )
         result = await self.app.postgres.query_execute(query)
-        return result.scalar_one()
+        meme = result.scalar_one()
+        await self.app.store.bus.publish("upload", meme.id)
+        await self.app.store.images.schedule_variants_cleanup(str(meme.id))
+        return meme
+
+    @exception_handler
+    async def update_metadata(self, meme_id: str, **metadata) -> MemeModel:
+        """Save the image metadata, the modification time is kept."""
+        query = (
+            self.app.postgres.get_query_update(
+                MemeModel, modified=MemeModel.modified, **metadata
+            )
+            .where(MemeModel.id == meme_id)
+            .returning(MemeModel)
+        )
+        result = await self.app.postgres.query_execute(query)
+        meme = result.scalar_one()
+        await self.app.store.bus.publish("metadata", meme.id, phash=meme.phash)
+        return meme
+
+    @exception_handler
+    async def create_meme(
+        self, title: str, state: str = READY, tags: Optional[list[str]] = None
+    ) -> MemeModel:
+        query = self.app.postgres.get_query_insert(
+            MemeModel, title=title, state=state, tags=tags or []
+        ).returning(MemeModel)
+        result = await self.app.postgres.query_execute(query)
+        meme = result.scalar_one()
+        await self.app.store.bus.publish("create", meme.id)
+        return meme
@@ -1,4 +1,5 @@
 from base.base_exception import ExceptionBase
+from store.guard.exeptions import GuardRejectedException
 
 
 class MemNotFoundException(ExceptionBase):
@@ -11,3 +12,7 @@ class MemServerConnectionException(ExceptionBase):
 
 class MemUnknownException(ExceptionBase):
     args = ("Неизвестная ошибка сервера данных.",)
+
+
+class MemOverloadedException(GuardRejectedException):
+    args = ("Сервер данных перегружен. Повторите попытку позже.",)
@@ -1,8 +1,29 @@
+from typing import Optional
+
+from sqlalchemy import BigInteger, Index, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column
 from store.database.postgres import Base
 
+PENDING = "pending"
+READY = "ready"
+
 
 class MemeModel(Base):
     __tablename__ = "memes"
+    __table_args__ = (
+        Index("ix_memes_modified", "modified", "id"),
+        Index("ix_memes_tags", "tags", postgresql_using="gin"),
+    )
 
     title: Mapped[str] = mapped_column(init=False)
+    width: Mapped[Optional[int]] = mapped_column(init=False)
+    height: Mapped[Optional[int]] = mapped_column(init=False)
+    size: Mapped[Optional[int]] = mapped_column(BigInteger, init=False)
+    mime_type: Mapped[Optional[str]] = mapped_column(init=False)
+    phash: Mapped[Optional[int]] = mapped_column(BigInteger, init=False)
+    state: Mapped[str] = mapped_column(init=False, server_default=READY)
+    views: Mapped[int] = mapped_column(BigInteger, init=False, server_default="0")
+    tags: Mapped[list[str]] = mapped_column(
+        ARRAY(String), init=False, server_default="{}"
+    )
@@ -1,80 +1,208 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 from urllib.parse import urlencode
 
-import aiohttp
-
 from base.base_accessor import BaseAccessor
-from core.settings import S3Settings
+from core.context import DeadlineExceededException, remaining, timed
+from core.settings import GuardSettings, S3Settings
+from store.guard.guard import Guard
 
 from store.s3.exeptions import (
     S3FileNotFoundException,
     S3ConnectionErrorException,
+    S3OverloadedException,
     S3UnknownException,
 )
 
+if TYPE_CHECKING:
+    import aiohttp
+
+CHUNK_SIZE = 64 * 1024
+WARM_UP_TIMEOUT = 5
+
 
 def exception_handler(func):
     async def wrapper(self, *args, **kwargs):
-        try:
-            return await func(self, *args, **kwargs)
-        except IOError as e:
-            if e.errno == 111:
-                raise S3ConnectionErrorException(exception=e)
-            raise S3UnknownException(exception=e)
-        except S3FileNotFoundException as e:
-            raise e
-        except Exception as e:
-            raise S3UnknownException(exception=e)
+        timeout = remaining()
+        with self.guard.track(
+            S3OverloadedException, S3FileNotFoundException
+        ), timed("s3"):
+            try:
+                async with asyncio.timeout(timeout):
+                    return await func(self, *args, **kwargs)
+            except DeadlineExceededException as e:
+                raise e
+            except TimeoutError:
+                raise DeadlineExceededException()
+            except IOError as e:
+                if e.errno == 111:
+                    raise S3ConnectionErrorException(exception=e)
+                raise S3UnknownException(exception=e)
+            except S3FileNotFoundException as e:
+                raise e
+            except Exception as e:
+                raise S3UnknownException(exception=e)
 
     return wrapper
 
 
 class S3Accessor(BaseAccessor):
+    """The client of the S3 server.
+
+    The requests share one session, so the connections are kept alive
+    between them. Until connected, e.g. in the scripts, every call opens
+    its own session. aiohttp is imported on the first use.
+    """
+
     BASE_PATH: str
     settings: S3Settings
+    stage = 0
+
+    def _init(self):
+        settings = GuardSettings()
+        self.guard = Guard("s3", settings.guard_s3_latency, settings)
+        self._session: Optional["aiohttp.ClientSession"] = None
 
     @exception_handler
     async def upload(self, filename: str, file_content: bytes):
-        async with self.session() as session:
+        async with self.client() as session:
             data = self.__create_form_data(filename, file_content)
             async with session.post(
                     url=self.__create_url(f"upload"),
                     data=data,
+                    timeout=self.timeout(),
             ) as response:
                 if response.status != 200:
                     raise S3UnknownException()
-                await session.close()
 
     @exception_handler
     async def download(self, meme_id: str):
-        session = self.session()
-        response = await session.get(
-            url=self.__create_url(f"download/{self.settings.s3_bucket}/{meme_id}")
-        )
+        import aiohttp
+
+        session = self._session or aiohttp.ClientSession()
+        try:
+            response = await session.get(
+                url=self.__create_url(
+                    f"download/{self.settings.s3_bucket}/{meme_id}"
+                ),
+                timeout=self.timeout(stream=True),
+            )
+        except BaseException:
+            await self._release(session)
+            raise
         if response.status != 200:
+            response.release()
+            await self._release(session)
             raise S3FileNotFoundException()
 
         async def stream_iterator():
-            async for chunk in response.content:
-                yield chunk
-            await session.close()
+            try:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    yield chunk
+            finally:
+                response.release()
+                await self._release(session)
 
         return stream_iterator()
 
+    async def read(self, meme_id: str) -> bytes:
+        """Download the whole object.
+
+        Args:
+            meme_id (str): The object name.
+
+        Returns:
+            bytes: The object content.
+        """
+        return b"".join([chunk async for chunk in await self.download(meme_id)])
+
     @exception_handler
     async def delete(self, meme_id: str):
-        async with self.session() as session:
-            await session.delete(
-                url=self.__create_url(f"delete/{self.settings.s3_bucket}/{meme_id}")
-            )
+        async with self.client() as session:
+            async with session.delete(
+                url=self.__create_url(f"delete/{self.settings.s3_bucket}/{meme_id}"),
+                timeout=self.timeout(),
+            ):
+                pass
 
     async def connect(self):
+        import aiohttp
+
         self.settings = S3Settings()
         self.BASE_PATH = f"http://{self.settings.s3_host}:{self.settings.s3_port}/"
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.settings.s3_connections,
+                keepalive_timeout=self.settings.s3_keepalive_timeout,
+            )
+        )
+        try:
+            await self._warm_up()
+        except Exception as e:
+            self.logger.warning(f"{self.__class__.__name__} is unavailable: {e}")
         self.logger.info(f"{self.__class__.__name__} connected")
 
-    @staticmethod
-    def session() -> aiohttp.ClientSession:
-        return aiohttp.ClientSession()
+    async def disconnect(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    async def _warm_up(self):
+        """Open `s3_warm_connections` keep-alive connections in advance."""
+
+        async def request():
+            async with self._session.head(
+                self.BASE_PATH, timeout=self.timeout(WARM_UP_TIMEOUT)
+            ) as response:
+                await response.read()
+
+        await asyncio.gather(
+            *(request() for _ in range(self.settings.s3_warm_connections))
+        )
+
+    async def ping(self):
+        """Check that the S3 server answers, bypassing the guard."""
+        async with self.client() as session:
+            async with session.head(self.BASE_PATH) as response:
+                if response.status >= 500:
+                    response.raise_for_status()
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator["aiohttp.ClientSession"]:
+        """The shared session or, until connected, a new one."""
+        import aiohttp
+
+        if self._session:
+            yield self._session
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
+
+    async def _release(self, session: "aiohttp.ClientSession"):
+        if session is not self._session:
+            await session.close()
+
+    def timeout(
+        self, timeout: Optional[float] = None, stream: bool = False
+    ) -> "aiohttp.ClientTimeout":
+        """The timeout of a request bounded by the deadline of the request.
+
+        Args:
+            timeout (float, optional): The timeout without a deadline,
+                defaults to `s3_timeout`.
+            stream (bool): Only bound the connection and each read, so that
+                a streamed body is not cut off at the deadline.
+        """
+        import aiohttp
+
+        timeout = remaining() or timeout or self.settings.s3_timeout
+        if stream:
+            return aiohttp.ClientTimeout(
+                total=None, sock_connect=timeout, sock_read=timeout
+            )
+        return aiohttp.ClientTimeout(total=timeout)
 
     def __create_url(self, method: str, **kwargs) -> str:
         """Create url from base url and params.
@@ -90,7 +218,11 @@ class S3Accessor(BaseAccessor):
             return "?".join([self.BASE_PATH + method, urlencode(kwargs)])
         return self.BASE_PATH + method
 
-    def __create_form_data(self, filename: str, file_content: bytes) -> aiohttp.FormData:
+    def __create_form_data(
+        self, filename: str, file_content: bytes
+    ) -> "aiohttp.FormData":
+        import aiohttp
+
         data = aiohttp.FormData()
         data.add_field("bucket", self.settings.s3_bucket)
         data.add_field("object_name", filename)
@@ -1,4 +1,5 @@
 from base.base_exception import ExceptionBase
+from store.guard.exeptions import GuardRejectedException
 
 
 class S3FileNotFoundException(ExceptionBase):
@@ -11,3 +12,7 @@ class S3ConnectionErrorException(ExceptionBase):
 
 class S3UnknownException(ExceptionBase):
     args = ("Неизвестная ошибка S3 сервера.",)
+
+
+class S3OverloadedException(GuardRejectedException):
+    args = ("S3 сервер перегружен. Повторите попытку позже.",)
@@ -0,0 +1,111 @@
+import asyncio
+from typing import Optional
+
+from base.base_accessor import BaseAccessor
+from store.bus.accessor import FLUSH
+from store.memes.models import MemeModel
+from store.similar.index import HammingIndex
+
+REBUILD_BATCH = 10000
+
+
+class SimilarAccessor(BaseAccessor):
+    """In-memory index of the perceptual hashes of the memes.
+
+    The index is rebuilt from Postgres on startup and then kept up to date
+    by the events of the invalidation bus.
+    """
+
+    index: Optional[HammingIndex] = None
+
+    def _init(self):
+        self.index = HammingIndex()
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        await self.rebuild()
+        self.logger.info(
+            f"{self.__class__.__name__} connected, {len(self.index)} hashes indexed"
+        )
+
+    async def rebuild(self):
+        """Load all the known hashes from Postgres."""
+        self.index.clear()
+        last_id = None
+        while True:
+            query = (
+                self.app.postgres.get_query_select(MemeModel.id, MemeModel.phash)
+                .where(MemeModel.phash.is_not(None))
+                .order_by(MemeModel.id)
+                .limit(REBUILD_BATCH)
+            )
+            if last_id is not None:
+                query = query.where(MemeModel.id > last_id)
+            rows = (
+                await self.app.postgres.query_execute(query, read_only=True)
+            ).all()
+            for meme_id, phash in rows:
+                self.index.add(str(meme_id), phash)
+            if len(rows) < REBUILD_BATCH:
+                break
+            last_id = rows[-1][0]
+
+    def invalidate(self, kind: str, meme_id: Optional[str], data: dict):
+        """Invalidation bus handler, keeps the index in sync with other processes."""
+        if kind == FLUSH:
+            self._rebuild_task = asyncio.create_task(self.rebuild())
+            self._rebuild_task.add_done_callback(self._rebuilt)
+        elif kind == "metadata" and data.get("phash") is not None:
+            self.add(meme_id, data["phash"])
+        elif kind == "delete":
+            self.remove(meme_id)
+
+    def _rebuilt(self, task: asyncio.Task):
+        if not task.cancelled() and (error := task.exception()):
+            self.logger.error(f"{self.__class__.__name__} rebuild failed: {error}")
+
+    def add(self, meme_id: str, phash: int):
+        """Index the hash of the meme.
+
+        Args:
+            meme_id (str): The meme id.
+            phash (int): The perceptual hash of the meme image.
+        """
+        self.index.add(meme_id, phash)
+
+    def remove(self, meme_id: str):
+        """Remove the meme from the index.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        self.index.remove(meme_id)
+
+    async def find_similar(
+        self, meme: MemeModel, distance: int, limit: int
+    ) -> list[tuple[MemeModel, int]]:
+        """Find the memes whose images look like the image of the meme.
+
+        Args:
+            meme (MemeModel): The meme.
+            distance (int): The maximum Hamming distance between the hashes.
+            limit (int): The maximum number of memes.
+
+        Returns:
+            list[tuple[MemeModel, int]]: Pairs of meme and distance,
+                the closest first.
+        """
+        if meme.phash is None:
+            return []
+        found = [
+            (meme_id, bits)
+            for meme_id, bits in self.index.search(meme.phash, distance, limit + 1)
+            if meme_id != str(meme.id)
+        ][:limit]
+        memes = {
+            str(similar.id): similar
+            for similar in await self.app.store.memes.get_memes_by_ids(
+                [meme_id for meme_id, _ in found]
+            )
+        }
+        return [(memes[meme_id], bits) for meme_id, bits in found if meme_id in memes]
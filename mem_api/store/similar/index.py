@@ -0,0 +1,98 @@
+from itertools import combinations
+from typing import Iterator, Optional
+
+HASH_BITS = 64
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+class HammingIndex:
+    """Multi-index hashing of 64-bit hashes for Hamming distance queries.
+
+    The hash is split into `BANDS` substrings, each of them indexed in its own
+    table. By the pigeonhole principle two hashes within the distance `d`
+    have at least one substring within the distance `d // BANDS`, so only
+    the buckets of such substrings are probed and the candidates are checked
+    with an exact popcount.
+    """
+
+    def __init__(self):
+        self._hashes: dict[str, int] = {}
+        self._tables: list[dict[int, set[str]]] = [{} for _ in range(BANDS)]
+
+    @staticmethod
+    def _bands(value: int) -> Iterator[int]:
+        for band in range(BANDS):
+            yield value >> band * BAND_BITS & BAND_MASK
+
+    @staticmethod
+    def _neighbours(value: int, distance: int) -> Iterator[int]:
+        """All the band values within the distance from the value."""
+        for flips in range(distance + 1):
+            for bits in combinations(range(BAND_BITS), flips):
+                mask = 0
+                for bit in bits:
+                    mask |= 1 << bit
+                yield value ^ mask
+
+    def add(self, key: str, value: int):
+        """Add or replace the hash of the key.
+
+        Args:
+            key (str): The meme id.
+            value (int): The signed or unsigned 64-bit hash.
+        """
+        self.remove(key)
+        value &= (1 << HASH_BITS) - 1
+        self._hashes[key] = value
+        for table, band in zip(self._tables, self._bands(value)):
+            table.setdefault(band, set()).add(key)
+
+    def remove(self, key: str):
+        """Remove the key if it is indexed.
+
+        Args:
+            key (str): The meme id.
+        """
+        if (value := self._hashes.pop(key, None)) is None:
+            return
+        for table, band in zip(self._tables, self._bands(value)):
+            bucket = table[band]
+            bucket.discard(key)
+            if not bucket:
+                del table[band]
+
+    def search(
+        self, value: int, distance: int, limit: Optional[int] = None
+    ) -> list[tuple[str, int]]:
+        """Find the keys within the Hamming distance from the hash.
+
+        Args:
+            value (int): The signed or unsigned 64-bit hash.
+            distance (int): The maximum Hamming distance.
+            limit (int, optional): The maximum number of results.
+
+        Returns:
+            list[tuple[str, int]]: Pairs of key and distance, the closest first.
+        """
+        value &= (1 << HASH_BITS) - 1
+        candidates = set()
+        for table, band in zip(self._tables, self._bands(value)):
+            for neighbour in self._neighbours(band, distance // BANDS):
+                candidates.update(table.get(neighbour, ()))
+        found = []
+        for key in candidates:
+            if (bits := (self._hashes[key] ^ value).bit_count()) <= distance:
+                found.append((key, bits))
+        found.sort(key=lambda item: item[1])
+        return found[:limit]
+
+    def clear(self):
+        """Remove all the keys."""
+        self._hashes.clear()
+        for table in self._tables:
+            table.clear()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
@@ -0,0 +1,287 @@
+import asyncio
+import fcntl
+import os
+import time
+import uuid
+from typing import Optional
+
+from base.base_accessor import BaseAccessor
+from core.settings import SpoolSettings
+from store.memes.exeptions import MemNotFoundException
+from store.memes.models import PENDING, READY, MemeModel
+
+MAX_RETRY_DELAY = 60
+EXTENSION = ".jpg"
+FAILED = ".failed"
+
+
+class SpoolAccessor(BaseAccessor):
+    """Write-behind uploads of the meme images.
+
+    A new meme is created in the `pending` state, its image is written
+    to the spool directory with `fsync` and an atomic rename, and the meme
+    is acknowledged. A background uploader takes the images in batches,
+    uploads them to S3 concurrently and marks the memes as `ready` with one
+    query, failed uploads are retried with a growing delay. An image which
+    keeps failing is set aside and its meme deleted, so it is not listed
+    without an image to serve. The spool is
+    shared by the processes on the host: images left by a stopped process
+    are found by a periodic scan, and a file lock keeps two processes from
+    uploading the same image at once.
+    """
+
+    settings: Optional[SpoolSettings] = None
+
+    def _init(self):
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._pending: set[str] = set()
+        self._attempts: dict[str, int] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    async def connect(self):
+        self.settings = SpoolSettings()
+        if self.settings.spool_enabled:
+            os.makedirs(self.settings.spool_dir, exist_ok=True)
+            self._tasks = [
+                asyncio.create_task(self._drain()),
+                asyncio.create_task(self._scan()),
+            ]
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    def accepts(self) -> bool:
+        """Whether a new image can be spooled, False if disabled or full."""
+        return (
+            self.settings is not None
+            and self.settings.spool_enabled
+            and len(self._pending) < self.settings.spool_max_pending
+        )
+
+    async def add(
+        self, title: str, content: bytes, tags: Optional[list[str]] = None
+    ) -> MemeModel:
+        """Create the pending meme and spool its image.
+
+        Args:
+            title (str): The meme title.
+            content (bytes): The image.
+            tags (list[str], optional): The meme tags.
+
+        Returns:
+            MemeModel: The created meme.
+        """
+        meme = await self.app.store.memes.create_meme(
+            title, state=PENDING, tags=tags
+        )
+        meme_id = str(meme.id)
+        try:
+            await asyncio.to_thread(self._write, meme_id, content)
+        except BaseException:
+            await asyncio.shield(self.app.store.memes.delete_meme(meme.id))
+            raise
+        self._submit(meme_id)
+        return meme
+
+    async def read(self, meme_id: str) -> Optional[bytes]:
+        """Read the image which is not uploaded yet.
+
+        Args:
+            meme_id (str): The meme id.
+
+        Returns:
+            bytes: The image or None if it is not in the spool.
+        """
+        if self.settings is None:
+            return None
+        try:
+            return await asyncio.to_thread(self._read, meme_id)
+        except FileNotFoundError:
+            return None
+
+    def discard(self, meme_id: str):
+        """Remove the image from the spool, e.g. the meme was deleted.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        if self.settings is None:
+            return
+        try:
+            os.unlink(self._path(meme_id))
+        except FileNotFoundError:
+            pass
+
+    async def supersede(self, meme_id: str):
+        """Remove the image from the spool before it is replaced or deleted.
+
+        An upload of the image in progress is waited for, so it cannot
+        finish after the new image and overwrite it.
+
+        Args:
+            meme_id (str): The meme id.
+        """
+        if self.settings is None:
+            return
+        await asyncio.to_thread(self._supersede, meme_id)
+
+    def _supersede(self, meme_id: str):
+        try:
+            file = open(self._path(meme_id), "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            self.discard(meme_id)
+
+    def _path(self, meme_id: str) -> str:
+        return os.path.join(self.settings.spool_dir, meme_id + EXTENSION)
+
+    def _write(self, meme_id: str, content: bytes):
+        path = self._path(meme_id)
+        with open(path + ".tmp", "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        directory = os.open(self.settings.spool_dir, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _read(self, meme_id: str) -> bytes:
+        with open(self._path(meme_id), "rb") as file:
+            return file.read()
+
+    def _submit(self, meme_id: str):
+        if meme_id not in self._pending:
+            self._pending.add(meme_id)
+            self._queue.put_nowait(meme_id)
+
+    async def _drain(self):
+        """Upload the spooled images until cancelled."""
+        while True:
+            batch = [await self._queue.get()]
+            while (
+                len(batch) < self.settings.spool_batch_size and not self._queue.empty()
+            ):
+                batch.append(self._queue.get_nowait())
+            semaphore = asyncio.Semaphore(self.settings.spool_concurrency)
+
+            async def push(meme_id: str) -> Optional[bool]:
+                async with semaphore:
+                    return await self._push(meme_id)
+
+            results = await asyncio.gather(
+                *(push(meme_id) for meme_id in batch), return_exceptions=True
+            )
+            uploaded = []
+            for meme_id, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    await self._retry(meme_id, result)
+                elif result:
+                    uploaded.append(meme_id)
+                else:
+                    self._pending.discard(meme_id)
+            if uploaded:
+                try:
+                    await self._complete(uploaded)
+                except Exception as e:
+                    for meme_id in uploaded:
+                        await self._retry(meme_id, e)
+
+    async def _push(self, meme_id: str) -> Optional[bool]:
+        """Upload the spooled image.
+
+        Returns:
+            bool: True if uploaded, None if the image is gone or is being
+                uploaded by another process.
+        """
+        try:
+            file = open(self._path(meme_id), "rb")
+        except FileNotFoundError:
+            return None
+        with file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            if os.fstat(file.fileno()).st_nlink == 0:
+                # superseded while it was being opened
+                return None
+            content = await asyncio.to_thread(file.read)
+            await self.app.store.s3.upload(meme_id, content)
+        return True
+
+    async def _complete(self, meme_ids: list[str]):
+        """Mark the memes as uploaded and remove their images from the spool."""
+        query = (
+            self.app.postgres.get_query_update(MemeModel, state=READY)
+            .where(MemeModel.id.in_(meme_ids), MemeModel.state == PENDING)
+            .returning(MemeModel.id)
+        )
+        result = await self.app.postgres.query_execute(query)
+        for meme_id in result.scalars():
+            await self.app.store.images.schedule_metadata(str(meme_id))
+        for meme_id in meme_ids:
+            self.discard(meme_id)
+            self._pending.discard(meme_id)
+            self._attempts.pop(meme_id, None)
+
+    async def _retry(self, meme_id: str, error: BaseException):
+        attempts = self._attempts[meme_id] = self._attempts.get(meme_id, 0) + 1
+        if attempts >= self.settings.spool_max_attempts:
+            await self._give_up(meme_id, attempts, error)
+            return
+        delay = min(
+            self.settings.spool_retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY
+        )
+        self.logger.warning(
+            f"{self.__class__.__name__} upload of {meme_id} failed, "
+            f"attempt {attempts}, retry in {delay}s: {error}"
+        )
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, meme_id)
+
+    async def _give_up(self, meme_id: str, attempts: int, error: BaseException):
+        """Set the image aside as `.failed` and delete its meme."""
+        self.logger.error(
+            f"{self.__class__.__name__} upload of {meme_id} failed "
+            f"{attempts} times, set aside, the meme is deleted: {error}"
+        )
+        try:
+            os.replace(self._path(meme_id), self._path(meme_id) + FAILED)
+        except FileNotFoundError:
+            pass
+        self._pending.discard(meme_id)
+        self._attempts.pop(meme_id, None)
+        try:
+            await self.app.store.memes.delete_meme(uuid.UUID(meme_id))
+        except MemNotFoundException:
+            pass
+        except Exception as e:
+            self.logger.error(
+                f"{self.__class__.__name__} meme {meme_id} is not deleted: {e}"
+            )
+
+    async def _scan(self):
+        """Periodically pick up the images left by stopped processes."""
+        while True:
+            try:
+                expired = time.time() - self.settings.spool_scan_interval
+                for entry in await asyncio.to_thread(
+                    lambda: list(os.scandir(self.settings.spool_dir))
+                ):
+                    if entry.stat().st_mtime >= expired:
+                        continue
+                    if entry.name.endswith(EXTENSION):
+                        self._submit(entry.name.removesuffix(EXTENSION))
+                    elif entry.name.endswith(EXTENSION + ".tmp"):
+                        os.unlink(entry.path)
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} scan failed: {e}")
+            await asyncio.sleep(self.settings.spool_scan_interval)
@@ -1,8 +1,20 @@
 """A module describing services for working with data."""
 
+from store.bus.accessor import InvalidationBus
 from store.database.postgres import Postgres
+from store.health.accessor import HealthAccessor
+from store.idempotency.accessor import IdempotencyAccessor
+from store.images.accessor import METADATA_JOB, VARIANTS_JOB, ImageAccessor
+from store.imports.accessor import ImportAccessor
+from store.jobs.accessor import JobAccessor
 from store.memes.accessor import MemAccessor
 from store.s3.accessor import S3Accessor
+from store.similar.accessor import SimilarAccessor
+from store.spool.accessor import SpoolAccessor
+from store.tags.accessor import TagAccessor
+from store.templates.accessor import TemplateAccessor
+from store.trending.accessor import TrendingAccessor
+from store.views.accessor import ViewAccessor
 
 
 class Store:
@@ -14,8 +26,25 @@ class Store:
         Args:
             app: The application
         """
+        self.bus = InvalidationBus(app)
         self.memes = MemAccessor(app)
         self.s3 = S3Accessor(app)
+        self.images = ImageAccessor(app)
+        self.jobs = JobAccessor(app)
+        self.jobs.register(METADATA_JOB, self.images.extract_metadata)
+        self.jobs.register(VARIANTS_JOB, self.images.delete_variants)
+        self.similar = SimilarAccessor(app)
+        self.imports = ImportAccessor(app)
+        self.idempotency = IdempotencyAccessor(app)
+        self.spool = SpoolAccessor(app)
+        self.views = ViewAccessor(app)
+        self.trending = TrendingAccessor(app)
+        self.templates = TemplateAccessor(app)
+        self.tags = TagAccessor(app)
+        self.health = HealthAccessor(app)
+        self.bus.subscribe(self.images.invalidate)
+        self.bus.subscribe(self.similar.invalidate)
+        self.bus.subscribe(self.trending.invalidate)
 
 
 def setup_store(app):
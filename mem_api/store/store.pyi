@@ -1,12 +1,36 @@
 from core.app import ApplicationImage
+from store.bus.accessor import InvalidationBus
+from store.health.accessor import HealthAccessor
+from store.idempotency.accessor import IdempotencyAccessor
+from store.images.accessor import ImageAccessor
+from store.imports.accessor import ImportAccessor
+from store.jobs.accessor import JobAccessor
 from store.memes.accessor import MemAccessor
 from store.s3.accessor import S3Accessor
+from store.similar.accessor import SimilarAccessor
+from store.spool.accessor import SpoolAccessor
+from store.tags.accessor import TagAccessor
+from store.templates.accessor import TemplateAccessor
+from store.trending.accessor import TrendingAccessor
+from store.views.accessor import ViewAccessor
 
 class Store:
     """Data management service"""
 
+    bus: InvalidationBus
     memes: MemAccessor
     s3: S3Accessor
+    images: ImageAccessor
+    jobs: JobAccessor
+    similar: SimilarAccessor
+    imports: ImportAccessor
+    idempotency: IdempotencyAccessor
+    spool: SpoolAccessor
+    views: ViewAccessor
+    trending: TrendingAccessor
+    templates: TemplateAccessor
+    tags: TagAccessor
+    health: HealthAccessor
 
     def __init__(self, app: ApplicationImage):
         """
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, bindparam
+
+from base.base_accessor import BaseAccessor
+from core.settings import TagSettings
+from store.database.postgres import Row
+
+LOCK_ID = 0x6D656D5F74616773
+
+# the materialized view, not a part of the models
+TAG_COUNTS = Table(
+    "meme_tag_counts",
+    MetaData(),
+    Column("tag", String),
+    Column("count", BigInteger),
+)
+
+
+class TagAccessor(BaseAccessor):
+    """Tag counts of the memes.
+
+    The counts are kept in the `meme_tag_counts` materialized view, which
+    is periodically refreshed, so a request only reads the ready counts.
+    The processes take turns through an advisory lock, only one of them
+    refreshes the view at a time. `REFRESH ... CONCURRENTLY` does not block
+    the readers.
+    """
+
+    settings: Optional[TagSettings] = None
+
+    def _init(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        self.settings = TagSettings()
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    async def get_counts(self, limit: int) -> list[Row]:
+        """The most used tags.
+
+        Args:
+            limit (int): The number of tags.
+
+        Returns:
+            list[Row]: The tags with the numbers of memes, the most used first.
+        """
+        return await self.app.postgres.fetch(
+            "tag_counts",
+            lambda: self.app.postgres.get_query_select(TAG_COUNTS)
+            .order_by(TAG_COUNTS.c.count.desc(), TAG_COUNTS.c.tag)
+            .limit(bindparam("limit")),
+            limit=limit,
+        )
+
+    async def refresh(self) -> bool:
+        """Refresh the counts unless another process is refreshing them.
+
+        Returns:
+            bool: Whether the counts were refreshed.
+        """
+        name = self.app.postgres.full_name(TAG_COUNTS)
+        async with self.app.postgres.raw_connection() as connection:
+            async with connection.transaction():
+                if not await connection.fetchval(
+                    "SELECT pg_try_advisory_xact_lock($1)", LOCK_ID
+                ):
+                    return False
+                await connection.execute(
+                    f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"
+                )
+        return True
+
+    async def _run(self):
+        """Refresh the counts periodically until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} refresh failed: {e}")
+            await asyncio.sleep(self.settings.tags_refresh_interval)
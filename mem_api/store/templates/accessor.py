@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+from PIL import Image, ImageColor
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.postgresql import insert
+
+from base.base_accessor import BaseAccessor
+from core.settings import TemplateSettings
+from store.templates.exeptions import (
+    TemplateColorException,
+    TemplateEmptyTextException,
+    TemplateNotFoundException,
+    TemplateRenderException,
+)
+from store.templates.models import GenerationModel
+from store.templates.rendering import load_templates, render_meme, template_files
+
+
+class Template(NamedTuple):
+    name: str
+    width: int
+    height: int
+    version: int
+
+
+class TemplateAccessor(BaseAccessor):
+    """Quick memes: captions drawn on the template images.
+
+    The templates are the images of `template_dir`. Rendering runs in
+    a dedicated process pool whose workers decode the templates and load
+    the font once. A generated meme is stored like an uploaded one and
+    remembered by the fingerprint of the template and the captions, so the
+    same meme is never rendered twice: a repeated generation returns the
+    existing meme, concurrent ones in the process wait for the first.
+    A meme rendered at the same time by another process is discarded.
+    """
+
+    settings: Optional[TemplateSettings] = None
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    def _init(self):
+        self.templates: dict[str, Template] = {}
+        self._running: dict[str, asyncio.Future] = {}
+
+    async def connect(self):
+        self.settings = TemplateSettings()
+        self.load()
+        self.logger.info(
+            f"{self.__class__.__name__} connected, templates: {len(self.templates)}"
+        )
+
+    async def disconnect(self):
+        if self._pool:
+            self._pool.shutdown(cancel_futures=True)
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    def load(self):
+        """Read the catalogue and start the render pool."""
+        self.templates = {}
+        for name, path in sorted(template_files(self.settings.template_dir).items()):
+            with Image.open(path) as image:
+                width, height = image.size
+            self.templates[name] = Template(
+                name, width, height, os.stat(path).st_mtime_ns
+            )
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.settings.template_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=load_templates,
+            initargs=(self.settings.template_dir, self.settings.template_font),
+        )
+
+    async def generate(self, name: str, top: str, bottom: str, color: str) -> str:
+        """Create the meme from the template.
+
+        Args:
+            name (str): The template name.
+            top (str): The caption at the top.
+            bottom (str): The caption at the bottom.
+            color (str): The text color, a name or #rrggbb.
+
+        Returns:
+            str: The id of the generated meme.
+        """
+        if (template := self.templates.get(name)) is None:
+            raise TemplateNotFoundException()
+        top, bottom = (top or "").strip(), (bottom or "").strip()
+        if not top and not bottom:
+            raise TemplateEmptyTextException()
+        try:
+            ImageColor.getrgb(color)
+        except ValueError as e:
+            raise TemplateColorException(exception=e)
+        fingerprint = hashlib.sha256(
+            json.dumps([name, template.version, top, bottom, color]).encode()
+        ).hexdigest()
+        while running := self._running.get(fingerprint):
+            await asyncio.wait([running])
+        running = self._running[fingerprint] = (
+            asyncio.get_running_loop().create_future()
+        )
+        try:
+            return await self._generate(fingerprint, template, top, bottom, color)
+        finally:
+            del self._running[fingerprint]
+            running.set_result(None)
+
+    async def _generate(
+        self, fingerprint: str, template: Template, top: str, bottom: str, color: str
+    ) -> str:
+        if meme_id := await self._generated(fingerprint):
+            return meme_id
+        try:
+            content = await asyncio.get_running_loop().run_in_executor(
+                self._pool,
+                render_meme,
+                template.name,
+                top,
+                bottom,
+                color,
+                self.settings.template_quality,
+            )
+        except Exception as e:
+            raise TemplateRenderException(exception=e)
+        meme = await self.app.store.memes.create_meme(
+            " ".join(filter(None, (top, bottom)))
+        )
+        meme_id = str(meme.id)
+        await self.app.store.s3.upload(meme_id, content)
+        await self.app.store.images.schedule_metadata(meme_id)
+        query = (
+            insert(GenerationModel)
+            .values(fingerprint=fingerprint, meme_id=meme.id)
+            .on_conflict_do_nothing(index_elements=[GenerationModel.fingerprint])
+            .returning(GenerationModel.id)
+        )
+        result = await self.app.postgres.query_execute(query)
+        if result.scalar_one_or_none() is None:
+            # another process generated the same meme meanwhile
+            await self.app.store.s3.delete(meme_id)
+            await self.app.store.memes.delete_meme(meme.id)
+            return await self._generated(fingerprint)
+        return meme_id
+
+    async def _generated(self, fingerprint: str) -> Optional[str]:
+        rows = await self.app.postgres.fetch(
+            "generation",
+            lambda: self.app.postgres.get_query_select(GenerationModel.meme_id).where(
+                GenerationModel.fingerprint == bindparam("fingerprint")
+            ),
+            read_only=False,
+            fingerprint=fingerprint,
+        )
+        return str(rows[0].meme_id) if rows else None
@@ -0,0 +1,17 @@
+from base.base_exception import ExceptionBase
+
+
+class TemplateNotFoundException(ExceptionBase):
+    args = ("Шаблон мема не найден.",)
+
+
+class TemplateColorException(ExceptionBase):
+    args = ("Неизвестный цвет текста. Укажите название цвета или #rrggbb.",)
+
+
+class TemplateEmptyTextException(ExceptionBase):
+    args = ("Укажите текст сверху и/или снизу картинки.",)
+
+
+class TemplateRenderException(ExceptionBase):
+    args = ("Не удалось создать мем по шаблону.",)
@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from store.database.postgres import Base
+from store.memes.models import MemeModel
+
+
+class GenerationModel(Base):
+    __tablename__ = "generations"
+
+    fingerprint: Mapped[str] = mapped_column(init=False, unique=True)
+    meme_id: Mapped[UUID] = mapped_column(
+        ForeignKey(MemeModel.id, ondelete="CASCADE"), init=False
+    )
@@ -0,0 +1,144 @@
+"""Rendering of the memes from templates.
+
+The functions are executed in the worker processes of the template pool.
+Every worker decodes the templates once, in `load_templates`, and keeps
+the fonts and the measured line breaks, so a render only draws the text
+and encodes the image.
+"""
+
+import os
+from functools import lru_cache
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+MIN_FONT_SIZE = 12
+MARGIN = 0.03
+TEXT_WIDTH = 0.94
+TEXT_HEIGHT = 0.3
+
+TEMPLATES: dict[str, Image.Image] = {}
+FONT = "DejaVuSans-Bold.ttf"
+
+
+def template_files(directory: str) -> dict[str, str]:
+    """Find the template images.
+
+    Args:
+        directory (str): The template directory.
+
+    Returns:
+        dict[str, str]: The paths by the template names.
+    """
+    if not os.path.isdir(directory):
+        return {}
+    return {
+        os.path.splitext(entry.name)[0]: entry.path
+        for entry in os.scandir(directory)
+        if entry.name.lower().endswith(EXTENSIONS)
+    }
+
+
+def load_templates(directory: str, font: str):
+    """Worker initializer, decodes the templates.
+
+    Args:
+        directory (str): The template directory.
+        font (str): The TrueType font file, a name is searched for
+            in the system font directories.
+    """
+    global FONT
+    FONT = font
+    for name, path in template_files(directory).items():
+        with Image.open(path) as image:
+            TEMPLATES[name] = ImageOps.exif_transpose(image).convert("RGB")
+
+
+@lru_cache(maxsize=64)
+def get_font(size: int) -> ImageFont.FreeTypeFont:
+    """The caption font, the bundled Pillow font if the file is not found."""
+    try:
+        return ImageFont.truetype(FONT, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=1024)
+def wrap(text: str, size: int, width: int) -> Optional[tuple[str, ...]]:
+    """Break the text into lines not wider than `width`.
+
+    Returns:
+        tuple[str, ...]: The lines or None if a word does not fit.
+    """
+    font = get_font(size)
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if font.getlength(candidate) <= width:
+            line = candidate
+        elif font.getlength(word) > width:
+            return None
+        else:
+            lines.append(line)
+            line = word
+    return tuple(lines + [line])
+
+
+def fit(text: str, width: int, height: int) -> tuple[int, tuple[str, ...]]:
+    """Choose the largest font size at which the text fits into the box.
+
+    Returns:
+        tuple: The font size and the lines.
+    """
+    size = max(height // 3, MIN_FONT_SIZE)
+    while True:
+        lines = wrap(text, size, width)
+        ascent, descent = get_font(size).getmetrics()
+        if size <= MIN_FONT_SIZE or (
+            lines and len(lines) * (ascent + descent) <= height
+        ):
+            return size, lines or (text,)
+        size = max(int(size * 0.9), MIN_FONT_SIZE)
+
+
+def render_meme(name: str, top: str, bottom: str, color: str, quality: int) -> bytes:
+    """Draw the captions at the top and the bottom of the template.
+
+    Args:
+        name (str): The template name.
+        top (str): The caption at the top.
+        bottom (str): The caption at the bottom.
+        color (str): The text color, the outline is black.
+        quality (int): The JPEG quality.
+
+    Returns:
+        bytes: The JPEG image.
+    """
+    image = TEMPLATES[name].copy()
+    draw = ImageDraw.Draw(image)
+    margin = int(image.height * MARGIN)
+    box = (int(image.width * TEXT_WIDTH), int(image.height * TEXT_HEIGHT))
+    for text, at_top in ((top, True), (bottom, False)):
+        if not text:
+            continue
+        size, lines = fit(text.upper(), *box)
+        font = get_font(size)
+        ascent, descent = font.getmetrics()
+        line_height = ascent + descent
+        y = margin if at_top else image.height - margin - line_height * len(lines)
+        for line in lines:
+            draw.text(
+                (image.width // 2, y),
+                line,
+                font=font,
+                fill=color,
+                anchor="ma",
+                stroke_width=max(size // 15, 1),
+                stroke_fill="black",
+            )
+            y += line_height
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
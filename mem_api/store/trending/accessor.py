@@ -0,0 +1,188 @@
+import asyncio
+import json
+import time
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, Float, column, func, select, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert
+
+from base.base_accessor import BaseAccessor
+from core.settings import TrendingSettings
+from store.bus.accessor import FLUSH
+from store.memes.models import READY, MemeModel
+from store.trending.models import TrendingModel
+
+CLEANUP_INTERVAL = 3600
+
+
+class TrendingAccessor(BaseAccessor):
+    """The most viewed memes of the recent time.
+
+    Every view adds 1 to the score of the meme, the score decays
+    exponentially with `trending_half_life`. The process keeps the scores
+    gained since the last merge in memory and periodically adds them, decayed
+    to the moment of the merge, to the shared scores in Postgres with one
+    `INSERT ... ON CONFLICT` statement. After the merge the top memes are
+    read back and rendered to JSON once, requests get the ready snapshot.
+    On shutdown the periodic refresh is stopped, not cancelled, and the
+    last flush merges what is left.
+    """
+
+    settings: Optional[TrendingSettings] = None
+
+    def _init(self):
+        self._scores: dict[UUID, tuple[float, float]] = {}
+        self._snapshot = b"[]"
+        self._ids: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._cleaned = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        self.settings = TrendingSettings()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        if self._task:
+            # a refresh in progress completes
+            self._stopped.set()
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._scores:
+            await self.flush()
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    @property
+    def snapshot(self) -> bytes:
+        """The trending memes as a JSON array, the most popular first."""
+        return self._snapshot
+
+    def hit(self, meme_id: UUID):
+        """Count a view of the meme.
+
+        Args:
+            meme_id (UUID): The meme id.
+        """
+        now = time.monotonic()
+        score, moment = self._scores.get(meme_id, (0.0, now))
+        self._scores[meme_id] = (self._decay(score, now - moment) + 1, now)
+
+    def invalidate(self, kind: str, meme_id: Optional[str], data: dict):
+        """Invalidation bus handler, refreshes the snapshot with a changed meme."""
+        if kind == FLUSH or (kind in ("update", "delete") and meme_id in self._ids):
+            self._wakeup.set()
+
+    async def refresh(self):
+        """Merge the scores of the process and render the snapshot."""
+        await self.flush()
+        decay = self._decay_since(TrendingModel.modified)
+        score = (TrendingModel.score * decay).label("score")
+        query = (
+            select(
+                MemeModel.id,
+                MemeModel.title,
+                MemeModel.width,
+                MemeModel.height,
+                MemeModel.size,
+                MemeModel.mime_type,
+                MemeModel.views,
+                score,
+            )
+            .join(TrendingModel, TrendingModel.meme_id == MemeModel.id)
+            .where(MemeModel.state == READY)
+            .order_by(score.desc())
+            .limit(self.settings.trending_size)
+        )
+        result = await self.app.postgres.query_execute(query, read_only=True)
+        memes = [row._asdict() for row in result]
+        self._snapshot = json.dumps(memes, default=str).encode()
+        self._ids = {str(meme["id"]) for meme in memes}
+        if time.monotonic() - self._cleaned > CLEANUP_INTERVAL:
+            await self.app.postgres.query_execute(
+                self.app.postgres.get_query_delete(TrendingModel).where(
+                    TrendingModel.score * decay < self.settings.trending_min_score
+                )
+            )
+            self._cleaned = time.monotonic()
+
+    async def flush(self):
+        """Add the scores of the process to the shared scores.
+
+        The scores of a failed merge are dropped, the list is approximate,
+        the scores of an interrupted one are kept for the next merge.
+        """
+        scores, self._scores = self._scores, {}
+        if not scores:
+            return
+        now = time.monotonic()
+        counts = values(
+            column("meme_id", PG_UUID(as_uuid=True)),
+            column("score", Float),
+            name="counts",
+        ).data(
+            [
+                (meme_id, self._decay(score, now - moment))
+                for meme_id, (score, moment) in sorted(scores.items())
+            ]
+        )
+        # memes deleted meanwhile are skipped instead of failing the whole merge
+        query = insert(TrendingModel).from_select(
+            ["meme_id", "score"],
+            select(counts.c.meme_id, counts.c.score).join(
+                MemeModel, MemeModel.id == counts.c.meme_id
+            ),
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[TrendingModel.meme_id],
+            set_={
+                "score": TrendingModel.score * self._decay_since(TrendingModel.modified)
+                + query.excluded.score,
+                "modified": func.current_timestamp(),
+            },
+        )
+        try:
+            await self.app.postgres.query_execute(query)
+        except Exception as e:
+            self.logger.warning(f"{self.__class__.__name__} merge failed: {e}")
+        except BaseException:
+            self._restore(scores)
+            raise
+
+    def _restore(self, scores: dict[UUID, tuple[float, float]]):
+        """Put back the scores of an interrupted merge, adding the new views."""
+        for meme_id, (score, moment) in scores.items():
+            if meme_id in self._scores:
+                newer, now = self._scores[meme_id]
+                score, moment = self._decay(score, now - moment) + newer, now
+            self._scores[meme_id] = (score, moment)
+
+    def _decay(self, score: float, elapsed: float) -> float:
+        return score * 0.5 ** (elapsed / self.settings.trending_half_life)
+
+    def _decay_since(self, moment: ColumnElement) -> ColumnElement:
+        return func.power(
+            0.5,
+            func.extract("epoch", func.current_timestamp() - moment)
+            / self.settings.trending_half_life,
+        )
+
+    async def _run(self):
+        """Refresh the snapshot periodically until stopped."""
+        while not self._stopped.is_set():
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.logger.error(f"{self.__class__.__name__} refresh failed: {e}")
+            if self._stopped.is_set():
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), self.settings.trending_interval
+                )
+            except asyncio.TimeoutError:
+                pass
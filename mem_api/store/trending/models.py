@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from sqlalchemy import Float, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from store.database.postgres import Base
+from store.memes.models import MemeModel
+
+
+class TrendingModel(Base):
+    __tablename__ = "trending_scores"
+
+    meme_id: Mapped[UUID] = mapped_column(
+        ForeignKey(MemeModel.id, ondelete="CASCADE"), init=False, unique=True
+    )
+    score: Mapped[float] = mapped_column(Float, init=False)
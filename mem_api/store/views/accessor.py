@@ -0,0 +1,99 @@
+import asyncio
+from collections import Counter
+from itertools import islice
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import BigInteger, column, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+
+from base.base_accessor import BaseAccessor
+from core.settings import ViewSettings
+from store.memes.models import MemeModel
+
+
+class ViewAccessor(BaseAccessor):
+    """Write-behind view counters of the memes.
+
+    A view only increments a counter in the memory of the process. The
+    counters are periodically written to Postgres with one
+    `UPDATE ... FROM (VALUES ...)` statement per batch, so a popular meme
+    costs one row update per flush instead of one per view. The counters
+    of a failed or interrupted flush are kept for the next one. On shutdown
+    the periodic flush is stopped, not cancelled, and the last flush writes
+    what is left.
+    """
+
+    settings: Optional[ViewSettings] = None
+
+    def _init(self):
+        self._counts: Counter[UUID] = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = asyncio.Event()
+
+    async def connect(self):
+        self.settings = ViewSettings()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"{self.__class__.__name__} connected")
+
+    async def disconnect(self):
+        if self._task:
+            # a flush in progress completes
+            self._stopped.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._counts:
+            await self.flush()
+        self.logger.info(f"{self.__class__.__name__} disconnected")
+
+    def count(self, meme_id: UUID):
+        """Count a view of the meme.
+
+        Args:
+            meme_id (UUID): The meme id.
+        """
+        self._counts[meme_id] += 1
+
+    async def flush(self):
+        """Write the buffered views to Postgres."""
+        counts, self._counts = self._counts, Counter()
+        # a stable order of the row locks, the processes flush concurrently
+        items = iter(sorted(counts.items()))
+        while batch := list(islice(items, self.settings.views_batch_size)):
+            try:
+                await self._update(batch)
+            except BaseException as e:
+                self._counts.update(dict(batch))
+                self._counts.update(dict(items))
+                if not isinstance(e, Exception):
+                    raise  # cancelled, the counts are kept
+                self.logger.warning(f"{self.__class__.__name__} flush failed: {e}")
+                return
+
+    async def _update(self, batch: list[tuple[UUID, int]]):
+        counts = values(
+            column("id", PG_UUID(as_uuid=True)),
+            column("views", BigInteger),
+            name="counts",
+        ).data(batch)
+        query = (
+            self.app.postgres.get_query_update(
+                MemeModel,
+                views=MemeModel.views + counts.c.views,
+                created=MemeModel.created,
+                modified=MemeModel.modified,
+            )
+        ).where(MemeModel.id == counts.c.id)
+        await self.app.postgres.query_execute(query)
+
+    async def _run(self):
+        """Flush the counters periodically until stopped."""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._stopped.wait(), self.settings.views_flush_interval
+                )
+            except asyncio.TimeoutError:
+                await self.flush()
+            else:
+                return
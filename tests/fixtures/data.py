@@ -1,6 +1,7 @@
 import pytest
 
 from sqlalchemy import text
+from store.memes.models import MemeModel
 
 meme1_id = "57e87c2d-bb27-46a2-9451-af401f7aec16"
 meme2_id = "57e87c2d-bb27-46a2-9451-af401f7aec17"
@@ -15,51 +16,65 @@ title_4 = "test_4"
 title_5 = "test_5"
 
 
+def meme(meme_id: str, title: str) -> dict:
+    """The meme as returned by the list of memes."""
+    return {
+        "id": meme_id,
+        "title": title,
+        "width": None,
+        "height": None,
+        "size": None,
+        "mime_type": None,
+        "views": 0,
+        "tags": [],
+    }
+
+
 @pytest.fixture
 async def data_1(application):
-    table = [table for table in application.postgres._db.metadata.tables.keys()][0]
+    table = application.postgres.full_name(MemeModel.__table__)
     await application.postgres.query_execute(
         text(f"INSERT INTO {table} (id, title) " f"VALUES ('{meme1_id}', '{title_1}');")
     )
     await application.postgres._engine.dispose()
-    return {"id": meme1_id, "title": title_1}
+    return meme(meme1_id, title_1)
 
 
 @pytest.fixture
 async def data_2(application):
-    table = [table for table in application.postgres._db.metadata.tables.keys()][0]
+    table = application.postgres.full_name(MemeModel.__table__)
     await application.postgres.query_execute(
         text(f"INSERT INTO {table} (id, title) " f"VALUES ('{meme2_id}', '{title_2}');")
     )
     await application.postgres._engine.dispose()
-    return {"id": meme2_id, "title": title_2}
+    return meme(meme2_id, title_2)
 
 
 @pytest.fixture
 async def data_3(application):
-    table = [table for table in application.postgres._db.metadata.tables.keys()][0]
+    table = application.postgres.full_name(MemeModel.__table__)
     await application.postgres.query_execute(
         text(f"INSERT INTO {table} (id, title) " f"VALUES ('{meme3_id}', '{title_3}');")
     )
     await application.postgres._engine.dispose()
-    return {"id": meme3_id, "title": title_3}
+    return meme(meme3_id, title_3)
 
 
 @pytest.fixture
 async def data_4(application):
-    table = [table for table in application.postgres._db.metadata.tables.keys()][0]
+    table = application.postgres.full_name(MemeModel.__table__)
     await application.postgres.query_execute(
         text(f"INSERT INTO {table} (id, title) " f"VALUES ('{meme4_id}', '{title_4}');")
     )
     await application.postgres._engine.dispose()
-    return {"id": meme4_id, "title": title_4}
+    return meme(meme4_id, title_4)
 
 
 @pytest.fixture
 async def data_5(application):
-    table = [table for table in application.postgres._db.metadata.tables.keys()][0]
+    table = application.postgres.full_name(MemeModel.__table__)
     await application.postgres.query_execute(
         text(f"INSERT INTO {table} (id, title) " f"VALUES ('{meme5_id}', '{title_5}');")
     )
     await application.postgres._engine.dispose()
-    return {"id": meme5_id, "title": title_5}
+    return meme(meme5_id, title_5)
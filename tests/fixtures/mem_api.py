@@ -1,23 +1,44 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
 import pytest
 from fastapi.testclient import TestClient
 
-from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
-from core.settings import PostgresSettings, S3Settings
+
+from core.settings import (
+    BusSettings,
+    CacheSettings,
+    HealthSettings,
+    IdempotencySettings,
+    ImageSettings,
+    ImportSettings,
+    JobSettings,
+    PostgresSettings,
+    S3Settings,
+    SpoolSettings,
+    TagSettings,
+    TemplateSettings,
+    TrendingSettings,
+    ViewSettings,
+)
+from conftest import BASE_DIR
 from core.setup import setup_app
 from core.app import Application
-from store.database.postgres import Base
+from store.cache.lru import LRUCache
+from store.cache.shared import SharedCache
+from store.database.postgres import Base, Postgres
 
 
-def connect_db(app: Application) -> None:
+def connect_db(app: Application, postgres: Optional[Postgres] = None) -> None:
     """Configuring the connection to the database."""
-    app.postgres.settings = PostgresSettings()
-    app.postgres._db = Base
-    app.postgres._engine = create_async_engine(
-        app.postgres.settings.dsn(True),
-        echo=False,
-        future=True,
-    )
+    postgres = postgres or app.postgres
+    postgres.settings = PostgresSettings()
+    postgres._db = Base
+    postgres._engine = postgres.create_engine(postgres.settings.dsn(True))
 
 
 def connect_s3(app: Application) -> None:
@@ -27,18 +48,48 @@ def connect_s3(app: Application) -> None:
     )
 
 
+def connect_store(app: Application) -> None:
+    """Configuring the accessors without starting their background tasks."""
+    app.store.bus.settings = BusSettings()
+    app.store.images.settings = ImageSettings()
+    app.store.images.cache = LRUCache(app.store.images.settings.image_cache_size)
+    app.store.images._pool = ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    )
+    app.store.images.cache_settings = CacheSettings(
+        cache_path=os.path.join(tempfile.gettempdir(), "mem_api_test_cache")
+    )
+    app.store.images.hot = SharedCache(
+        app.store.images.cache_settings.cache_path,
+        app.store.images.cache_settings.cache_size,
+        app.store.images.cache_settings.cache_slots,
+    )
+    app.store.imports.settings = ImportSettings()
+    app.store.jobs.settings = JobSettings()
+    app.store.idempotency.settings = IdempotencySettings()
+    app.store.spool.settings = SpoolSettings()
+    app.store.views.settings = ViewSettings()
+    app.store.trending.settings = TrendingSettings()
+    app.store.tags.settings = TagSettings()
+    app.store.health.settings = HealthSettings()
+    app.store.templates.settings = TemplateSettings(
+        template_dir=os.path.join(BASE_DIR, "data")
+    )
+    app.store.templates.load()
+
+
 @pytest.fixture(autouse=True)
 async def clean_db(application) -> None:
     tables = application.postgres._db.metadata.tables
     query = ""
-    for table in tables:
-        query += f"TRUNCATE TABLE {table} cascade;"
+    for table in tables.values():
+        query += f"TRUNCATE TABLE {application.postgres.full_name(table)} cascade;"
         await application.postgres.query_execute(text(query))
     await application.postgres._engine.dispose()
 
 
 @pytest.fixture(autouse=True)
-def application() -> Application:
+def application() -> Iterator[Application]:
     """Creates and configures the main FastAPI application.
 
     Returns:
@@ -52,7 +103,11 @@ def application() -> Application:
     app = setup_app()
     connect_db(app)
     connect_s3(app)
-    return app
+    connect_store(app)
+    yield app
+    app.store.images._pool.shutdown()
+    app.store.templates._pool.shutdown()
+    app.store.images.hot.close()
 
 
 @pytest.fixture()
@@ -1,8 +1,58 @@
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
 import os
+import time
 import uuid
+import zipfile
 
+import asyncpg
+import pytest
 from conftest import BASE_DIR
-from fixtures.data import meme1_id, title_1
+from core.context import DeadlineExceededException, deadline
+from core.settings import (
+    BusSettings,
+    GuardSettings,
+    JobSettings,
+    SpoolSettings,
+)
+from fixtures.data import meme1_id, meme2_id, meme3_id, title_1
+from fixtures.mem_api import connect_db
+from sqlalchemy import text
+from store.bus.accessor import FLUSH
+from store.cache.shared import SharedCache
+from store.database.postgres import Postgres
+from store.guard.breaker import CLOSED, OPEN
+from store.images.models import VariantModel
+from store.images.processing import extract_metadata
+from store.jobs.models import JobModel
+from store.memes.models import MemeModel
+from store.s3.exeptions import S3FileNotFoundException
+
+
+def cached_value(number: int) -> bytes:
+    return hashlib.sha256(str(number).encode()).digest() * 2048
+
+
+class PausedView:
+    """A view of the shared memory which pauses before a write."""
+
+    def __init__(self, view: memoryview, paused):
+        self.view, self.paused = view, paused
+
+    def __setitem__(self, key: slice, value: bytes):
+        self.paused.set()
+        time.sleep(0.5)
+        self.view[key] = value
+
+
+def set_paused(path: str, paused):
+    """Put a value into the cache, pausing before the bytes are copied."""
+    cache = SharedCache(path, 1024 * 1024, 256, margin=0)
+    cache._view = PausedView(cache._view, paused)
+    cache.set("paused", 1, bytes(len(cached_value(0))))
 
 
 class TestGetMemes:
@@ -42,6 +92,415 @@ class TestGetMemes:
         ), f"Ожидает {data_5}. Получено: {response.json()[0]}"
 
 
+class TestExportMemes:
+    async def test_export_ndjson(self, client, data_1, data_2):
+        """Проверка выгрузки всех мемов в формате NDJSON."""
+        response = client.get("/memes/export")
+        assert response.status_code == 200
+        memes = [json.loads(line) for line in response.text.splitlines()]
+        assert [data_1["id"], data_2["id"]] == [meme["id"] for meme in memes]
+
+    async def test_export_since(self, client, data_1, data_2):
+        """Проверка инкрементальной выгрузки мемов."""
+        response = client.get("/memes/export")
+        last = json.loads(response.text.splitlines()[-1])["modified"]
+        response = client.get(f"/memes/export?format=csv&since={last}")
+        assert response.status_code == 200
+        assert 1 == len(response.text.splitlines()), "Ожидает только заголовок"
+
+    async def test_export_since_utc(self, client, data_1, data_2):
+        """Проверка выгрузки с временем в UTC (суффикс Z)."""
+        response = client.get("/memes/export?since=2000-01-01T00:00:00Z")
+        assert response.status_code == 200
+        assert 2 == len(response.text.splitlines())
+
+
+class TestGetMeme:
+    @staticmethod
+    def create(client) -> str:
+        response = client.post(
+            "/memes",
+            files={"file": open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb")},
+            data={"text": title_1},
+        )
+        return response.json().get("message").split("id: ")[1]
+
+    def test_get_original(self, client):
+        """Проверка получения оригинальной картинки мема."""
+        meme_id = self.create(client)
+        response = client.get(f"/memes/{meme_id}")
+        assert response.status_code == 200
+        assert f"{meme_id}.jpg" in response.headers["Content-Disposition"]
+        with open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb") as file:
+            assert response.content == file.read()
+
+    def test_get_original_cached(self, application, client, monkeypatch):
+        """Повторное получение картинки из общего кэша."""
+        meme_id = self.create(client)
+        with open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb") as file:
+            content = file.read()
+        assert client.get(f"/memes/{meme_id}").content == content
+
+        async def download(name: str):
+            raise S3FileNotFoundException()
+
+        monkeypatch.setattr(application.store.s3, "download", download)
+        response = client.get(f"/memes/{meme_id}")
+        assert response.status_code == 200, "Картинка отдана из кэша, не из S3"
+        assert response.content == content
+
+    def test_shared_cache_processes(self, tmp_path):
+        """Процесс, обгоняемый кольцом, не портит чужие картинки."""
+        path = str(tmp_path / "cache")
+        cache = SharedCache(path, 1024 * 1024, 256, margin=0)
+        context = multiprocessing.get_context("fork")
+        paused = context.Event()
+        process = context.Process(target=set_paused, args=(path, paused))
+        process.start()
+        assert paused.wait(5)
+        for number in range(24):
+            cache.set(str(number), 1, cached_value(number))
+        process.join()
+        for number in range(24):
+            if entry := cache.get(str(number), 1):
+                assert bytes(entry.view) == cached_value(number)
+        assert cache.get("23", 1) is not None
+        cache.close()
+
+    def test_get_variant(self, client):
+        """Проверка получения уменьшенной картинки мема в формате webp."""
+        meme_id = self.create(client)
+        response = client.get(
+            f"/memes/{meme_id}?width=64", headers={"Accept": "image/webp"}
+        )
+        assert response.status_code == 200
+        assert f"{meme_id}.webp" in response.headers["Content-Disposition"]
+        assert "image/webp" == response.headers["Content-Type"]
+        assert response.content[8:12] == b"WEBP"
+
+    async def test_variants_deleted(self, application, client):
+        """Варианты картинки удаляются из хранилища вместе с мемом."""
+        meme_id = self.create(client)
+        response = client.get(
+            f"/memes/{meme_id}?width=64", headers={"Accept": "image/webp"}
+        )
+        assert response.status_code == 200
+        assert client.delete(f"/memes/{meme_id}").status_code == 200
+        await application.postgres._engine.dispose()
+
+        table = application.postgres.full_name(VariantModel.__table__)
+        query = text(f"SELECT object_name FROM {table};")
+        [object_name] = (await application.postgres.query_execute(query)).scalars()
+        assert await application.store.s3.read(object_name)
+        await TestJobs.drain(application)
+        assert [] == list((await application.postgres.query_execute(query)).scalars())
+        with pytest.raises(S3FileNotFoundException):
+            await application.store.s3.read(object_name)
+        await application.postgres._engine.dispose()
+
+
+class TestJobs:
+    @staticmethod
+    async def drain(application):
+        jobs = application.store.jobs
+        while job := await jobs._claim():
+            await jobs._run(job)
+
+    async def test_metadata_extracted(self, application, client):
+        """Метаданные картинки извлекаются фоновой задачей."""
+        meme_id = TestGetMeme.create(client)
+        await application.postgres._engine.dispose()
+        await self.drain(application)
+        table = application.postgres.full_name(MemeModel.__table__)
+        result = await application.postgres.query_execute(
+            text(f"SELECT phash FROM {table} WHERE id = '{meme_id}';")
+        )
+        phash = result.scalar_one()
+        await application.postgres._engine.dispose()
+        with open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb") as file:
+            metadata = extract_metadata(file.read())
+
+        [meme] = client.get("/memes").json()
+        assert "image/jpeg" == meme["mime_type"]
+        for key in ("width", "height", "size", "mime_type"):
+            assert metadata[key] == meme[key], key
+        assert phash is not None
+        assert metadata["phash"] == phash
+
+    async def test_abandoned_job_retried(self, application):
+        """Брошенная и упавшая задачи выполняются повторно."""
+        jobs = application.store.jobs
+        jobs.settings = JobSettings(job_lease=0)
+        calls = []
+
+        async def flaky(**payload):
+            calls.append(payload)
+            if len(calls) == 1:
+                raise ValueError("flaky")
+
+        jobs.register("flaky", flaky)
+        await jobs.enqueue("flaky", number=1)
+        abandoned = await jobs._claim()
+        job = await jobs._claim()
+        assert (abandoned.id, 2) == (job.id, job.attempts), "Аренда истекла"
+        await jobs._run(job)
+        assert await jobs._claim() is None, "Повтор отложен"
+
+        table = application.postgres.full_name(JobModel.__table__)
+        await application.postgres.query_execute(
+            text(f"UPDATE {table} SET run_after = current_timestamp;")
+        )
+        await jobs._run(await jobs._claim())
+        assert await jobs._claim() is None
+        await application.postgres._engine.dispose()
+        assert calls == [{"number": 1}, {"number": 1}]
+
+
+class TestMemesArchive:
+    def test_archive(self, client):
+        """Проверка скачивания архива мемов по списку id."""
+        meme_id = TestGetMeme.create(client)
+        response = client.get(f"/memes/archive?ids={meme_id}")
+        assert response.status_code == 200
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert [f"{meme_id}.jpg", "manifest.csv"] == archive.namelist()
+        assert title_1 in archive.read("manifest.csv").decode()
+
+
+class TestImportMemes:
+    def test_import(self, client):
+        """Проверка импорта архива мемов."""
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, "w") as archive:
+            archive.write(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "a.jpg")
+            archive.write(os.path.join(BASE_DIR, "tests/data/babai.jpg"), "b.jpg")
+            archive.writestr("manifest.csv", "name,title\na.jpg,a\nb.jpg,b\n")
+        content.seek(0)
+        response = client.post(
+            "/memes/import",
+            files={"archive": ("memes.zip", content)},
+            data={"name": uuid.uuid4().hex},
+        )
+        assert response.status_code == 200, f"Response: {response.json()}"
+        assert "Импортировано мемов: 2" == response.json().get("message")
+        assert {"a", "b"} == {meme["title"] for meme in client.get("/memes").json()}
+
+
+class TestSimilarMemes:
+    async def test_similar(self, application, client, data_1, data_2, data_3):
+        """Проверка поиска мемов с похожими картинками."""
+        hashes = {meme1_id: 0b1111, meme2_id: 0b0111, meme3_id: -1}
+        table = application.postgres.full_name(MemeModel.__table__)
+        for meme_id, phash in hashes.items():
+            await application.postgres.query_execute(
+                text(
+                    f"UPDATE {table} "
+                    f"SET phash = {phash} WHERE id = '{meme_id}';"
+                )
+            )
+            application.store.similar.add(meme_id, phash)
+        await application.postgres._engine.dispose()
+
+        response = client.get(f"/memes/{meme1_id}/similar?distance=4")
+        assert response.status_code == 200
+        assert [meme2_id] == [meme["id"] for meme in response.json()]
+        assert 1 == response.json()[0]["distance"]
+
+
+class FakeListenConnection:
+    """A LISTEN connection which is lost when `lose` is called."""
+
+    def add_termination_listener(self, listener):
+        self.lose = lambda: listener(self)
+
+    async def add_listener(self, channel: str, listener):
+        pass
+
+    def is_closed(self) -> bool:
+        return True
+
+
+class TestInvalidationBus:
+    @staticmethod
+    def record(bus, monkeypatch) -> list:
+        events = []
+        monkeypatch.setattr(bus, "_handlers", [])
+        bus.subscribe(lambda *event: events.append(event))
+        return events
+
+    async def test_dispatch(self, application, monkeypatch):
+        """Событие доставляется подписанным обработчикам."""
+        bus = application.store.bus
+        events = self.record(bus, monkeypatch)
+        await bus.publish("metadata", meme1_id, phash=7)
+        assert events == [("metadata", meme1_id, {"phash": 7})]
+
+    async def test_own_echo_skipped(self, application, monkeypatch):
+        """Собственные события, вернувшиеся из Postgres, пропускаются."""
+        bus = application.store.bus
+        events = self.record(bus, monkeypatch)
+        for sender in (bus._sender, uuid.uuid4().hex):
+            payload = {"kind": "delete", "id": meme1_id, "data": {}, "sender": sender}
+            bus._on_notification(None, None, None, json.dumps(payload))
+        assert events == [("delete", meme1_id, {})]
+
+    async def test_flush_on_reconnect(self, application, monkeypatch):
+        """После восстановления соединения обработчики сбрасываются."""
+        bus = application.store.bus
+        bus.settings = BusSettings(bus_reconnect_delay=0)
+        events = self.record(bus, monkeypatch)
+        connections = []
+
+        async def connect(dsn: str):
+            connections.append(FakeListenConnection())
+            return connections[-1]
+
+        monkeypatch.setattr(asyncpg, "connect", connect)
+        listen = asyncio.create_task(bus._listen())
+        async with asyncio.timeout(5):
+            while not connections:
+                await asyncio.sleep(0)
+            assert events == [], "Первое подключение не сбрасывает кэши"
+            connections[0].lose()
+            while len(connections) < 2:
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        listen.cancel()
+        await asyncio.gather(listen, return_exceptions=True)
+        assert events == [(FLUSH, None, {})]
+
+
+class TestViews:
+    async def test_views(self, application, client, data_1):
+        """Проверка подсчёта просмотров мема."""
+        for _ in range(2):
+            assert client.get(f"/memes/{meme1_id}").status_code == 200
+        await application.postgres._engine.dispose()
+        await application.store.views.flush()
+        await application.postgres._engine.dispose()
+
+        response = client.get("/memes")
+        assert response.status_code == 200
+        assert 2 == response.json()[0]["views"]
+
+    async def test_cancelled_flush_keeps_counts(self, application, monkeypatch):
+        """Прерванная запись счётчиков не теряет просмотры."""
+        views = application.store.views
+        started = asyncio.Event()
+
+        async def update(batch):
+            started.set()
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(views, "_update", update)
+        views.count(uuid.UUID(meme1_id))
+        flush = asyncio.create_task(views.flush())
+        await started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert views._counts == {uuid.UUID(meme1_id): 1}
+
+
+class TestTags:
+    async def tag(self, application, meme_id: str, *tags: str):
+        table = application.postgres.full_name(MemeModel.__table__)
+        await application.postgres.query_execute(
+            text(
+                f"UPDATE {table} "
+                f"SET tags = '{{{','.join(tags)}}}' WHERE id = '{meme_id}';"
+            )
+        )
+        await application.postgres._engine.dispose()
+
+    async def test_filter(self, application, client, data_1, data_2, data_3):
+        """Проверка отбора мемов по тегам."""
+        await self.tag(application, meme1_id, "cats", "fun")
+        await self.tag(application, meme2_id, "cats")
+
+        response = client.get("/memes?tags=Cats,fun")
+        assert response.status_code == 200
+        assert [meme1_id, meme2_id] == [meme["id"] for meme in response.json()]
+        assert ["cats", "fun"] == response.json()[0]["tags"]
+
+        response = client.get("/memes?tags=cats&tags=fun&match=all")
+        assert [meme1_id] == [meme["id"] for meme in response.json()]
+
+    def test_cursor(self, client, data_1, data_2, data_3):
+        """Проверка постраничного чтения по курсору."""
+        response = client.get("/memes?page_size=2")
+        assert response.headers["X-Next-Cursor"] == meme2_id
+
+        response = client.get(
+            f"/memes?page_size=2&cursor={response.headers['X-Next-Cursor']}"
+        )
+        assert [meme3_id] == [meme["id"] for meme in response.json()]
+        assert "X-Next-Cursor" not in response.headers
+
+    async def test_counts(self, application, client, data_1, data_2):
+        """Проверка подсчёта мемов по тегам."""
+        await self.tag(application, meme1_id, "cats", "fun")
+        await self.tag(application, meme2_id, "cats")
+        assert await application.store.tags.refresh()
+        await application.postgres._engine.dispose()
+
+        response = client.get("/memes/tags")
+        assert response.status_code == 200
+        assert [{"tag": "cats", "count": 2}, {"tag": "fun", "count": 1}] == (
+            response.json()
+        )
+
+    def test_too_many_tags(self, client, data_1):
+        """Проверка ограничения числа тегов."""
+        response = client.put(
+            f"/memes/{meme1_id}",
+            data={"tags": ",".join(f"tag{number}" for number in range(21))},
+        )
+        assert response.status_code == 400
+
+
+class TestRandomMemes:
+    def test_random(self, client, data_1, data_2, data_3):
+        """Проверка выбора случайных мемов."""
+        response = client.get("/memes/random?count=2")
+        assert response.status_code == 200
+        ids = [meme["id"] for meme in response.json()]
+        assert 0 < len(ids) <= 2
+        assert len(set(ids)) == len(ids)
+        assert set(ids) <= {meme1_id, meme2_id, meme3_id}
+
+
+class TestTrending:
+    async def test_trending(self, application, client, data_1, data_2):
+        """Проверка списка популярных мемов."""
+        assert client.get(f"/memes/{meme2_id}").status_code == 200
+        await application.postgres._engine.dispose()
+        await application.store.trending.refresh()
+        await application.postgres._engine.dispose()
+
+        response = client.get("/memes/trending")
+        assert response.status_code == 200
+        assert [meme2_id] == [meme["id"] for meme in response.json()]
+        assert 0 < response.json()[0]["score"] <= 1
+
+    async def test_cancelled_flush_keeps_scores(self, application, monkeypatch):
+        """Прерванное слияние не теряет очки просмотров."""
+        trending = application.store.trending
+        started = asyncio.Event()
+
+        async def query_execute(query, read_only: bool = False):
+            started.set()
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(application.postgres, "query_execute", query_execute)
+        trending.hit(uuid.UUID(meme1_id))
+        flush = asyncio.create_task(trending.flush())
+        await started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert [uuid.UUID(meme1_id)] == list(trending._scores)
+        assert 0.99 < trending._scores[uuid.UUID(meme1_id)][0] <= 1
+
+
 class TestCreateMeme:
     async def test_create(self, client):
         """Проверка создания мема."""
@@ -59,6 +518,138 @@ class TestCreateMeme:
         assert response.json().get("status") == "Оk", "Ожидает Оk"
         assert "Мем добавлен, id" in response.json().get("message")
 
+    def test_create_idempotent(self, client):
+        """Повтор запроса с тем же Idempotency-Key не создаёт новый мем."""
+        responses = [
+            client.post(
+                "/memes",
+                files={
+                    "file": open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb")
+                },
+                data={"text": title},
+                headers={"Idempotency-Key": "create-1"},
+            )
+            for title in (title_1, title_1, "другой мем")
+        ]
+        assert responses[0].status_code == 200, f"Response: {responses[0].json()}"
+        assert responses[0].json() == responses[1].json()
+        assert responses[2].status_code == 400, "Ключ использован для другого запроса"
+        assert 1 == len(client.get("/memes").json())
+
+    async def test_read_own_writes_on_other_worker(
+        self, application, client, monkeypatch
+    ):
+        """После записи другой воркер читает из основной базы."""
+        workers = [application.postgres, Postgres(application)]
+        connect_db(application, workers[1])
+        for postgres in workers:
+            replica = postgres.create_engine(postgres.settings.dsn(True))
+            postgres._replicas, postgres._healthy = (replica,), {replica}
+        response = client.post(
+            "/memes",
+            files={"file": open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb")},
+            data={"text": title_1},
+        )
+        assert response.status_code == 200, f"Response: {response.json()}"
+        assert "last_write" in response.cookies
+
+        worker, engines = workers[1], []
+
+        def get_engine(read_only: bool = False):
+            engines.append(Postgres.get_engine(worker, read_only))
+            return engines[-1]
+
+        monkeypatch.setattr(worker, "get_engine", get_engine)
+        monkeypatch.setattr(application, "postgres", worker)
+        assert 1 == len(client.get("/memes").json())
+        assert {worker._engine} == set(engines), "Запись видна сразу"
+        engines.clear()
+        client.cookies.clear()
+        client.get("/memes")
+        assert set(worker._replicas) == set(engines)
+        for postgres in workers:
+            for engine in (postgres._engine, *postgres._replicas):
+                await engine.dispose()
+
+
+class TestWriteBehind:
+    def test_create_spooled(self, client, application, tmp_path):
+        """Мем принят в спул и отдаётся из него до загрузки в хранилище."""
+        application.store.spool.settings = SpoolSettings(
+            spool_enabled=True, spool_dir=str(tmp_path)
+        )
+        with open(os.path.join(BASE_DIR, "tests/data/minion.jpg"), "rb") as file:
+            content = file.read()
+        response = client.post(
+            "/memes", files={"file": ("minion.jpg", content)}, data={"text": title_1}
+        )
+        assert response.status_code == 202, f"Response: {response.json()}"
+        meme_id = response.json().get("message").split("id: ")[1]
+        assert (tmp_path / f"{meme_id}.jpg").read_bytes() == content
+        assert client.get(f"/memes/{meme_id}").content == content
+
+    async def test_supersede_waits_for_push(self, application, tmp_path, monkeypatch):
+        """Новая картинка не перезаписывается загрузкой старой из спула."""
+        spool = application.store.spool
+        spool.settings = SpoolSettings(spool_enabled=True, spool_dir=str(tmp_path))
+        meme_id = str((await spool.add(title_1, b"old")).id)
+        started, release, uploaded = asyncio.Event(), asyncio.Event(), []
+
+        async def upload(name: str, content: bytes):
+            started.set()
+            await release.wait()
+            uploaded.append(content)
+
+        monkeypatch.setattr(application.store.s3, "upload", upload)
+        push = asyncio.create_task(spool._push(meme_id))
+        await started.wait()
+        supersede = asyncio.create_task(spool.supersede(meme_id))
+        await asyncio.sleep(0.1)
+        assert not supersede.done(), "Ожидает завершения загрузки старой картинки"
+        release.set()
+        await asyncio.gather(push, supersede)
+        assert uploaded == [b"old"]
+        assert not (tmp_path / f"{meme_id}.jpg").exists()
+        assert await spool._push(meme_id) is None
+
+    async def test_retries_capped(self, application, client, tmp_path):
+        """После spool_max_attempts неудач картинка откладывается, мем удаляется."""
+        spool = application.store.spool
+        spool.settings = SpoolSettings(
+            spool_enabled=True, spool_dir=str(tmp_path), spool_max_attempts=2
+        )
+        meme_id = str((await spool.add(title_1, b"image")).id)
+        for _ in range(2):
+            await spool._retry(meme_id, ConnectionError())
+        await application.postgres._engine.dispose()
+        assert (tmp_path / f"{meme_id}.jpg.failed").exists()
+        assert meme_id not in spool._pending
+        assert [] == client.get("/memes").json()
+        assert client.get(f"/memes/{meme_id}").status_code == 404
+
+
+class TestGenerateMeme:
+    def test_templates(self, client):
+        """Проверка списка шаблонов."""
+        response = client.get("/memes/templates")
+        assert response.status_code == 200
+        assert {"babai", "minion"} == {item["name"] for item in response.json()}
+
+    def test_generate(self, client):
+        """Проверка создания мема по шаблону, повтор возвращает тот же мем."""
+        data = {"template": "minion", "top": "верх", "bottom": "низ"}
+        response = client.post("/memes/generate", data=data)
+        assert response.status_code == 200, f"Response: {response.json()}"
+        assert response.json() == client.post("/memes/generate", data=data).json()
+
+        meme_id = response.json()["message"].split(": ")[1]
+        assert client.get(f"/memes/{meme_id}").status_code == 200
+        assert ["верх низ"] == [meme["title"] for meme in client.get("/memes").json()]
+
+    def test_generate_unknown_template(self, client):
+        response = client.post("/memes/generate", data={"template": "x", "top": "y"})
+        assert response.status_code == 400
+
 
 class TestDeleteMeme:
     def test_delete(self, client, data_1):
@@ -106,3 +697,131 @@ class TestUpdateMeme:
         """Проверка обновления несуществующего мема."""
         response = client.put(f"/memes/{meme1_id}", data={"text": title_1})
         assert response.status_code == 400
+
+
+class TestRateLimit:
+    def test_rate_limited(self, client, monkeypatch):
+        """Проверка ответа 429 при превышении лимита запросов."""
+        monkeypatch.setenv("RATE_LIMIT_BURST", "1")
+        monkeypatch.setenv("RATE_LIMIT_RATE", "0.1")
+        assert client.get("/memes").status_code == 200
+        response = client.get("/memes")
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "10"
+        assert "memes_rate_limited_total" in client.get("/metrics").text
+
+    def test_unknown_api_key_ignored(self, client, monkeypatch):
+        """Неизвестный API-ключ не даёт клиенту новый бакет."""
+        monkeypatch.setenv("RATE_LIMIT_BURST", "1")
+        monkeypatch.setenv("RATE_LIMIT_RATE", "0.1")
+        monkeypatch.setenv("RATE_LIMIT_API_KEYS", '["issued"]')
+        assert client.get("/memes", headers={"X-API-Key": "a"}).status_code == 200
+        assert client.get("/memes", headers={"X-API-Key": "b"}).status_code == 429
+        assert client.get("/memes", headers={"X-API-Key": "issued"}).status_code == 200
+
+
+class TestHealth:
+    def test_live(self, client):
+        """Проверка liveness-пробы."""
+        response = client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    async def test_ready(self, application, client):
+        """Проверка readiness-пробы по результатам фоновой проверки."""
+        assert client.get("/health/ready").status_code == 503
+        await application.store.health.check()
+        response = client.get("/health/ready")
+        assert response.status_code == 200, response.json()
+        assert response.json()["checks"] == {"postgres": "ok", "s3": "ok"}
+        assert "postgres" in response.json()["saturation"]
+
+    async def test_not_ready_saturated(self, application, client, monkeypatch):
+        """Проверка ответа 503 при исчерпании пула соединений Postgres."""
+        await application.store.health.check()
+        monkeypatch.setattr(application.postgres, "saturation", lambda: 1.0)
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "unavailable"
+
+
+class TestAccessLog:
+    def test_access_logged(self, application, client, data_1):
+        """Проверка структурированной записи журнала доступа."""
+        records = []
+        handler = application.logger.add(lambda message: records.append(message.record))
+        try:
+            client.get(f"/memes/{data_1['id']}")
+        finally:
+            application.logger.remove(handler)
+        access = [r["extra"] for r in records if r["extra"].get("event") == "access"]
+        assert len(access) == 1
+        assert access[0]["route"] == "/memes/{id}"
+        assert access[0]["status"] == 200
+        assert access[0]["db"] > 0
+
+    def test_sampled(self, application, client, monkeypatch):
+        """Проверка выборки успешных запросов, ошибки журналируются всегда."""
+        monkeypatch.setenv("LOG_SAMPLE_RATE", "0")
+        records = []
+        handler = application.logger.add(lambda message: records.append(message.record))
+        try:
+            client.get("/memes")
+            client.get(f"/memes/{meme1_id}")
+        finally:
+            application.logger.remove(handler)
+        access = [r["extra"] for r in records if r["extra"].get("event") == "access"]
+        assert [record["status"] for record in access] == [400]
+
+
+class TestGuard:
+    def test_breaker_open(self, application, client):
+        """Открытый предохранитель отвечает 503 с Retry-After."""
+        application.store.memes.guard.breaker._open()
+        response = client.get("/memes")
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+
+class TestDeadline:
+    def test_deadline_exceeded(self, client, data_1):
+        """Проверка ответа 504 при исчерпании времени на запрос."""
+        response = client.get(
+            f"/memes/{data_1['id']}", headers={"X-Request-Timeout": "0.000001"}
+        )
+        assert response.status_code == 504
+        assert client.get(f"/memes/{data_1['id']}").status_code == 200
+
+    def test_tiny_deadlines_keep_breaker_closed(self, application, client, data_1):
+        """Крошечные таймауты клиента не открывают предохранитель."""
+        for _ in range(30):
+            response = client.get(
+                f"/memes/{data_1['id']}", headers={"X-Request-Timeout": "0.005"}
+            )
+            assert response.status_code in (200, 504)
+        assert application.store.memes.guard.breaker.state == CLOSED
+        assert application.store.s3.guard.breaker.state == CLOSED
+
+    async def test_hung_backend_opens_breaker(self, application, monkeypatch):
+        """Зависший бэкенд открывает предохранитель и снижает лимит."""
+
+        async def fetch(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        monkeypatch.setattr(application.postgres, "fetch", fetch)
+        guard = application.store.memes.guard
+        monkeypatch.setattr(guard.limiter, "latency", 0.05)
+        token = deadline.set(time.monotonic() + 0.2)
+        try:
+            results = await asyncio.gather(
+                *(
+                    application.store.memes.get_meme_by_id(meme1_id)
+                    for _ in range(10)
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            deadline.reset(token)
+        assert all(isinstance(r, DeadlineExceededException) for r in results)
+        assert guard.breaker.state == OPEN
+        assert guard.limiter.limit < GuardSettings().guard_initial_limit